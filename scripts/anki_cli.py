@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add project root to Python path so we can import from src/
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL
+from src.anki_connect import endpoints as anki_endpoints
+from src.anki_connect import export as anki_export
+from src.anki_connect import media as anki_media
+from src.anki_connect import replicate as anki_replicate
+from src.anki_connect import sync as anki_sync
+from src.notebook import ROOT, expand_note_paths, iter_note_paths
+
+
+def cmd_sync(args: argparse.Namespace) -> None:
+    plan, report = anki_sync.sync(
+        paths=[Path(p) for p in args.paths] or None,
+        url=args.url,
+        state_path=Path(args.state),
+        academic_deck=args.academic_deck,
+        vocab_deck=args.vocab_deck,
+        dry_run=args.dry_run,
+        router=anki_endpoints.load_router(Path(args.decks), default_url=args.url),
+    )
+    if report is None:
+        print(
+            f"Plan: {len(plan.adds)} to add, {len(plan.updates)} to update, "
+            f"{len(plan.deletes)} to delete, {plan.unchanged} unchanged"
+        )
+        for card in plan.adds:
+            print(f"  + {card.key}")
+        for card, _ in plan.updates:
+            print(f"  ~ {card.key}")
+        for key, _ in plan.deletes:
+            print(f"  - {key}")
+        return
+
+    print(
+        f"Synced: {report.added} added, {report.updated} updated, "
+        f"{report.deleted} deleted, {report.unchanged} unchanged"
+    )
+    for result in report.endpoints:
+        if result.result is None:
+            print(f"  {result.url}: failed after {result.latency_ms:.0f} ms")
+            continue
+        part = result.result
+        print(
+            f"  {result.url}: {part.added} added, {part.updated} updated, {part.deleted} deleted, "
+            f"{len(part.errors)} error(s) in {result.latency_ms:.0f} ms"
+        )
+    for error in report.errors:
+        print(f"  ! {error}", file=sys.stderr)
+    if args.media:
+        _sync_media(args, args.paths)
+    if report.errors:
+        sys.exit(1)
+
+
+def _sync_media(args: argparse.Namespace, paths: list[str]) -> bool:
+    note_paths = expand_note_paths(Path(p) for p in paths) if paths else None
+    router = anki_endpoints.load_router(Path(args.decks), default_url=args.url)
+    if not router.fans_out:
+        uploads, report = anki_media.sync_media(note_paths, url=args.url, dry_run=args.dry_run)
+        return _print_media(args, uploads, report)
+
+    # Each note's images go to the endpoints its cards are routed to
+    targets = anki_sync.media_targets(
+        note_paths or iter_note_paths(ROOT),
+        router,
+        ROOT,
+        getattr(args, "academic_deck", anki_sync.DEFAULT_ACADEMIC_DECK),
+        getattr(args, "vocab_deck", anki_sync.DEFAULT_VOCAB_DECK),
+    )
+    ok = True
+    for result in anki_media.sync_media_fan_out(targets, dry_run=args.dry_run):
+        if result.result is None:
+            print(f"  ! {result.url}: {result.error}", file=sys.stderr)
+            ok = False
+            continue
+        uploads, report = result.result
+        ok = _print_media(args, uploads, report, f"{result.url}: ") and ok
+    return ok
+
+
+def _print_media(args: argparse.Namespace, uploads: list[anki_media.MediaFile], report: anki_media.MediaReport, prefix: str = "") -> bool:
+    if args.dry_run:
+        print(f"{prefix}Media plan: {len(uploads)} to upload, {report.unchanged} unchanged")
+        for media in uploads:
+            print(f"  + {media.name} ({media.size} bytes)")
+    else:
+        print(f"{prefix}Media: {report.uploaded} uploaded, {report.unchanged} unchanged")
+    for reference in report.missing_locally:
+        print(f"  ? missing file: {reference}", file=sys.stderr)
+    for error in report.errors:
+        print(f"  ! {error}", file=sys.stderr)
+    return not report.errors
+
+
+def cmd_media(args: argparse.Namespace) -> None:
+    if not _sync_media(args, args.paths):
+        sys.exit(1)
+
+
+def cmd_replicate(args: argparse.Namespace) -> None:
+    note_types_path = Path(args.note_types) if args.note_types else anki_replicate.DEFAULT_NOTE_TYPES_PATH
+    if args.note_types and not note_types_path.exists():
+        raise FileNotFoundError(f"Note types file not found: {note_types_path}")
+
+    plan, errors = anki_replicate.replicate(
+        decks_path=Path(args.decks),
+        note_types_path=note_types_path,
+        url=args.url,
+        dry_run=args.dry_run,
+    )
+    verb = "Would create" if args.dry_run else "Created"
+    for deck in plan.missing_decks:
+        print(f"  + deck {deck}")
+    for params in plan.missing_models:
+        print(f"  + model {params['modelName']}")
+    print(
+        f"{verb} {len(plan.missing_decks)} deck(s) and {len(plan.missing_models)} model(s); "
+        f"{plan.existing_decks} deck(s) and {plan.existing_models} model(s) already present"
+    )
+    for error in errors:
+        print(f"  ! {error}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+def cmd_export(args: argparse.Namespace) -> None:
+    output = Path(args.output)
+    report = anki_export.export_notes(
+        output,
+        query=args.query,
+        url=args.url,
+        fmt=args.format,
+        page_size=args.page_size,
+        workers=args.jobs,
+    )
+    print(f"Exported {report.notes} note(s) in {report.pages} page(s) to {output}")
+
+
+def cmd_stats(args: argparse.Namespace) -> None:
+    # pandas/numpy are only needed here; keep the other commands fast to start
+    from src.anki_connect import analytics
+
+    refreshed, report = analytics.analyze(
+        url=args.url,
+        decks_path=Path(args.decks),
+        days=args.days,
+        refresh=not args.no_refresh,
+    )
+    if refreshed is not None:
+        print(f"Cache: {refreshed.new_reviews} new review(s), {refreshed.refreshed_cards} card(s) refreshed\n")
+
+    print("Retention by days since previous review:")
+    print(report.retention.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"Fitted stability S = {report.stability_days:.1f} days (R(t) = exp(-t / S))\n")
+    print("Difficulty by deck (hardest first):")
+    print(report.difficulty.to_string(float_format=lambda v: f"{v:.3f}"))
+    print(f"\nDue forecast, next {args.days} days:")
+    forecast = report.forecast.copy()
+    forecast.index = forecast.index.strftime("%Y-%m-%d")
+    print(forecast.to_string())
+
+
+def cmd_endpoints(args: argparse.Namespace) -> None:
+    router = anki_endpoints.load_router(Path(args.decks), default_url=args.url)
+    decks = anki_replicate.load_decks(Path(args.decks))
+    failed = False
+    for result in anki_endpoints.ping(router):
+        routed = [deck for deck in decks if router.url_for(deck) == result.url]
+        if result.result is None:
+            failed = True
+            print(f"{result.url}: unreachable ({result.error}) after {result.latency_ms:.0f} ms")
+            continue
+        missing = [deck for deck in routed if deck not in result.result["decks"]]
+        print(f"{result.url}: AnkiConnect v{result.result['version']}, {result.latency_ms:.0f} ms")
+        print(f"  decks: {', '.join(routed) or '-'}")
+        if missing:
+            print(f"  missing: {', '.join(missing)} (run `replicate` against this URL)")
+    if failed:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Anki tools built on AnkiConnect")
+    parser.add_argument("-u", "--url", default=DEFAULT_ANKI_CONNECT_URL, help="AnkiConnect URL (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sync_parser = subparsers.add_parser("sync", help="Push cards parsed from notes, sending only changes")
+    sync_parser.add_argument("paths", nargs="*", help="Notes or directories to sync (default: all notes)")
+    sync_parser.add_argument("--state", default=str(anki_sync.DEFAULT_STATE_PATH), help="Sync state file (default: %(default)s)")
+    sync_parser.add_argument("--academic-deck", default=anki_sync.DEFAULT_ACADEMIC_DECK, help="Deck for cloze cards (default: %(default)s)")
+    sync_parser.add_argument("--vocab-deck", default=anki_sync.DEFAULT_VOCAB_DECK, help="Deck for vocabulary cards (default: %(default)s)")
+    sync_parser.add_argument("-n", "--dry-run", action="store_true", help="Show the plan without contacting Anki")
+    sync_parser.add_argument("--media", action="store_true", help="Also upload images referenced by the notes")
+    sync_parser.add_argument(
+        "-d", "--decks", default=str(anki_replicate.DEFAULT_DECKS_PATH), help="Deck list with optional endpoint routes (default: %(default)s)"
+    )
+    sync_parser.set_defaults(func=cmd_sync)
+
+    media_parser = subparsers.add_parser("media", help="Upload missing or changed images referenced by notes")
+    media_parser.add_argument("paths", nargs="*", help="Notes or directories to scan (default: all notes)")
+    media_parser.add_argument("-n", "--dry-run", action="store_true", help="Show what would be uploaded")
+    media_parser.add_argument(
+        "-d", "--decks", default=str(anki_replicate.DEFAULT_DECKS_PATH), help="Deck list with optional endpoint routes (default: %(default)s)"
+    )
+    media_parser.set_defaults(func=cmd_media)
+
+    replicate_parser = subparsers.add_parser("replicate", help="Create missing decks and note types")
+    replicate_parser.add_argument("-d", "--decks", default=str(anki_replicate.DEFAULT_DECKS_PATH), help="Deck list (default: %(default)s)")
+    replicate_parser.add_argument(
+        "-m",
+        "--note-types",
+        help=f"Note type definitions as createModel params (default: {anki_replicate.DEFAULT_NOTE_TYPES_PATH}, if present)",
+    )
+    replicate_parser.add_argument("-n", "--dry-run", action="store_true", help="Show what is missing without creating it")
+    replicate_parser.set_defaults(func=cmd_replicate)
+
+    export_parser = subparsers.add_parser("export", help="Stream notes to a CSV or Parquet file")
+    export_parser.add_argument("output", help="Output file (.csv or .parquet)")
+    export_parser.add_argument("-q", "--query", default=anki_export.DEFAULT_QUERY, help="Anki search query (default: %(default)s)")
+    export_parser.add_argument("-f", "--format", choices=anki_export.FORMATS, help="Output format (default: from the file suffix)")
+    export_parser.add_argument("--page-size", type=int, default=anki_export.DEFAULT_PAGE_SIZE, help="Notes per notesInfo request (default: %(default)s)")
+    export_parser.add_argument("-j", "--jobs", type=int, default=anki_export.DEFAULT_WORKERS, help="Concurrent requests (default: %(default)s)")
+    export_parser.set_defaults(func=cmd_export)
+
+    stats_parser = subparsers.add_parser("stats", help="Retention, deck difficulty and due forecast from review logs")
+    stats_parser.add_argument("-d", "--decks", default=str(anki_replicate.DEFAULT_DECKS_PATH), help="Deck list (default: %(default)s)")
+    stats_parser.add_argument("--days", type=int, default=30, help="Forecast horizon in days (default: %(default)s)")
+    stats_parser.add_argument("--no-refresh", action="store_true", help="Report from the local cache without contacting Anki")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    endpoints_parser = subparsers.add_parser("endpoints", help="Check every endpoint routed in the deck list, concurrently")
+    endpoints_parser.add_argument("-d", "--decks", default=str(anki_replicate.DEFAULT_DECKS_PATH), help="Deck list (default: %(default)s)")
+    endpoints_parser.set_defaults(func=cmd_endpoints)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the CLI hot paths, run against synthetic data.
+
+Generates `.bib` files, a `literature-notebook/` tree and a fake AnkiConnect
+endpoint under a temporary directory, times each case, records peak Python
+memory with tracemalloc, and writes the results as JSON. With `--baseline`
+the run is compared against a stored result and exits 1 on a regression.
+
+Usage:
+    uv run python scripts/benchmark.py
+    uv run python scripts/benchmark.py --sizes 1000,10000,100000 --save-baseline
+    uv run python scripts/benchmark.py --baseline tmp/benchmarks/baseline.json
+"""
+from __future__ import annotations
+
+import argparse
+import builtins
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+# Add project root to Python path so we can import from src/
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.anki_connect import add_notes
+from src.notebook import locking
+from src.notebook.bibtex import BibEntry, parse_bibtex_entries
+
+
+RESULTS_DIR = Path(project_root) / "tmp" / "benchmarks"
+DEFAULT_BASELINE_PATH = RESULTS_DIR / "baseline.json"
+LITERATURE_CLI_PATH = Path(project_root) / "src" / "literature-note" / "create_literature_note_cli.py"
+
+_WORDS = (
+    "causal inference panel data treatment effect regression discontinuity instrumental "
+    "variables bayesian learning market design auction matching labor education health "
+    "networks identification structural estimation experiment survey policy evaluation"
+).split()
+_SURNAMES = "smith tanaka garcia mueller kawaguchi sawada chen okafor dubois rossi novak silva".split()
+
+
+@dataclass
+class BenchResult:
+    name: str
+    repeats: int
+    min_s: float
+    median_s: float
+    peak_kib: float
+
+
+# --- Synthetic data -----------------------------------------------------------
+
+
+def write_bib(path: Path, count: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    with path.open("w", encoding="utf-8") as f:
+        for idx in range(count):
+            surname = rng.choice(_SURNAMES)
+            year = rng.randint(1980, 2025)
+            title = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 9))).title()
+            f.write(
+                f"@article{{{surname}{idx}_{year},\n"
+                f"  title = {{{title}}},\n"
+                f"  author = {{{surname.title()}, A. and {rng.choice(_SURNAMES).title()}, B.}},\n"
+                f"  year = {{{year}}},\n"
+                f"  journal = {{Journal of {rng.choice(_WORDS).title()}}},\n"
+                f"  url = {{https://doi.org/10.1000/{idx}}},\n"
+                f"  file = {{/home/u/Zotero/storage/{idx:08d}/{surname.title()} - {year} - {title[:40]}.pdf}}\n"
+                "}\n\n"
+            )
+
+
+def write_literature_tree(root: Path, count: int, seed: int = 0) -> list[Path]:
+    """Create `count` reference directories, each with a reference note. Returns the notes."""
+    rng = random.Random(seed)
+    notes: list[Path] = []
+    for idx in range(count):
+        surname = rng.choice(_SURNAMES)
+        year = rng.randint(1980, 2025)
+        directory = root / "literature-notebook" / f"{surname}{idx}-{year}-{rng.choice(_WORDS)}"
+        directory.mkdir(parents=True)
+        note = directory / f"{surname}{idx}-{year}-reference-note.md"
+        links = "\n".join(f"- [[note-{n}]]" for n in range(rng.randint(0, 5)))
+        note.write_text(
+            f'---\ntitle: "Reference {idx}"\ntype: reference\n---\n\n# Reference {idx}\n\n'
+            f"## Summary\n\n{' '.join(rng.choice(_WORDS) for _ in range(80))}\n\n"
+            f"## Related Notes\n\n{links}\n\n## Questions\n\n- ?\n",
+            encoding="utf-8",
+        )
+        notes.append(note)
+    return notes
+
+
+class _FakeAnkiHandler(BaseHTTPRequestHandler):
+    next_id = 1_000_000
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length))
+        body = json.dumps(self._answer(payload)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _answer(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        action = payload.get("action")
+        params = payload.get("params") or {}
+        if action == "multi":
+            return {"result": [self._answer(a) for a in params.get("actions", [])], "error": None}
+        if action == "addNotes":
+            start = _FakeAnkiHandler.next_id
+            _FakeAnkiHandler.next_id += len(params.get("notes", []))
+            return {"result": list(range(start, _FakeAnkiHandler.next_id)), "error": None}
+        return {"result": None, "error": None}
+
+    def log_message(self, *_args) -> None:
+        pass
+
+
+@contextlib.contextmanager
+def fake_anki_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeAnkiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _synthetic_notes(count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "deckName": "Bench",
+            "modelName": "academic_cloze",
+            "fields": {"title": f"Note {idx}", "Text": f"The {{{{c1::answer {idx}}}}} is here", "source": "bench"},
+            "tags": ["bench"],
+        }
+        for idx in range(count)
+    ]
+
+
+def _load_literature_cli():
+    spec = importlib.util.spec_from_file_location("create_literature_note_cli", LITERATURE_CLI_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # dataclasses look their module up while executing
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- Runner -------------------------------------------------------------------
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    repeats: int,
+    setup: Optional[Callable[[], None]] = None,
+) -> BenchResult:
+    """Time `func` `repeats` times, then run it once more under tracemalloc for peak memory."""
+    timings: list[float] = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return BenchResult(
+        name=name,
+        repeats=repeats,
+        min_s=min(timings),
+        median_s=statistics.median(timings),
+        peak_kib=peak / 1024,
+    )
+
+
+@dataclass
+class _Case:
+    name: str
+    func: Callable[[], Any]
+    prepare: Optional[Callable[[], None]] = None  # once, untimed
+    setup: Optional[Callable[[], None]] = None  # before every run, untimed
+
+
+def _cases(sizes: list[int], workdir: Path, url: str) -> list[_Case]:
+    literature_cli = _load_literature_cli()
+    cases: list[_Case] = []
+
+    for size in sizes:
+        bib_path = workdir / f"library-{size}.bib"
+        cases.append(
+            _Case(f"bibtex.parse[{size}]", lambda p=bib_path: parse_bibtex_entries(p), prepare=lambda p=bib_path, n=size: write_bib(p, n))
+        )
+
+        entries: list[BibEntry] = []
+
+        def _prepare_select(entries=entries, bib_path=bib_path, size=size) -> None:
+            if not bib_path.exists():
+                write_bib(bib_path, size)
+            entries[:] = parse_bibtex_entries(bib_path)
+
+        def _select(entries=entries) -> BibEntry:
+            # A substring search that matches many titles, then picking the first hit
+            answers = iter(["panel data", "1"])
+            original_input = builtins.input
+            builtins.input = lambda *_args: next(answers)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return literature_cli._select_bib_entry(entries)
+            finally:
+                builtins.input = original_input
+
+        cases.append(_Case(f"literature.select_bib_entry[{size}]", _select, prepare=_prepare_select))
+
+        tree_size = min(size, 2000)
+        tree_root = workdir / f"tree-{tree_size}"
+        notes: list[Path] = []
+
+        def _reset_tree(tree_root=tree_root, notes=notes, tree_size=tree_size) -> None:
+            # Recreate the tree so every run appends to the same starting content
+            for note in notes:
+                note.unlink()
+                note.parent.rmdir()
+            notes[:] = write_literature_tree(tree_root, tree_size)
+
+        def _append(notes=notes, lock_dir=locking.lock_dir_for(tree_root)) -> None:
+            # Locks go under the temporary tree, not the repository's tmp/locks
+            for note in notes:
+                literature_cli._append_related_link(note, "bench-link", lock_dir)
+
+        cases.append(_Case(f"literature.append_related_link[{tree_size}]", _append, setup=_reset_tree))
+
+    for size in sizes:
+        payload: list[dict[str, Any]] = []
+        cases.append(
+            _Case(
+                f"anki.add_notes[{size}]",
+                lambda n=payload: add_notes(n, url=url),
+                prepare=lambda n=payload, size=size: n.extend(_synthetic_notes(size)),
+            )
+        )
+    return cases
+
+
+def run_suite(sizes: list[int], repeats: int, only: Optional[str], workdir: Path) -> list[BenchResult]:
+    results: list[BenchResult] = []
+    seen: set[str] = set()
+    with fake_anki_server() as url:
+        for case in _cases(sizes, workdir, url):
+            if case.name in seen or (only and only not in case.name):
+                continue
+            seen.add(case.name)
+            if case.prepare:
+                case.prepare()
+            result = measure(case.name, case.func, repeats, case.setup)
+            print(
+                f"{result.name:<42} min {result.min_s * 1000:>10.2f} ms  "
+                f"median {result.median_s * 1000:>10.2f} ms  peak {result.peak_kib:>10.1f} KiB",
+                flush=True,
+            )
+            results.append(result)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def write_results(results: list[BenchResult], path: Path) -> None:
+    payload = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": {result.name: asdict(result) for result in results},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def compare(results: list[BenchResult], baseline_path: Path, threshold: float) -> list[str]:
+    """Return a message per case whose min time or peak memory grew by more than `threshold`."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    regressions: list[str] = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        for metric in ("min_s", "peak_kib"):
+            old, new = base[metric], getattr(result, metric)
+            if old > 0 and new > old * (1 + threshold):
+                regressions.append(f"{result.name} {metric}: {old:.4g} -> {new:.4g} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark CLI hot paths on synthetic data")
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated library sizes (default: %(default)s)")
+    parser.add_argument("-r", "--repeats", type=int, default=3, help="Timed runs per case (default: %(default)s)")
+    parser.add_argument("-k", "--only", help="Run only cases whose name contains this text")
+    parser.add_argument("-o", "--output", help="Results file (default: tmp/benchmarks/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Compare against this results file and exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown vs baseline (default: %(default)s = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write the results to {DEFAULT_BASELINE_PATH}")
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+        with tempfile.TemporaryDirectory(prefix="learn-bench-") as workdir:
+            results = run_suite(sizes, args.repeats, args.only, Path(workdir))
+
+        output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        write_results(results, output)
+        print(f"Results written to {output}")
+        if args.save_baseline:
+            write_results(results, DEFAULT_BASELINE_PATH)
+            print(f"Baseline saved to {DEFAULT_BASELINE_PATH}")
+
+        if args.baseline:
+            regressions = compare(results, Path(args.baseline), args.threshold)
+            for message in regressions:
+                print(f"  ! regression: {message}", file=sys.stderr)
+            if regressions:
+                sys.exit(1)
+            print(f"No regressions beyond {args.threshold:.0%}")
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
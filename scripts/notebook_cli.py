@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+# Add project root to Python path so we can import from src/
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL
+from src.notebook import ROOT
+from src.notebook import citations as note_citations
+from src.notebook import convert as note_convert
+from src.notebook import export as note_export
+from src.notebook import fsck as note_fsck
+from src.notebook import locking
+from src.notebook import search as note_search
+from src.notebook import tags as note_tags
+from src.notebook import watch as note_watch
+from src.notebook.bibtex import get_bibtex_path, load_bibtex_entries
+
+
+class _Colors:
+    RESET = "\033[0m"
+    BOLD = "\033[1m"
+    DIM = "\033[2m"
+    CYAN = "\033[36m"
+    YELLOW = "\033[33m"
+
+
+def cmd_index(args: argparse.Namespace) -> None:
+    conn = note_search.open_index()
+    started = time.perf_counter()
+    if args.rebuild:
+        stats = note_search.rebuild_index(conn)
+    else:
+        stats = note_search.update_index(conn)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"Indexed: {stats.added} added, {stats.updated} updated, "
+        f"{stats.removed} removed, {stats.unchanged} unchanged ({elapsed_ms:.1f} ms)"
+    )
+
+
+def cmd_search(args: argparse.Namespace) -> None:
+    c = _Colors
+    conn = note_search.open_index()
+    # A running watcher keeps the index current
+    if not args.no_update and not note_watch.is_running():
+        note_search.update_index(conn)
+
+    started = time.perf_counter()
+    hits = note_search.search(
+        conn,
+        " ".join(args.query),
+        limit=args.limit,
+        sections=args.section,
+        highlight=(c.YELLOW, c.RESET),
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for hit in hits:
+        print(f"{c.CYAN}{hit.path}{c.RESET} {c.BOLD}{hit.title}{c.RESET}")
+        print(f"  {' '.join(hit.snippet.split())}")
+    print(f"{c.DIM}{len(hits)} hit(s) in {elapsed_ms:.1f} ms{c.RESET}", file=sys.stderr)
+
+
+def cmd_convert(args: argparse.Namespace) -> None:
+    c = _Colors
+    readings_dir = Path(args.readings).expanduser()
+    if not readings_dir.is_dir():
+        raise FileNotFoundError(f"Readings directory not found: {readings_dir}")
+    bib_path = Path(args.bib).expanduser() if args.bib else get_bibtex_path(ROOT)
+    entries = load_bibtex_entries(bib_path)
+
+    jobs, skipped = note_convert.plan_conversion(readings_dir, entries, force=args.force)
+    unmatched = sum(1 for job in jobs if not job.citekey)
+    print(f"{len(jobs)} to convert ({unmatched} without a BibTeX match), {skipped} already converted")
+
+    failed = 0
+    for event in note_convert.run_conversion(jobs, workers=args.jobs):
+        prefix = f"[{event.done}/{event.total}]"
+        if event.error:
+            failed += 1
+            print(f"{prefix} failed {event.job.source.name}: {event.error}", file=sys.stderr)
+            continue
+        target = event.job.output
+        if target.is_relative_to(ROOT):
+            target = target.relative_to(ROOT)
+        print(f"{prefix} {event.job.source.name} {c.DIM}->{c.RESET} {c.CYAN}{target}{c.RESET}", flush=True)
+    if failed:
+        sys.exit(1)
+
+
+def cmd_similar(args: argparse.Namespace) -> None:
+    # scikit-learn is only needed here
+    from src.notebook import similar as note_similar
+
+    c = _Colors
+    index = note_similar.SimilarityIndex.load()
+    stats = note_search.IndexStats(added=0, updated=0, removed=0, unchanged=len(index.paths))
+    if not note_watch.is_running():
+        stats = index.update()
+    if index.dirty:
+        index.save()
+
+    started = time.perf_counter()
+    target = Path(args.query[0]).resolve() if len(args.query) == 1 else None
+    rel_path = target.relative_to(ROOT).as_posix() if target is not None and target.is_relative_to(ROOT) else None
+    if rel_path is not None and rel_path in index:
+        hits = index.similar_to(rel_path, k=args.limit)
+    elif target is not None and target.is_file():
+        # Not an indexed note (README.md, a note the watcher hasn't indexed yet): compare its text
+        text = target.read_text(encoding="utf-8", errors="replace")
+        hits = index.query(text, k=args.limit, exclude=[rel_path] if rel_path else ())
+    else:
+        hits = index.query(" ".join(args.query), k=args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for hit in hits:
+        print(f"{hit.score:.3f} {c.CYAN}{hit.path}{c.RESET} {c.BOLD}{hit.title}{c.RESET}")
+    print(
+        f"{c.DIM}{len(hits)} hit(s) in {elapsed_ms:.1f} ms "
+        f"(index: {stats.added} added, {stats.updated} updated, {stats.removed} removed){c.RESET}",
+        file=sys.stderr,
+    )
+
+
+def _load_tag_index() -> note_tags.TagIndex:
+    index = note_tags.TagIndex.load()
+    if not note_watch.is_running():
+        index.update()
+        index.save()
+    return index
+
+
+def cmd_tags_list(args: argparse.Namespace) -> None:
+    c = _Colors
+    counts = _load_tag_index().tag_counts()
+    if args.sort == "name":
+        ordered = sorted(counts.items())
+    else:
+        ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    for tag, count in ordered:
+        print(f"{count:>6} {c.CYAN}{tag}{c.RESET}")
+
+
+def cmd_tags_notes(args: argparse.Namespace) -> None:
+    for rel in _load_tag_index().notes_with([args.tag]):
+        print(rel)
+
+
+def _run_tag_edit(args: argparse.Namespace, edit: dict[str, str | None]) -> None:
+    c = _Colors
+    index = _load_tag_index()
+    report = note_tags.apply_tag_edit(edit, index, dry_run=args.dry_run)
+    for change in report.changes:
+        print(f"  {change.path}: {c.DIM}[{', '.join(change.before)}]{c.RESET} -> [{', '.join(change.after)}]")
+    for error in report.errors:
+        print(f"  ! {error}", file=sys.stderr)
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {len(report.changes)} note(s)")
+
+    if not args.dry_run:
+        index.update()
+        index.save()
+    if args.anki and report.changes and not args.dry_run:
+        from src.anki_connect import sync as anki_sync
+        from src.anki_connect.endpoints import load_router
+
+        router = load_router(default_url=args.url)
+        touched = anki_sync.mirror_tag_changes(report.changes, anki_sync.load_state(), url=args.url, router=router)
+        print(f"Anki: updated tags on {touched} note(s)")
+    if report.errors:
+        sys.exit(1)
+
+
+def cmd_tags_rename(args: argparse.Namespace) -> None:
+    _run_tag_edit(args, {args.old: args.new})
+
+
+def cmd_tags_merge(args: argparse.Namespace) -> None:
+    _run_tag_edit(args, {tag: args.into for tag in args.tags if tag != args.into})
+
+
+def cmd_tags_remove(args: argparse.Namespace) -> None:
+    _run_tag_edit(args, {tag: None for tag in args.tags})
+
+
+def cmd_check_citations(args: argparse.Namespace) -> None:
+    c = _Colors
+    bib_path = Path(args.bib).expanduser() if args.bib else get_bibtex_path(ROOT)
+    entries = load_bibtex_entries(bib_path)
+
+    started = time.perf_counter()
+    report = note_citations.check_citations(entries, workers=args.jobs)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for citation in report.missing:
+        kind = "cited" if citation.inline else "citekey"
+        print(f"{c.YELLOW}missing{c.RESET} {c.CYAN}{citation.path}:{citation.line}{c.RESET} {kind} {citation.key}")
+    for renamed in report.renamed:
+        citation = renamed.citation
+        print(
+            f"{c.YELLOW}renamed{c.RESET} {c.CYAN}{citation.path}:{citation.line}{c.RESET} "
+            f"{citation.key} {c.DIM}->{c.RESET} {renamed.new_key}"
+        )
+    for key, count in sorted(report.duplicate_entries.items()):
+        print(f"{c.YELLOW}duplicate{c.RESET} {key} defined {count} times in {bib_path.name}")
+    for key, paths in sorted(report.duplicate_notes.items()):
+        print(f"{c.YELLOW}duplicate{c.RESET} {key} claimed by {', '.join(paths)}")
+
+    print(
+        f"{c.DIM}{report.citations} citation(s) in {report.notes} note(s) against {len(entries)} entries: "
+        f"{len(report.missing)} missing, {len(report.renamed)} renamed, "
+        f"{len(report.duplicate_entries) + len(report.duplicate_notes)} duplicate ({elapsed_ms:.1f} ms){c.RESET}",
+        file=sys.stderr,
+    )
+    if not report.ok:
+        sys.exit(1)
+
+
+def cmd_fsck(args: argparse.Namespace) -> None:
+    c = _Colors
+    bib_path = Path(args.bib).expanduser() if args.bib else get_bibtex_path(ROOT)
+    entries = load_bibtex_entries(bib_path) if bib_path.exists() else []
+    if not entries:
+        print(f"{c.DIM}No BibTeX entries ({bib_path}); directory names are checked against citekeys only{c.RESET}")
+
+    report = note_fsck.check_notebook(ROOT, entries)
+    for finding in report.findings:
+        print(f"{c.YELLOW}{finding.kind}{c.RESET} {c.CYAN}{finding.path}{c.RESET} {finding.detail}")
+    for conflict in report.conflicts:
+        print(f"{c.YELLOW}conflict{c.RESET} {conflict}")
+
+    def rel(path: Path) -> str:
+        return path.relative_to(ROOT).as_posix()
+
+    steps = [action for action in report.plan if action.kind != "rmdir"]
+    if steps:
+        print(f"\n{c.BOLD}Repair plan:{c.RESET}")
+    for action in steps:
+        if action.kind == "move":
+            print(f"  move    {rel(action.path)} {c.DIM}->{c.RESET} {rel(action.target)}")
+        elif action.kind == "rewrite":
+            links = ", ".join(f"[[{old}]] -> [[{new}]]" for old, new in action.links)
+            print(f"  rewrite {rel(action.path)}: {links}")
+        elif action.kind == "delete":
+            print(f"  delete  {rel(action.path)} {c.DIM}(identical copy){c.RESET}")
+    print(
+        f"{c.DIM}{report.notes} note(s): {len(report.findings)} finding(s), "
+        f"{len(report.conflicts)} conflict(s), {len(steps)} repair step(s){c.RESET}"
+    )
+
+    if args.repair and steps:
+        note_fsck.apply_plan(report.plan)
+        print(f"Applied {len(steps)} repair step(s)")
+    elif steps:
+        print("Run with --repair to apply the plan")
+    if args.prune_locks:
+        print(f"Removed {locking.prune_locks()} unused lock file(s) from {locking.DEFAULT_LOCK_DIR.relative_to(ROOT)}")
+    if (report.findings and not args.repair) or report.conflicts:
+        sys.exit(1)
+
+
+def cmd_dedup(args: argparse.Namespace) -> None:
+    # numpy is only needed here
+    from src.notebook import dedup as note_dedup
+
+    c = _Colors
+    bib_path = Path(args.bib).expanduser() if args.bib else get_bibtex_path(ROOT)
+    entries = load_bibtex_entries(bib_path)
+
+    started = time.perf_counter()
+    clusters = note_dedup.find_duplicates(entries, threshold=args.threshold)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for cluster in clusters[: args.limit]:
+        print(f"{c.BOLD}{cluster.similarity:.2f}{c.RESET} {len(cluster.entries)} entries")
+        for entry in cluster.entries:
+            print(f"  {c.CYAN}{entry.citekey}{c.RESET} {entry.year} {c.DIM}{entry.entry_type}{c.RESET} {entry.title}")
+    hidden = len(clusters) - args.limit
+    print(
+        f"{c.DIM}{len(clusters)} cluster(s) among {len(entries)} entries"
+        f"{f', {hidden} not shown' if hidden > 0 else ''} ({elapsed_ms:.1f} ms){c.RESET}",
+        file=sys.stderr,
+    )
+
+
+def cmd_export_html(args: argparse.Namespace) -> None:
+    c = _Colors
+    output_dir = Path(args.output).expanduser().resolve() if args.output else note_export.DEFAULT_OUTPUT_DIR
+    started = time.perf_counter()
+    report = note_export.export_html(ROOT, output_dir, workers=args.jobs, force=args.force)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for error in report.errors:
+        print(f"{c.YELLOW}error{c.RESET} {error}", file=sys.stderr)
+    print(
+        f"{report.notes} note(s): {report.rendered} rendered ({report.written} changed), "
+        f"{report.removed} removed, {report.images} image(s) copied -> {output_dir} "
+        f"{c.DIM}({elapsed_ms:.0f} ms){c.RESET}"
+    )
+    if report.errors:
+        sys.exit(1)
+
+
+def cmd_watch(args: argparse.Namespace) -> None:
+    c = _Colors
+    if note_watch.is_running():
+        raise RuntimeError(f"A watcher is already running (see {note_watch.DEFAULT_PID_PATH})")
+    bib_path = Path(args.bib).expanduser() if args.bib else get_bibtex_path(ROOT)
+
+    def report(flush: note_watch.FlushReport) -> None:
+        what = "full scan" if flush.full else f"{flush.paths} path(s)"
+        bib = ", BibTeX cache refreshed" if flush.bib else ""
+        print(
+            f"{c.DIM}{time.strftime('%H:%M:%S')}{c.RESET} {what}: {flush.summary or 'no note changes'}{bib} "
+            f"{c.DIM}({flush.elapsed_ms:.0f} ms){c.RESET}",
+            flush=True,
+        )
+
+    # Exit through `finally` on SIGTERM too, so the PID file is removed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    mode = "polling" if args.poll else "inotify (polling if unavailable)"
+    print(f"Watching {', '.join(note_watch.NOTE_DIRS)} and {bib_path} with {mode}; Ctrl-C to stop", flush=True)
+    try:
+        note_watch.watch(ROOT, bib_path, debounce=args.debounce, poll=args.poll, interval=args.interval, on_flush=report)
+    except KeyboardInterrupt:
+        print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Notebook maintenance tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("index", help="Update the full-text index")
+    index_parser.add_argument("--rebuild", action="store_true", help="Drop and rebuild the index from scratch")
+    index_parser.set_defaults(func=cmd_index)
+
+    search_parser = subparsers.add_parser("search", help="Full-text search over notes")
+    search_parser.add_argument("query", nargs="+", help="Search terms (all must match, prefix matching)")
+    search_parser.add_argument("-n", "--limit", type=int, default=10, help="Maximum hits (default: %(default)s)")
+    search_parser.add_argument(
+        "-s",
+        "--section",
+        action="append",
+        choices=note_search.FIELDS,
+        help="Restrict matches to a section; repeat for several",
+    )
+    search_parser.add_argument("--no-update", action="store_true", help="Skip the incremental index refresh")
+    search_parser.set_defaults(func=cmd_search)
+
+    similar_parser = subparsers.add_parser("similar", help="Notes most similar to a note or to free text (TF-IDF)")
+    similar_parser.add_argument("query", nargs="+", help="A note path, or free text")
+    similar_parser.add_argument("-n", "--limit", type=int, default=5, help="Maximum hits (default: %(default)s)")
+    similar_parser.set_defaults(func=cmd_similar)
+
+    tags_parser = subparsers.add_parser("tags", help="List, rename, merge and remove frontmatter tags")
+    tags_subparsers = tags_parser.add_subparsers(dest="tags_command", required=True)
+    tags_list_parser = tags_subparsers.add_parser("list", help="Tags with note counts")
+    tags_list_parser.add_argument("--sort", choices=["count", "name"], default="count", help="Sort order (default: %(default)s)")
+    tags_list_parser.set_defaults(func=cmd_tags_list)
+    tags_notes_parser = tags_subparsers.add_parser("notes", help="Notes carrying a tag")
+    tags_notes_parser.add_argument("tag")
+    tags_notes_parser.set_defaults(func=cmd_tags_notes)
+
+    tags_rename_parser = tags_subparsers.add_parser("rename", help="Rename a tag in every note")
+    tags_rename_parser.add_argument("old")
+    tags_rename_parser.add_argument("new")
+    tags_rename_parser.set_defaults(func=cmd_tags_rename)
+    tags_merge_parser = tags_subparsers.add_parser("merge", help="Merge several tags into one")
+    tags_merge_parser.add_argument("tags", nargs="+", help="Tags to merge")
+    tags_merge_parser.add_argument("--into", required=True, help="Resulting tag")
+    tags_merge_parser.set_defaults(func=cmd_tags_merge)
+    tags_remove_parser = tags_subparsers.add_parser("remove", help="Remove tags from every note")
+    tags_remove_parser.add_argument("tags", nargs="+")
+    tags_remove_parser.set_defaults(func=cmd_tags_remove)
+    for edit_parser in (tags_rename_parser, tags_merge_parser, tags_remove_parser):
+        edit_parser.add_argument("-n", "--dry-run", action="store_true", help="Show the changes without writing")
+        edit_parser.add_argument("--anki", action="store_true", help="Mirror the change to synced Anki notes")
+        edit_parser.add_argument("-u", "--url", default=DEFAULT_ANKI_CONNECT_URL, help="AnkiConnect URL (default: %(default)s)")
+
+    citations_parser = subparsers.add_parser(
+        "check-citations", help="Report note citekeys missing, renamed or duplicated in the BibTeX library"
+    )
+    citations_parser.add_argument("--bib", help="BibTeX file (default: src/literature-note/references.bib)")
+    citations_parser.add_argument(
+        "-j", "--jobs", type=int, default=note_citations.DEFAULT_WORKERS, help="Reader threads (default: %(default)s)"
+    )
+    citations_parser.set_defaults(func=cmd_check_citations)
+
+    fsck_parser = subparsers.add_parser(
+        "fsck", help="Find duplicate reference directories, orphan notes and broken links in literature-notebook/"
+    )
+    fsck_parser.add_argument("--bib", help="BibTeX file for expected names (default: src/literature-note/references.bib)")
+    fsck_parser.add_argument("--repair", action="store_true", help="Apply the repair plan")
+    fsck_parser.add_argument("--prune-locks", action="store_true", help="Delete lock files in tmp/locks/ that no process holds")
+    fsck_parser.set_defaults(func=cmd_fsck)
+
+    dedup_parser = subparsers.add_parser("dedup", help="Near-duplicate BibTeX entries by title and author similarity")
+    dedup_parser.add_argument("--bib", help="BibTeX file (default: src/literature-note/references.bib)")
+    dedup_parser.add_argument(
+        "-t", "--threshold", type=float, default=0.5, help="Minimum estimated Jaccard similarity (default: %(default)s)"
+    )
+    dedup_parser.add_argument("-n", "--limit", type=int, default=50, help="Clusters to show (default: %(default)s)")
+    dedup_parser.set_defaults(func=cmd_dedup)
+
+    export_parser = subparsers.add_parser("export-html", help="Render notes to static HTML, only re-rendering what changed")
+    export_parser.add_argument("-o", "--output", help="Output directory (default: tmp/html)")
+    export_parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: CPU count)")
+    export_parser.add_argument("--force", action="store_true", help="Render every page again")
+    export_parser.set_defaults(func=cmd_export_html)
+
+    watch_parser = subparsers.add_parser("watch", help="Keep the search, tag, similarity and BibTeX indexes updated as files change")
+    watch_parser.add_argument("--bib", help="BibTeX file to watch (default: src/literature-note/references.bib)")
+    watch_parser.add_argument(
+        "--debounce", type=float, default=note_watch.DEFAULT_DEBOUNCE, help="Seconds of quiet before a flush (default: %(default)s)"
+    )
+    watch_parser.add_argument("--poll", action="store_true", help="Poll mtimes instead of using inotify")
+    watch_parser.add_argument(
+        "--interval", type=float, default=note_watch.DEFAULT_POLL_INTERVAL, help="Polling interval in seconds (default: %(default)s)"
+    )
+    watch_parser.set_defaults(func=cmd_watch)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert readings (PDF, DOCX, ...) to Markdown")
+    convert_parser.add_argument("readings", help="Directory with the reading files")
+    convert_parser.add_argument("--bib", help="BibTeX file for matching (default: src/literature-note/references.bib)")
+    convert_parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: CPU count)")
+    convert_parser.add_argument("--force", action="store_true", help="Convert again even if cached")
+    convert_parser.set_defaults(func=cmd_convert)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
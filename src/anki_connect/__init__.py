@@ -1,13 +1,22 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
+import gzip
 import json
 import os
+import resource
 import urllib.request
+import zlib
+
+from src.notebook import tracing
 
 
 DEFAULT_ANKI_CONNECT_URL = os.environ.get("ANKI_CONNECT_URL", "http://localhost:8765")
+# Gzip request bodies; only for endpoints behind a proxy that accepts `Content-Encoding: gzip`
+GZIP_REQUESTS = os.environ.get("ANKI_CONNECT_GZIP", "") == "1"
+_GZIP_MIN_BYTES = 1024
+_READ_CHUNK = 64 * 1024
 
 
 @dataclass
@@ -16,24 +25,82 @@ class AnkiResponse:
     error: Optional[str]
 
 
-def _post_json(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    data = json.dumps(payload).encode("utf-8")
+def _encode_payload(payload: Dict[str, Any]) -> bytes:
+    # Compact separators and raw UTF-8 instead of \uXXXX escapes; the str is freed right after encoding
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _read_json(response: Any) -> Any:
+    """Decode a JSON response, reading (and gunzipping) the socket in chunks into one buffer."""
+    gzipped = response.headers.get("Content-Encoding", "").lower() == "gzip"
+    length = response.headers.get("Content-Length")
+    if length and not gzipped:
+        body = bytearray(int(length))
+        view = memoryview(body)
+        received = 0
+        while received < len(body):
+            read = response.readinto(view[received:])
+            if not read:
+                break
+            received += read
+        del view
+        body = body[:received] if received < len(body) else body
+        wire_bytes = received
+    else:
+        body = bytearray()
+        decompressor = zlib.decompressobj(wbits=31) if gzipped else None
+        wire_bytes = 0
+        while chunk := response.read(_READ_CHUNK):
+            wire_bytes += len(chunk)
+            body += decompressor.decompress(chunk) if decompressor else chunk
+        if decompressor:
+            body += decompressor.flush()
+    tracing.count("anki.bytes_received", wire_bytes)
+    return json.loads(body)
+
+
+def _request(url: str, data: Any, headers: Dict[str, str]) -> Any:
     request = urllib.request.Request(
         url=url,
         data=data,
-        headers={"Content-Type": "application/json"},
+        headers={"Content-Type": "application/json", "Accept-Encoding": "gzip", **headers},
         method="POST",
     )
     with urllib.request.urlopen(request) as response:
-        response_text = response.read().decode("utf-8")
-        return json.loads(response_text)
+        result = _read_json(response)
+    if tracing.enabled():
+        tracing.gauge("process.max_rss_kib", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    return result
+
+
+def _post_json(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    data = _encode_payload(payload)
+    headers: Dict[str, str] = {}
+    tracing.count("anki.http_requests")
+    tracing.count("anki.bytes_encoded", len(data))
+    if GZIP_REQUESTS and len(data) >= _GZIP_MIN_BYTES:
+        data = gzip.compress(data, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    tracing.count("anki.bytes_sent", len(data))
+    return _request(url, data, headers)
+
+
+def _post_chunks(url: str, chunks: Iterable[bytes], content_length: int) -> Dict[str, Any]:
+    """POST a request body produced chunk by chunk, without assembling it in memory."""
+    tracing.count("anki.http_requests")
+    tracing.count("anki.bytes_encoded", content_length)
+    tracing.count("anki.bytes_sent", content_length)
+    return _request(url, chunks, {"Content-Length": str(content_length)})
 
 
 def invoke(action: str, params: Optional[Dict[str, Any]] = None, version: int = 6, url: str = DEFAULT_ANKI_CONNECT_URL) -> AnkiResponse:
     payload: Dict[str, Any] = {"action": action, "version": version}
     if params is not None:
         payload["params"] = params
-    raw = _post_json(url, payload)
+    with tracing.span(f"anki.{action}"):
+        raw = _post_json(url, payload)
+    if raw.get("error"):
+        tracing.count("anki.errors")
     return AnkiResponse(result=raw.get("result"), error=raw.get("error"))
 
 
@@ -53,3 +120,12 @@ def add_notes(notes: list[dict[str, Any]], url: str = DEFAULT_ANKI_CONNECT_URL)
     if resp.error:
         raise RuntimeError(f"addNotes failed: {resp.error}")
     return resp.result
+
+
+def multi(actions: list[dict[str, Any]], url: str = DEFAULT_ANKI_CONNECT_URL) -> list[AnkiResponse]:
+    """Run several actions in one round trip. Each action is {"action": ..., "params": ...}."""
+    # With a version on every action, each result comes back as its own {"result", "error"} envelope
+    resp = invoke("multi", {"actions": [{"version": 6, **action} for action in actions]}, url=url)
+    if resp.error:
+        raise RuntimeError(f"multi failed: {resp.error}")
+    return [AnkiResponse(result=item.get("result"), error=item.get("error")) for item in resp.result or []]
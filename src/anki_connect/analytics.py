@@ -0,0 +1,280 @@
+"""
+Review statistics for the decks in `data/decks.json`.
+
+Review logs are pulled with one `multi` of `cardReviews` calls (one per deck,
+starting after the last cached review ID) and appended to a local CSV cache.
+Card state comes from `cardsInfo`, refetched only for cards reviewed since the
+last refresh. All reports are computed with vectorized pandas/numpy code over
+the cached tables, so they stay fast at hundreds of thousands of reviews.
+
+Reports:
+- Retention curve: share of passed reviews by days since the previous review,
+  plus a fitted exponential forgetting curve R(t) = exp(-t / S).
+- Per-deck difficulty: lapse rate, mean ease factor, mean answer time.
+- Due-load forecast: cards due per day and deck, estimated from each card's
+  last review and current interval.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL, invoke, multi
+from src.anki_connect.replicate import DEFAULT_DECKS_PATH, load_decks
+from src.notebook import ROOT, tracing
+
+
+DEFAULT_CACHE_DIR = ROOT / "tmp" / "anki-analytics"
+CARDS_BATCH_SIZE = 1000
+REVIEW_COLUMNS = ("id", "cid", "usn", "ease", "ivl", "last_ivl", "factor", "time", "type", "deck")
+CARD_COLUMNS = ("cid", "deck", "interval", "factor", "reps", "lapses", "type", "queue")
+# Days-since-previous-review buckets for the retention curve
+RETENTION_BINS = (0, 1, 2, 3, 5, 7, 10, 14, 21, 30, 45, 60, 90, 120, 180, 365, np.inf)
+# revlog.type: 0 learn, 1 review, 2 relearn, 3 filtered/cram
+_REVIEW_TYPE = 1
+
+
+@dataclass
+class RefreshReport:
+    new_reviews: int = 0
+    refreshed_cards: int = 0
+
+
+@dataclass
+class StatsReport:
+    retention: pd.DataFrame
+    stability_days: float
+    difficulty: pd.DataFrame
+    forecast: pd.DataFrame
+
+
+# --- Cache --------------------------------------------------------------------
+
+
+def _state_path(cache_dir: Path) -> Path:
+    return cache_dir / "state.json"
+
+
+def _load_state(cache_dir: Path) -> Dict[str, int]:
+    path = _state_path(cache_dir)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_state(state: Dict[str, int], cache_dir: Path) -> None:
+    path = _state_path(cache_dir)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def load_reviews(cache_dir: Path = DEFAULT_CACHE_DIR) -> pd.DataFrame:
+    path = cache_dir / "reviews.csv"
+    if not path.exists():
+        return pd.DataFrame(columns=REVIEW_COLUMNS)
+    reviews = pd.read_csv(
+        path,
+        dtype={"id": "int64", "cid": "int64", "usn": "int64", "ease": "int8", "ivl": "int64",
+               "last_ivl": "int64", "factor": "int32", "time": "int32", "type": "int8", "deck": "category"},
+    )
+    # A refresh interrupted after appending but before saving the state fetches the same reviews again
+    duplicated = reviews["id"].duplicated(keep="last")
+    return reviews[~duplicated].reset_index(drop=True) if duplicated.any() else reviews
+
+
+def load_cards(cache_dir: Path = DEFAULT_CACHE_DIR) -> pd.DataFrame:
+    path = cache_dir / "cards.csv"
+    if not path.exists():
+        return pd.DataFrame(columns=CARD_COLUMNS)
+    return pd.read_csv(path, dtype={"cid": "int64", "deck": "category"})
+
+
+def _fetch_new_reviews(decks: list[str], state: Dict[str, int], url: str) -> pd.DataFrame:
+    actions = [{"action": "cardReviews", "params": {"deck": deck, "startID": state.get(deck, 0)}} for deck in decks]
+    frames = []
+    for deck, resp in zip(decks, multi(actions, url=url)):
+        if resp.error:
+            raise RuntimeError(f"cardReviews failed for {deck}: {resp.error}")
+        if not resp.result:
+            continue
+        # Rows: [id, cid, usn, ease, ivl, last_ivl, factor, time, type]
+        frame = pd.DataFrame(np.asarray(resp.result, dtype="int64"), columns=REVIEW_COLUMNS[:-1])
+        frame = frame[frame["id"] > state.get(deck, 0)]
+        frame["deck"] = deck
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=REVIEW_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _fetch_cards(card_ids: np.ndarray, url: str) -> pd.DataFrame:
+    rows: list[Dict[str, Any]] = []
+    for start in range(0, len(card_ids), CARDS_BATCH_SIZE):
+        batch = [int(cid) for cid in card_ids[start:start + CARDS_BATCH_SIZE]]
+        resp = invoke("cardsInfo", {"cards": batch}, url=url)
+        if resp.error:
+            raise RuntimeError(f"cardsInfo failed: {resp.error}")
+        rows.extend(
+            {
+                "cid": card["cardId"],
+                "deck": card.get("deckName", ""),
+                "interval": card.get("interval", 0),
+                "factor": card.get("factor", 0),
+                "reps": card.get("reps", 0),
+                "lapses": card.get("lapses", 0),
+                "type": card.get("type", 0),
+                "queue": card.get("queue", 0),
+            }
+            for card in resp.result or []
+            if card
+        )
+    return pd.DataFrame(rows, columns=CARD_COLUMNS)
+
+
+@tracing.traced("analytics.refresh")
+def refresh_cache(
+    decks: list[str],
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+) -> RefreshReport:
+    """Append reviews newer than the cached ones and refetch the cards they touched."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    state = _load_state(cache_dir)
+    new_reviews = _fetch_new_reviews(decks, state, url)
+
+    reviews_path = cache_dir / "reviews.csv"
+    if len(new_reviews):
+        new_reviews.to_csv(reviews_path, mode="a", header=not reviews_path.exists(), index=False)
+    card_ids = new_reviews["cid"].unique() if len(new_reviews) else np.array([], dtype="int64")
+
+    cards = load_cards(cache_dir)
+    if len(card_ids):
+        fresh = _fetch_cards(card_ids, url)
+        cards = pd.concat([cards[~cards["cid"].isin(fresh["cid"])], fresh], ignore_index=True)
+        tmp_path = cache_dir / "cards.csv.tmp"
+        cards.to_csv(tmp_path, index=False)
+        tmp_path.replace(cache_dir / "cards.csv")
+
+    # Advance the state last. A crash before this point appends the same reviews again on the
+    # next refresh, and load_reviews drops those duplicates by review ID.
+    for deck, last_id in new_reviews.groupby("deck", observed=True)["id"].max().items():
+        state[str(deck)] = int(last_id)
+    _save_state(state, cache_dir)
+    return RefreshReport(new_reviews=len(new_reviews), refreshed_cards=len(card_ids))
+
+
+# --- Reports ------------------------------------------------------------------
+
+
+def retention_curve(reviews: pd.DataFrame) -> tuple[pd.DataFrame, float]:
+    """Pass rate of review-type answers by days since the previous review, and fitted stability S."""
+    ordered = reviews.sort_values("id")
+    # Actual days since the card's previous review (review IDs are epoch milliseconds)
+    previous = ordered.groupby("cid")["id"].shift()
+    graded = ordered[(ordered["type"] == _REVIEW_TYPE) & previous.notna()]
+    elapsed = (graded["id"].to_numpy(dtype="float64") - previous[graded.index].to_numpy()) / 86_400_000
+    passed = (graded["ease"].to_numpy() > 1).astype("float64")
+
+    buckets = pd.cut(elapsed, bins=RETENTION_BINS, right=False)
+    curve = (
+        pd.DataFrame({"bucket": buckets, "passed": passed, "elapsed": elapsed})
+        .groupby("bucket", observed=True)
+        .agg(reviews=("passed", "size"), retention=("passed", "mean"), mean_days=("elapsed", "mean"))
+        .reset_index()
+    )
+
+    # Least squares on log R = -t / S through the origin, weighted by bucket size
+    valid = curve[(curve["retention"] > 0) & (curve["retention"] < 1)]
+    t = valid["mean_days"].to_numpy()
+    log_r = np.log(valid["retention"].to_numpy())
+    w = valid["reviews"].to_numpy(dtype="float64")
+    denominator = np.sum(w * t * log_r)
+    stability = float(-np.sum(w * t * t) / denominator) if denominator < 0 else float("nan")
+    return curve, stability
+
+
+def deck_difficulty(reviews: pd.DataFrame, cards: pd.DataFrame) -> pd.DataFrame:
+    """Per-deck lapse rate, answer time and ease, hardest deck first."""
+    graded = reviews[reviews["type"] == _REVIEW_TYPE]
+    by_deck = graded.assign(lapsed=graded["ease"] == 1, seconds=graded["time"] / 1000).groupby("deck", observed=True)
+    difficulty = by_deck.agg(
+        reviews=("id", "size"),
+        lapse_rate=("lapsed", "mean"),
+        mean_answer_s=("seconds", "mean"),
+    )
+    if len(cards):
+        card_stats = cards[cards["factor"] > 0].groupby("deck", observed=True).agg(
+            cards=("cid", "size"),
+            mean_ease=("factor", lambda factor: factor.mean() / 1000),
+            lapses_per_card=("lapses", "mean"),
+        )
+        difficulty = difficulty.join(card_stats, how="outer")
+    return difficulty.sort_values("lapse_rate", ascending=False)
+
+
+def due_forecast(
+    reviews: pd.DataFrame,
+    cards: pd.DataFrame,
+    days: int = 30,
+    today: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """Cards due per day and deck over the next `days`, with overdue cards counted today.
+
+    A card's due date is estimated as its last review date plus its current interval.
+    Learning cards (negative intervals, in seconds) are due on the day of their last review.
+    """
+    today = (pd.Timestamp.now() if today is None else today).normalize()
+    last_review = reviews.groupby("cid")["id"].max()
+    scheduled = cards[cards["queue"] >= 0].set_index("cid").join(last_review.rename("last_id"), how="inner")
+
+    last_day = pd.to_datetime(scheduled["last_id"], unit="ms").dt.normalize()
+    interval_days = np.where(scheduled["interval"].to_numpy() > 0, scheduled["interval"].to_numpy(), 0)
+    due = last_day + pd.to_timedelta(interval_days, unit="D")
+    offset = ((due - today).dt.days).clip(lower=0)
+
+    window = pd.DataFrame({"deck": scheduled["deck"].to_numpy(), "day": offset.to_numpy()})
+    window = window[window["day"] < days]
+    forecast = window.groupby(["day", "deck"], observed=True).size().unstack("deck", fill_value=0)
+    forecast = forecast.reindex(np.arange(days), fill_value=0)
+    forecast.index = today + pd.to_timedelta(forecast.index, unit="D")
+    forecast.index.name = "date"
+    forecast["total"] = forecast.sum(axis=1)
+    return forecast
+
+
+@tracing.traced("analytics.report")
+def build_report(
+    decks: Optional[list[str]] = None,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    days: int = 30,
+) -> StatsReport:
+    reviews = load_reviews(cache_dir)
+    cards = load_cards(cache_dir)
+    if decks:
+        reviews = reviews[reviews["deck"].isin(decks)]
+        cards = cards[cards["deck"].isin(decks)]
+    retention, stability = retention_curve(reviews)
+    return StatsReport(
+        retention=retention,
+        stability_days=stability,
+        difficulty=deck_difficulty(reviews, cards),
+        forecast=due_forecast(reviews, cards, days=days),
+    )
+
+
+def analyze(
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    decks_path: Path = DEFAULT_DECKS_PATH,
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    days: int = 30,
+    refresh: bool = True,
+) -> tuple[Optional[RefreshReport], StatsReport]:
+    decks = load_decks(decks_path)
+    refreshed = refresh_cache(decks, url=url, cache_dir=cache_dir) if refresh else None
+    return refreshed, build_report(decks, cache_dir=cache_dir, days=days)
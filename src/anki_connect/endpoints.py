@@ -0,0 +1,127 @@
+"""
+Route requests to several AnkiConnect endpoints by deck.
+
+Separate Anki profiles or instances (say, languages on one port and academic
+decks on another) are listed in `data/decks.json` under `endpoints`, mapping
+each URL to deck patterns:
+
+    {
+      "decks": ["English", "French", "Learn::Academic", "Learn::Math-Stat"],
+      "endpoints": {
+        "http://localhost:8765": ["Learn::*"],
+        "http://localhost:8766": ["English", "French"]
+      }
+    }
+
+A pattern is a deck name, `Parent::*` (the deck and its subdecks) or `*`. The
+most specific match wins: an exact name, then the longest prefix, then `*`.
+Decks that match nothing go to the default URL. Without an `endpoints`
+section, everything goes to the default URL, as before.
+
+`fan_out` runs one job per endpoint on its own thread. It records each
+endpoint's result, error and latency, so one unreachable profile doesn't stop
+the others.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+import json
+import time
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL, multi
+from src.anki_connect.replicate import DEFAULT_DECKS_PATH
+from src.notebook import tracing
+
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class EndpointResult(Generic[T]):
+    url: str
+    result: Optional[T]
+    error: Optional[str]
+    latency_ms: float
+
+
+def _specificity(pattern: str, deck: str) -> Optional[tuple[int, int]]:
+    """How specifically `pattern` matches `deck` (higher wins), or None if it doesn't."""
+    if pattern == "*":
+        return (0, 0)
+    if pattern.endswith("::*"):
+        parent = pattern[: -len("::*")]
+        if deck == parent or deck.startswith(parent + "::"):
+            return (1, len(parent))
+        return None
+    return (2, len(pattern)) if deck == pattern else None
+
+
+class DeckRouter:
+    def __init__(self, routes: Dict[str, list[str]], default_url: str = DEFAULT_ANKI_CONNECT_URL) -> None:
+        self.routes = routes
+        self.default_url = default_url
+        self._cache: Dict[str, str] = {}
+
+    @property
+    def urls(self) -> list[str]:
+        return list(dict.fromkeys([*self.routes, self.default_url]))
+
+    @property
+    def fans_out(self) -> bool:
+        return any(url != self.default_url for url in self.routes)
+
+    def url_for(self, deck: str) -> str:
+        url = self._cache.get(deck)
+        if url is None:
+            best: tuple[tuple[int, int], str] = ((-1, 0), self.default_url)
+            for candidate, patterns in self.routes.items():
+                for pattern in patterns:
+                    score = _specificity(pattern, deck)
+                    if score is not None and score > best[0]:
+                        best = (score, candidate)
+            url = self._cache[deck] = best[1]
+        return url
+
+
+def load_router(path: Path = DEFAULT_DECKS_PATH, default_url: str = DEFAULT_ANKI_CONNECT_URL) -> DeckRouter:
+    routes: Dict[str, list[str]] = {}
+    if path.exists():
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(data, dict):
+            routes = {url: [str(pattern) for pattern in patterns] for url, patterns in data.get("endpoints", {}).items()}
+    return DeckRouter(routes, default_url)
+
+
+def _timed(url: str, job: Callable[[str], T]) -> EndpointResult[T]:
+    started = time.perf_counter()
+    with tracing.span("anki.endpoint", url=url):
+        try:
+            result: Optional[T] = job(url)
+            error = None
+        except Exception as e:
+            result, error = None, str(e) or type(e).__name__
+    return EndpointResult(url, result, error, (time.perf_counter() - started) * 1000)
+
+
+def fan_out(jobs: Dict[str, Callable[[str], T]]) -> list[EndpointResult[T]]:
+    """Run `job(url)` for every endpoint concurrently. Results come back in `jobs` order."""
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [pool.submit(_timed, url, job) for url, job in jobs.items()]
+        return [future.result() for future in futures]
+
+
+def _describe(url: str) -> Dict[str, Any]:
+    version, decks = multi([{"action": "version"}, {"action": "deckNames"}], url=url)
+    if version.error or decks.error:
+        raise RuntimeError(version.error or decks.error)
+    return {"version": version.result, "decks": decks.result or []}
+
+
+def ping(router: DeckRouter) -> list[EndpointResult[Dict[str, Any]]]:
+    """AnkiConnect version and deck names from every endpoint, fetched concurrently."""
+    return fan_out({url: _describe for url in router.urls})
@@ -0,0 +1,178 @@
+"""
+Stream the Anki collection to a local CSV or Parquet file.
+
+Note IDs come from one `findNotes` call; `notesInfo` is then requested in
+fixed-size pages with a few requests in flight at once. Pages are written in
+order as they arrive, so memory stays bounded by the number of pages in flight
+rather than the size of the collection.
+
+Each row is one note: `note_id`, `model`, `deck`, `tags` (space-separated),
+`mod` (epoch seconds), `cards` (JSON list of card IDs) and `fields` (JSON
+object of field name to value). Parquet output needs pyarrow.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+import collections
+import csv
+import json
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL, invoke
+from src.notebook import tracing
+
+
+DEFAULT_QUERY = "deck:*"
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_WORKERS = 4
+COLUMNS = ("note_id", "model", "deck", "tags", "mod", "cards", "fields")
+FORMATS = ("csv", "parquet")
+
+
+@dataclass
+class ExportReport:
+    notes: int = 0
+    pages: int = 0
+
+
+def find_note_ids(query: str = DEFAULT_QUERY, url: str = DEFAULT_ANKI_CONNECT_URL) -> list[int]:
+    resp = invoke("findNotes", {"query": query}, url=url)
+    if resp.error:
+        raise RuntimeError(f"findNotes failed: {resp.error}")
+    return sorted(resp.result or [])
+
+
+def _fetch_page(note_ids: list[int], url: str) -> list[Dict[str, Any]]:
+    resp = invoke("notesInfo", {"notes": note_ids}, url=url)
+    if resp.error:
+        raise RuntimeError(f"notesInfo failed: {resp.error}")
+    return [note for note in resp.result or [] if note]
+
+
+def _deck_names(card_ids: list[int], url: str) -> Dict[int, str]:
+    """Map card ID to deck name with one `getDecks` call per page."""
+    if not card_ids:
+        return {}
+    resp = invoke("getDecks", {"cards": card_ids}, url=url)
+    if resp.error:
+        raise RuntimeError(f"getDecks failed: {resp.error}")
+    return {card_id: deck for deck, ids in (resp.result or {}).items() for card_id in ids}
+
+
+def _to_row(note: Dict[str, Any], decks: Dict[int, str]) -> Dict[str, Any]:
+    cards = note.get("cards") or []
+    return {
+        "note_id": note["noteId"],
+        "model": note.get("modelName", ""),
+        "deck": decks.get(cards[0], "") if cards else "",
+        "tags": " ".join(note.get("tags") or []),
+        "mod": note.get("mod", 0),
+        "cards": json.dumps(cards, separators=(",", ":")),
+        "fields": json.dumps(
+            {name: field.get("value", "") for name, field in (note.get("fields") or {}).items()},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ),
+    }
+
+
+def _fetch_rows(note_ids: list[int], url: str) -> list[Dict[str, Any]]:
+    with tracing.span("export.page", notes=len(note_ids)):
+        notes = _fetch_page(note_ids, url)
+        decks = _deck_names([note["cards"][0] for note in notes if note.get("cards")], url)
+        return [_to_row(note, decks) for note in notes]
+
+
+def iter_pages(
+    note_ids: list[int],
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    workers: int = DEFAULT_WORKERS,
+) -> Iterator[list[Dict[str, Any]]]:
+    """Yield row pages in note ID order, keeping at most `workers` requests in flight."""
+    pages = (note_ids[start:start + page_size] for start in range(0, len(note_ids), page_size))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight: collections.deque[Future] = collections.deque()
+        for page in pages:
+            in_flight.append(pool.submit(_fetch_rows, page, url))
+            if len(in_flight) >= workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+class _CsvWriter:
+    def __init__(self, path: Path) -> None:
+        self.file = path.open("w", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, rows: list[Dict[str, Any]]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: Path) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Missing dependency: pyarrow. Install with `uv add pyarrow`, or export to .csv.")
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                ("note_id", pa.int64()),
+                ("model", pa.string()),
+                ("deck", pa.string()),
+                ("tags", pa.string()),
+                ("mod", pa.int64()),
+                ("cards", pa.string()),
+                ("fields", pa.string()),
+            ]
+        )
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+
+    def write(self, rows: list[Dict[str, Any]]) -> None:
+        # One row group per page keeps the writer's buffer at page size
+        self.writer.write_table(self.pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def export_notes(
+    output: Path,
+    query: str = DEFAULT_QUERY,
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    fmt: Optional[str] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    workers: int = DEFAULT_WORKERS,
+) -> ExportReport:
+    """Export notes matching `query`. The format defaults to the output suffix (.parquet, else CSV)."""
+    fmt = fmt or ("parquet" if output.suffix.lower() == ".parquet" else "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+    note_ids = find_note_ids(query, url=url)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(output.name + ".tmp")
+    writer = _ParquetWriter(tmp_path) if fmt == "parquet" else _CsvWriter(tmp_path)
+    report = ExportReport()
+    try:
+        for rows in iter_pages(note_ids, url=url, page_size=page_size, workers=workers):
+            writer.write(rows)
+            report.notes += len(rows)
+            report.pages += 1
+    except BaseException:
+        writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    writer.close()
+    tmp_path.replace(output)
+    return report
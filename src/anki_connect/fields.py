@@ -0,0 +1,128 @@
+"""
+Render Markdown card fields to the HTML Anki expects.
+
+Fields go through the notebook's Markdown renderer (`src.notebook.render`) with
+Anki conventions: a one-paragraph field has no `<p>` wrapper, newlines become
+`<br>`, math is emitted in MathJax delimiters (`\\(...\\)`, `\\[...\\]`), and
+cloze markers (`{{c1::answer::hint}}`) are kept, with their answer and hint
+rendered as Markdown. Plain text comes out exactly as escaped text did before,
+so existing cards keep their content hashes.
+
+Rendered fields are memoized in an LRU keyed by the SHA-1 of their Markdown.
+Fields repeat a lot (every card of a note shares its title and source), so
+most lookups are hits. `render_fields` renders a batch: it deduplicates,
+answers what it can from the cache, and sends the rest to a process pool when
+there are enough of them to pay for starting one.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+import hashlib
+import html
+import os
+import re
+import threading
+
+from src.notebook import tracing
+from src.notebook.render import Renderer
+
+
+DEFAULT_CACHE_SIZE = 32768
+# Below this many uncached fields, rendering in-process beats starting a pool
+POOL_THRESHOLD = 2000
+_CHUNKSIZE = 256
+# Anything the renderer could treat as Markdown; fields without it are only escaped
+_MARKUP_RE = re.compile(r"[*_`\[!$\\~={<|]|^[ \t]*(?:[-+#>:]|\d+[.)])", re.MULTILINE)
+
+
+class FieldCache:
+    """Thread-safe LRU of rendered fields keyed by the SHA-1 digest of their Markdown."""
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._items: OrderedDict[bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, digest: bytes) -> Optional[str]:
+        with self._lock:
+            rendered = self._items.get(digest)
+            if rendered is not None:
+                self._items.move_to_end(digest)
+        tracing.count("anki.field_cache.hits" if rendered is not None else "anki.field_cache.misses")
+        return rendered
+
+    def put(self, digest: bytes, rendered: str) -> None:
+        with self._lock:
+            self._items[digest] = rendered
+            self._items.move_to_end(digest)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_cache = FieldCache()
+
+
+def field_digest(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def _render(text: str) -> str:
+    text = text.strip()
+    if not _MARKUP_RE.search(text):
+        return html.escape(text, quote=False).replace("\n", "<br>")
+    return Renderer(hard_breaks=True).render(text, compact=True)
+
+
+def render_field(text: str, cache: FieldCache = _cache) -> str:
+    """Anki-ready HTML for one Markdown field."""
+    digest = field_digest(text)
+    rendered = cache.get(digest)
+    if rendered is None:
+        rendered = _render(text)
+        cache.put(digest, rendered)
+    return rendered
+
+
+@tracing.traced("anki.render_fields")
+def render_fields(texts: Iterable[str], workers: Optional[int] = None, cache: FieldCache = _cache) -> list[str]:
+    """Render many fields at once, in input order. Uncached fields go to a process pool if there are many."""
+    texts = list(texts)
+    digests = [field_digest(text) for text in texts]
+    rendered: Dict[bytes, str] = {}
+    pending: Dict[bytes, str] = {}
+    for digest, text in zip(digests, texts):
+        if digest in rendered or digest in pending:
+            continue
+        cached = cache.get(digest)
+        if cached is None:
+            pending[digest] = text
+        else:
+            rendered[digest] = cached
+
+    workers = workers or os.cpu_count() or 1
+    if len(pending) >= POOL_THRESHOLD and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_render, pending.values(), chunksize=_CHUNKSIZE)
+            rendered.update(zip(pending, results))
+    else:
+        rendered.update((digest, _render(text)) for digest, text in pending.items())
+    for digest in pending:
+        cache.put(digest, rendered[digest])
+    tracing.count("anki.fields_rendered", len(pending))
+    return [rendered[digest] for digest in digests]
+
+
+def render_notes(notes: list[Dict[str, Any]], workers: Optional[int] = None) -> list[Dict[str, Any]]:
+    """Copies of `addNotes` payloads with every field rendered from Markdown in one batch."""
+    names = [list(note.get("fields", {})) for note in notes]
+    rendered = iter(render_fields((note["fields"][name] for note, keys in zip(notes, names) for name in keys), workers=workers))
+    return [{**note, "fields": {name: next(rendered) for name in keys}} for note, keys in zip(notes, names)]
@@ -0,0 +1,254 @@
+"""
+Media sync: upload images referenced by notes to Anki's media folder.
+
+Referenced files are hashed and compared with the names Anki already has
+(`getMediaFilesNames`) and the hashes recorded at the last upload, so only
+missing or changed files are sent. Uploads are batched into `multi` requests of
+`storeMediaFile` actions whose JSON body is streamed: each file is read and
+base64-encoded in chunks rather than loaded whole.
+
+With several AnkiConnect endpoints (`src.anki_connect.endpoints`),
+`sync_media_fan_out` uploads each note's images to the endpoints its cards are
+routed to, concurrently. The upload state is kept per endpoint URL.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+import base64
+import hashlib
+import json
+import re
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL, _post_chunks, invoke
+from src.anki_connect.endpoints import EndpointResult, fan_out
+from src.notebook import tracing
+from src.notebook import ROOT, iter_note_paths
+
+
+DEFAULT_STATE_PATH = ROOT / "tmp" / "anki-media-state.json"
+IMAGES_DIR = ROOT / "images"
+# Multiple of 3 so consecutive chunks base64-encode without padding in between
+READ_CHUNK = 3 * 64 * 1024
+BATCH_FILES = 32
+BATCH_BYTES = 32 * 1024 * 1024
+
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)>?(?:\s+\"[^\"]*\")?\s*\)|<img\s[^>]*src=\"([^\"]+)\"")
+
+
+@dataclass(frozen=True)
+class MediaFile:
+    name: str
+    path: Path
+    size: int
+    digest: str
+
+
+@dataclass
+class MediaReport:
+    uploaded: int = 0
+    unchanged: int = 0
+    missing_locally: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+
+def media_name(path: Path, root: Path = ROOT) -> str:
+    """Anki media folder name for a local file; Anki's media namespace is flat."""
+    path = path.resolve()
+    for base in (root / "images", root):
+        try:
+            return path.relative_to(base.resolve()).as_posix().replace("/", "__")
+        except ValueError:
+            continue
+    return path.name
+
+
+def _resolve_reference(target: str, note_path: Path, root: Path) -> Optional[Path]:
+    if re.match(r"^[a-z][a-z0-9+.-]*:", target, re.IGNORECASE):
+        return None  # URL, not a local file
+    # Snippets write root-relative `/images/...`; anything else is relative to the note
+    candidate = root / target.lstrip("/") if target.startswith("/") else note_path.parent / target
+    return candidate.resolve()
+
+
+def find_media_references(note_paths: Iterable[Path], root: Path = ROOT) -> tuple[Dict[str, Path], list[str]]:
+    """Return ({media name: local path}, [references whose file does not exist])."""
+    found: Dict[str, Path] = {}
+    missing: list[str] = []
+    for note_path in note_paths:
+        text = note_path.read_text(encoding="utf-8")
+        for match in _IMAGE_RE.finditer(text):
+            target = match.group(1) or match.group(2)
+            local = _resolve_reference(target, note_path, root)
+            if local is None:
+                continue
+            if not local.is_file():
+                missing.append(f"{note_path.relative_to(root).as_posix()}: {target}")
+                continue
+            found[media_name(local, root)] = local
+    return found, missing
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state(state_path: Path = DEFAULT_STATE_PATH) -> Dict[str, Dict[str, str]]:
+    """Uploaded file digests by endpoint URL, then media name."""
+    if not state_path.exists():
+        return {}
+    data = json.loads(state_path.read_text(encoding="utf-8"))
+    if data and all(isinstance(value, str) for value in data.values()):
+        # Written before uploads were tracked per endpoint
+        return {DEFAULT_ANKI_CONNECT_URL: data}
+    return data
+
+
+def save_state(state: Dict[str, Dict[str, str]], state_path: Path = DEFAULT_STATE_PATH) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_suffix(state_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(state_path)
+
+
+def plan_media(
+    references: Dict[str, Path],
+    state: Dict[str, str],
+    anki_names: set[str],
+) -> tuple[list[MediaFile], int]:
+    """Return (files to upload, number unchanged)."""
+    uploads: list[MediaFile] = []
+    unchanged = 0
+    for name, path in sorted(references.items()):
+        digest = _hash_file(path)
+        if name in anki_names and state.get(name) == digest:
+            unchanged += 1
+            continue
+        uploads.append(MediaFile(name=name, path=path, size=path.stat().st_size, digest=digest))
+    return uploads, unchanged
+
+
+def _base64_chunks(path: Path) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            yield base64.b64encode(chunk)
+
+
+def _encoded_length(size: int) -> int:
+    return 4 * ((size + 2) // 3)
+
+
+def _store_batch_body(batch: list[MediaFile]) -> tuple[Iterator[bytes], int]:
+    """Build a streamed `multi` body of storeMediaFile actions and its exact length."""
+    parts: list[tuple[bytes, Optional[MediaFile]]] = [(b'{"action": "multi", "version": 6, "params": {"actions": [', None)]
+    for idx, media in enumerate(batch):
+        head = '{"action": "storeMediaFile", "version": 6, "params": {"filename": %s, "data": "' % json.dumps(media.name)
+        parts.append(((", " if idx else "").encode("utf-8") + head.encode("utf-8"), None))
+        parts.append((b"", media))
+        parts.append((b'"}}', None))
+    parts.append((b"]}}", None))
+
+    length = sum(len(raw) for raw, _ in parts) + sum(_encoded_length(m.size) for _, m in parts if m)
+
+    def _chunks() -> Iterator[bytes]:
+        for raw, media in parts:
+            if media is None:
+                yield raw
+            else:
+                yield from _base64_chunks(media.path)
+
+    return _chunks(), length
+
+
+def _batches(files: list[MediaFile]) -> Iterator[list[MediaFile]]:
+    batch: list[MediaFile] = []
+    batch_bytes = 0
+    for media in files:
+        if batch and (len(batch) >= BATCH_FILES or batch_bytes + media.size > BATCH_BYTES):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(media)
+        batch_bytes += media.size
+    if batch:
+        yield batch
+
+
+def upload_media(
+    files: list[MediaFile],
+    state: Dict[str, str],
+    report: MediaReport,
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+) -> None:
+    for batch in _batches(files):
+        body, length = _store_batch_body(batch)
+        with tracing.span("anki.storeMediaFile", files=len(batch)):
+            raw: Dict[str, Any] = _post_chunks(url, body, length)
+        if raw.get("error"):
+            report.errors.append(f"storeMediaFile batch failed: {raw['error']}")
+            continue
+        for media, item in zip(batch, raw.get("result") or []):
+            error = item.get("error")
+            if error:
+                report.errors.append(f"{media.name}: {error}")
+                continue
+            state[media.name] = media.digest
+            report.uploaded += 1
+
+
+def _sync_endpoint(
+    note_paths: Iterable[Path],
+    url: str,
+    state: Dict[str, str],
+    dry_run: bool,
+) -> tuple[list[MediaFile], MediaReport]:
+    references, missing = find_media_references(note_paths, ROOT)
+    report = MediaReport(missing_locally=missing)
+    if not references:
+        return [], report
+
+    resp = invoke("getMediaFilesNames", {"pattern": "*"}, url=url)
+    if resp.error:
+        raise RuntimeError(f"getMediaFilesNames failed: {resp.error}")
+    uploads, report.unchanged = plan_media(references, state, set(resp.result or []))
+    if not dry_run:
+        upload_media(uploads, state, report, url=url)
+    return uploads, report
+
+
+def sync_media(
+    note_paths: Optional[Iterable[Path]] = None,
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    state_path: Path = DEFAULT_STATE_PATH,
+    dry_run: bool = False,
+) -> tuple[list[MediaFile], MediaReport]:
+    state = load_state(state_path)
+    try:
+        return _sync_endpoint(note_paths or iter_note_paths(ROOT), url, state.setdefault(url, {}), dry_run)
+    finally:
+        if not dry_run:
+            save_state(state, state_path)
+
+
+@tracing.traced("media.fan_out")
+def sync_media_fan_out(
+    targets: Dict[str, list[Path]],
+    state_path: Path = DEFAULT_STATE_PATH,
+    dry_run: bool = False,
+) -> list[EndpointResult[tuple[list[MediaFile], MediaReport]]]:
+    """Upload the images of each endpoint's notes (`targets`: URL -> note paths) concurrently."""
+    state = load_state(state_path)
+    parts = {url: state.setdefault(url, {}) for url in targets}
+    jobs = {
+        url: (lambda url, paths=paths: _sync_endpoint(paths, url, parts[url], dry_run))
+        for url, paths in targets.items()
+    }
+    try:
+        return fan_out(jobs)
+    finally:
+        if not dry_run:
+            save_state(state, state_path)
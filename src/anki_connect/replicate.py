@@ -0,0 +1,117 @@
+"""
+Replicate the deck and note type structure into an Anki profile.
+
+Current decks and models are fetched in one `multi` request, diffed against
+`data/decks.json` and the note type definitions, and every missing deck and
+model is created in a second `multi` request. Running it again is a no-op.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+import json
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL, multi
+from src.notebook import ROOT
+
+
+DEFAULT_DECKS_PATH = ROOT / "data" / "decks.json"
+DEFAULT_NOTE_TYPES_PATH = ROOT / "data" / "note_types.json"
+
+
+@dataclass
+class ReplicationPlan:
+    missing_decks: list[str] = field(default_factory=list)
+    missing_models: list[Dict[str, Any]] = field(default_factory=list)
+    existing_decks: int = 0
+    existing_models: int = 0
+
+    @property
+    def empty(self) -> bool:
+        return not self.missing_decks and not self.missing_models
+
+
+def load_decks(path: Path = DEFAULT_DECKS_PATH) -> list[str]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    decks = data.get("decks", []) if isinstance(data, dict) else data
+    return [str(deck) for deck in decks]
+
+
+def load_note_types(path: Path = DEFAULT_NOTE_TYPES_PATH) -> list[Dict[str, Any]]:
+    """Load `createModel` parameter sets: a list, or a mapping of model name to definition."""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("models", data)
+    if isinstance(data, dict):
+        return [{"modelName": name, **definition} for name, definition in data.items()]
+    return list(data)
+
+
+def _model_params(definition: Dict[str, Any]) -> Dict[str, Any]:
+    params: Dict[str, Any] = {
+        "modelName": definition["modelName"],
+        "inOrderFields": definition.get("inOrderFields") or definition.get("fields", []),
+        "cardTemplates": definition.get("cardTemplates") or definition.get("templates", []),
+    }
+    for key in ("css", "isCloze"):
+        if key in definition:
+            params[key] = definition[key]
+    return params
+
+
+def plan_replication(
+    decks: list[str],
+    note_types: list[Dict[str, Any]],
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+) -> ReplicationPlan:
+    deck_resp, model_resp = multi(
+        [{"action": "deckNames"}, {"action": "modelNames"}],
+        url=url,
+    )
+    for name, resp in (("deckNames", deck_resp), ("modelNames", model_resp)):
+        if resp.error:
+            raise RuntimeError(f"{name} failed: {resp.error}")
+
+    current_decks = set(deck_resp.result or [])
+    current_models = set(model_resp.result or [])
+    plan = ReplicationPlan()
+    for deck in dict.fromkeys(decks):
+        if deck in current_decks:
+            plan.existing_decks += 1
+        else:
+            plan.missing_decks.append(deck)
+    for definition in note_types:
+        if definition["modelName"] in current_models:
+            plan.existing_models += 1
+        else:
+            plan.missing_models.append(_model_params(definition))
+    return plan
+
+
+def apply_replication(plan: ReplicationPlan, url: str = DEFAULT_ANKI_CONNECT_URL) -> list[str]:
+    """Create everything in the plan with one request. Returns error messages."""
+    if plan.empty:
+        return []
+    actions = [{"action": "createDeck", "params": {"deck": deck}} for deck in plan.missing_decks]
+    actions += [{"action": "createModel", "params": params} for params in plan.missing_models]
+    labels = plan.missing_decks + [params["modelName"] for params in plan.missing_models]
+    return [
+        f"{label}: {resp.error}"
+        for label, resp in zip(labels, multi(actions, url=url))
+        if resp.error
+    ]
+
+
+def replicate(
+    decks_path: Path = DEFAULT_DECKS_PATH,
+    note_types_path: Optional[Path] = DEFAULT_NOTE_TYPES_PATH,
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    dry_run: bool = False,
+) -> tuple[ReplicationPlan, list[str]]:
+    decks = load_decks(decks_path)
+    note_types = load_note_types(note_types_path) if note_types_path and note_types_path.exists() else []
+    plan = plan_replication(decks, note_types, url=url)
+    if dry_run:
+        return plan, []
+    return plan, apply_replication(plan, url=url)
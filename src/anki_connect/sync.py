@@ -0,0 +1,518 @@
+"""
+Incremental Markdown-to-Anki sync.
+
+Cards are parsed from the `## Cue (Keywords / Questions)` section of notes:
+
+- `### English Vocabulary` bullets written as `- front :: back` (optionally
+  `:: pronunciation`) become `language_vocab` notes.
+- Any other Cue bullet containing a cloze marker (`{{c1::...}}`) becomes an
+  `academic_cloze` note.
+
+Fields are written in Markdown and rendered to HTML in one batch per sync
+(`src.anki_connect.fields`); images point at their Anki media names.
+
+Each card has a stable key (source path + model + front/first cloze answer)
+and a content hash. The local state file maps keys to (hash, Anki note ID,
+deck, tags), so a sync only sends adds, updates for changed hashes, and
+deletes for cards that disappeared, batched into a few requests. An update
+rewrites the fields and applies tag and deck changes (`addTags`/`removeTags`,
+`changeDeck`). Adds go out as one `addNote` action per card, so a duplicate
+fails on its own and every note that did get added is recorded.
+
+When `data/decks.json` routes decks to several endpoints (see
+`src.anki_connect.endpoints`), the plan is split by endpoint and the parts are
+applied concurrently. Updates and deletes go to the endpoint of the deck the
+note was synced into. A card whose new deck lives on another endpoint is
+deleted there and added on its new endpoint.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+import hashlib
+import json
+import re
+import threading
+
+from src.anki_connect import DEFAULT_ANKI_CONNECT_URL, invoke, multi
+from src.anki_connect.endpoints import DeckRouter, EndpointResult, fan_out
+from src.anki_connect.fields import render_fields
+from src.anki_connect.media import _resolve_reference, media_name
+from src.notebook import ROOT, expand_note_paths, frontmatter_list, frontmatter_value, iter_note_paths, parse_sections, split_frontmatter, tracing
+from src.notebook.tags import TagChange
+
+
+DEFAULT_STATE_PATH = ROOT / "tmp" / "anki-sync-state.json"
+DEFAULT_ACADEMIC_DECK = "Learn::Academic"
+DEFAULT_VOCAB_DECK = "English"
+SYNC_TAG = "learn-sync"
+BATCH_SIZE = 500
+
+_SUBHEADING_RE = re.compile(r"^###\s+(.+?)\s*$", re.MULTILINE)
+_BULLET_RE = re.compile(r"^\s*[-*]\s+(.+?)\s*$", re.MULTILINE)
+_CLOZE_RE = re.compile(r"\{\{c\d+::(.+?)(?:::.*?)?\}\}")
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_IMAGE_RE = re.compile(r"(!\[[^\]]*\]\(\s*<?)([^)\s>]+)")
+# Serializes state writes from concurrent endpoint threads (see `apply_fan_out`)
+_state_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Card:
+    key: str
+    model: str
+    deck: str
+    fields: Dict[str, str]
+    tags: tuple[str, ...]
+
+    @property
+    def content_hash(self) -> str:
+        payload = json.dumps([self.model, self.deck, self.fields, self.tags], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def to_anki_note(self) -> Dict[str, Any]:
+        return {
+            "deckName": self.deck,
+            "modelName": self.model,
+            "fields": self.fields,
+            "tags": list(self.tags),
+            "options": {"allowDuplicate": False, "duplicateScope": "deck"},
+        }
+
+
+@dataclass
+class SyncPlan:
+    adds: list[Card] = field(default_factory=list)
+    updates: list[tuple[Card, int]] = field(default_factory=list)
+    deletes: list[tuple[str, int]] = field(default_factory=list)
+    unchanged: int = 0
+
+
+@dataclass
+class SyncReport:
+    added: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+    errors: list[str] = field(default_factory=list)
+    endpoints: list[EndpointResult[SyncReport]] = field(default_factory=list)
+
+
+def _with_media_names(text: str, note_path: Path, root: Path) -> str:
+    """Point Markdown images at the names `media` uploads them under."""
+
+    def swap(match: re.Match[str]) -> str:
+        local = _resolve_reference(match.group(2), note_path, root)
+        return match.group(1) + media_name(local, root) if local is not None else match.group(0)
+
+    return _IMAGE_RE.sub(swap, text)
+
+
+def _subsections(content: str) -> list[tuple[str, str]]:
+    """Split a section body on `###` headings. Text before the first one has an empty heading."""
+    matches = list(_SUBHEADING_RE.finditer(content))
+    first_start = matches[0].start() if matches else len(content)
+    parts = [("", content[:first_start])]
+    for idx, match in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(content)
+        parts.append((match.group(1), content[match.end():end]))
+    return parts
+
+
+def anki_tag(tag: str) -> str:
+    """Anki tags cannot contain spaces."""
+    return re.sub(r"\s+", "_", tag.strip())
+
+
+def _anki_tags(note_tags: Iterable[str]) -> tuple[str, ...]:
+    tags = {SYNC_TAG}
+    tags.update(anki_tag(tag) for tag in note_tags if tag.strip())
+    return tuple(sorted(tags))
+
+
+def render_cards(cards: list[Card], workers: Optional[int] = None) -> list[Card]:
+    """Render every card's Markdown fields to HTML in one batch."""
+    rendered = iter(render_fields((text for card in cards for text in card.fields.values()), workers=workers))
+    return [replace(card, fields={name: next(rendered) for name in card.fields}) for card in cards]
+
+
+def parse_cards(
+    note_path: Path,
+    root: Path = ROOT,
+    academic_deck: str = DEFAULT_ACADEMIC_DECK,
+    vocab_deck: str = DEFAULT_VOCAB_DECK,
+) -> list[Card]:
+    """Cards from one note, with fields rendered to HTML."""
+    return render_cards(_parse_markdown_cards(note_path, root, academic_deck, vocab_deck))
+
+
+def _parse_markdown_cards(
+    note_path: Path,
+    root: Path,
+    academic_deck: str,
+    vocab_deck: str,
+) -> list[Card]:
+    """Cards from one note, with fields still in Markdown."""
+    rel = note_path.relative_to(root).as_posix()
+    frontmatter, body = split_frontmatter(note_path.read_text(encoding="utf-8"))
+    title = frontmatter_value(frontmatter, "title") or note_path.stem
+    tags = _anki_tags(frontmatter_list(frontmatter, "tags"))
+
+    cards: list[Card] = []
+    seen: dict[str, int] = {}
+
+    def _add(model: str, identity: str, deck: str, fields: Dict[str, str]) -> None:
+        key = f"{rel}::{model}::{identity.strip().lower()}"
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1:
+            key = f"{key}#{seen[key]}"
+        fields = {name: _with_media_names(text.strip(), note_path, root) for name, text in fields.items()}
+        cards.append(Card(key=key, model=model, deck=deck, fields=fields, tags=tags))
+
+    for heading, content in parse_sections(_COMMENT_RE.sub("", body)):
+        if not heading.startswith("Cue"):
+            continue
+        for subheading, sub_content in _subsections(content):
+            for bullet in _BULLET_RE.findall(sub_content):
+                if subheading.startswith("English Vocabulary"):
+                    parts = [part.strip() for part in bullet.split("::")]
+                    if len(parts) < 2 or not parts[0] or not parts[1]:
+                        continue
+                    _add(
+                        "language_vocab",
+                        parts[0],
+                        vocab_deck,
+                        {
+                            "front": parts[0],
+                            "back": parts[1],
+                            "pronunciation": parts[2] if len(parts) > 2 else "",
+                        },
+                    )
+                    continue
+
+                cloze = _CLOZE_RE.search(bullet)
+                if not cloze:
+                    continue
+                _add(
+                    "academic_cloze",
+                    cloze.group(1),
+                    academic_deck,
+                    {
+                        "title": title,
+                        "Text": bullet,
+                        "source": rel,
+                    },
+                )
+    return cards
+
+
+def load_state(state_path: Path = DEFAULT_STATE_PATH) -> Dict[str, Dict[str, Any]]:
+    if not state_path.exists():
+        return {}
+    return json.loads(state_path.read_text(encoding="utf-8"))
+
+
+def save_state(state: Dict[str, Dict[str, Any]], state_path: Path = DEFAULT_STATE_PATH) -> None:
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = state_path.with_suffix(state_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(state, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(state_path)
+
+
+@tracing.traced("sync.plan")
+def plan_sync(
+    cards: Iterable[Card],
+    state: Dict[str, Dict[str, Any]],
+    scope: Optional[list[str]] = None,
+) -> SyncPlan:
+    """Diff parsed cards against the state. Deletes are limited to keys under `scope` path prefixes."""
+    plan = SyncPlan()
+    desired = {card.key: card for card in cards}
+    for key, card in desired.items():
+        entry = state.get(key)
+        if entry is None:
+            plan.adds.append(card)
+        elif entry["hash"] != card.content_hash:
+            plan.updates.append((card, entry["note_id"]))
+        else:
+            plan.unchanged += 1
+    for key, entry in state.items():
+        if key in desired:
+            continue
+        if scope is not None and not any(key.startswith(prefix) for prefix in scope):
+            continue
+        plan.deletes.append((key, entry["note_id"]))
+    return plan
+
+
+def _batches(items: list[Any], size: int = BATCH_SIZE) -> Iterable[list[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _state_entry(card: Card, note_id: int) -> Dict[str, Any]:
+    return {"hash": card.content_hash, "note_id": note_id, "deck": card.deck, "tags": list(card.tags)}
+
+
+def _card_ids(note_ids: list[int], url: str) -> Dict[int, list[int]]:
+    """Card IDs of each note, needed to move notes between decks."""
+    if not note_ids:
+        return {}
+    resp = invoke("notesInfo", {"notes": note_ids}, url=url)
+    if resp.error:
+        raise RuntimeError(f"notesInfo failed: {resp.error}")
+    return {info["noteId"]: info.get("cards", []) for info in resp.result or [] if info}
+
+
+def _update_actions(card: Card, note_id: int, entry: Dict[str, Any], card_ids: Dict[int, list[int]]) -> list[Dict[str, Any]]:
+    """Field update plus whatever tag and deck changes the card has since it was last synced."""
+    actions: list[Dict[str, Any]] = [
+        {"action": "updateNoteFields", "params": {"note": {"id": note_id, "fields": card.fields}}}
+    ]
+    # States written before tags were recorded only get tags added, never removed
+    previous = set(entry.get("tags", ()))
+    removed = sorted(previous - set(card.tags))
+    added = sorted(set(card.tags) - previous)
+    if removed:
+        actions.append({"action": "removeTags", "params": {"notes": [note_id], "tags": " ".join(removed)}})
+    if added:
+        actions.append({"action": "addTags", "params": {"notes": [note_id], "tags": " ".join(added)}})
+    if entry.get("deck") != card.deck and card_ids.get(note_id):
+        actions.append({"action": "changeDeck", "params": {"cards": card_ids[note_id], "deck": card.deck}})
+    return actions
+
+
+@tracing.traced("sync.apply")
+def apply_plan(
+    plan: SyncPlan,
+    state: Dict[str, Dict[str, Any]],
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+) -> SyncReport:
+    """Send the plan to Anki and update `state` in place for every operation that succeeded."""
+    report = SyncReport(unchanged=plan.unchanged)
+
+    for batch in _batches(plan.adds):
+        # One addNote per card: addNotes rejects the whole response if any single note fails
+        actions = [{"action": "addNote", "params": {"note": card.to_anki_note()}} for card in batch]
+        for card, resp in zip(batch, multi(actions, url=url)):
+            if resp.error or resp.result is None:
+                report.errors.append(f"add failed for {card.key}: {resp.error or 'duplicate or invalid'}")
+                continue
+            with _state_lock:
+                state[card.key] = _state_entry(card, resp.result)
+            report.added += 1
+
+    for batch in _batches(plan.updates):
+        entries = [state.get(card.key, {}) for card, _ in batch]
+        moved = [note_id for (card, note_id), entry in zip(batch, entries) if entry.get("deck") != card.deck]
+        card_ids = _card_ids(moved, url)
+        per_card = [_update_actions(card, note_id, entry, card_ids) for (card, note_id), entry in zip(batch, entries)]
+        responses = iter(multi([action for actions in per_card for action in actions], url=url))
+        for (card, note_id), actions in zip(batch, per_card):
+            fields_resp, *rest = [next(responses) for _ in actions]
+            if fields_resp.error:
+                # Most likely deleted in Anki; forget it so the next sync re-adds it
+                report.errors.append(f"update failed for {card.key}: {fields_resp.error}")
+                with _state_lock:
+                    state.pop(card.key, None)
+                continue
+            errors = [resp.error for resp in rest if resp.error]
+            if errors:
+                # Keep the old entry so the next sync retries the tag or deck change
+                report.errors.append(f"update failed for {card.key}: {'; '.join(errors)}")
+                continue
+            with _state_lock:
+                state[card.key] = _state_entry(card, note_id)
+            report.updated += 1
+
+    for batch in _batches(plan.deletes):
+        resp = invoke("deleteNotes", {"notes": [note_id for _, note_id in batch]}, url=url)
+        if resp.error:
+            report.errors.append(f"deleteNotes failed: {resp.error}")
+            continue
+        with _state_lock:
+            for key, note_id in batch:
+                # A card moved to another endpoint may already have been re-added there under the same key
+                if state.get(key, {}).get("note_id") == note_id:
+                    del state[key]
+                report.deleted += 1
+
+    return report
+
+
+def split_plan(plan: SyncPlan, state: Dict[str, Dict[str, Any]], router: DeckRouter) -> Dict[str, SyncPlan]:
+    """Split a plan by endpoint URL.
+
+    Adds go to the endpoint of the card's deck. Updates and deletes go to the endpoint holding the note,
+    found from the deck recorded in the state (the default URL for entries without one). An update whose
+    new deck is served by another endpoint becomes a delete there and an add on the new endpoint.
+    """
+
+    def holder(key: str) -> str:
+        deck = state.get(key, {}).get("deck")
+        return router.url_for(deck) if deck else router.default_url
+
+    plans: Dict[str, SyncPlan] = {}
+    for card in plan.adds:
+        plans.setdefault(router.url_for(card.deck), SyncPlan()).adds.append(card)
+    for card, note_id in plan.updates:
+        source, target = holder(card.key), router.url_for(card.deck)
+        if source == target:
+            plans.setdefault(target, SyncPlan()).updates.append((card, note_id))
+        else:
+            plans.setdefault(source, SyncPlan()).deletes.append((card.key, note_id))
+            plans.setdefault(target, SyncPlan()).adds.append(card)
+    for key, note_id in plan.deletes:
+        plans.setdefault(holder(key), SyncPlan()).deletes.append((key, note_id))
+    return plans
+
+
+def apply_fan_out(plan: SyncPlan, state: Dict[str, Dict[str, Any]], router: DeckRouter) -> SyncReport:
+    """Apply each endpoint's part of the plan concurrently and merge the reports.
+
+    Threads write `state` under a lock; only a card moving between endpoints is touched by two of them.
+    An endpoint that fails outright is reported and leaves its cards as they were, so the next sync
+    retries them.
+    """
+    report = SyncReport(unchanged=plan.unchanged)
+    parts = split_plan(plan, state, router)
+    jobs = {url: (lambda url, part=part: apply_plan(part, state, url=url)) for url, part in parts.items()}
+    for result in fan_out(jobs):
+        report.endpoints.append(result)
+        if result.result is None:
+            report.errors.append(f"{result.url}: {result.error}")
+            continue
+        report.added += result.result.added
+        report.updated += result.result.updated
+        report.deleted += result.result.deleted
+        report.errors.extend(f"{result.url}: {error}" for error in result.result.errors)
+    return report
+
+
+def _mirror_tags(changes: list[TagChange], state: Dict[str, Dict[str, Any]], url: str) -> int:
+    note_ids_by_path: Dict[str, list[int]] = {}
+    for key, entry in state.items():
+        note_ids_by_path.setdefault(key.split("::", 1)[0], []).append(entry["note_id"])
+
+    adds: Dict[str, set[int]] = {}
+    removes: Dict[str, set[int]] = {}
+    touched: set[int] = set()
+    for change in changes:
+        note_ids = note_ids_by_path.get(change.path)
+        if not note_ids:
+            continue
+        touched.update(note_ids)
+        for tag in change.added:
+            adds.setdefault(anki_tag(tag), set()).update(note_ids)
+        for tag in change.removed:
+            removes.setdefault(anki_tag(tag), set()).update(note_ids)
+
+    actions = [{"action": "removeTags", "params": {"notes": sorted(ids), "tags": tag}} for tag, ids in removes.items()]
+    actions += [{"action": "addTags", "params": {"notes": sorted(ids), "tags": tag}} for tag, ids in adds.items()]
+    if not actions:
+        return 0
+    errors = [resp.error for resp in multi(actions, url=url) if resp.error]
+    if errors:
+        raise RuntimeError(f"Anki tag update failed: {'; '.join(errors)}")
+    return len(touched)
+
+
+@tracing.traced("sync.mirror_tags")
+def mirror_tag_changes(
+    changes: Iterable[TagChange],
+    state: Dict[str, Dict[str, Any]],
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    router: Optional[DeckRouter] = None,
+) -> int:
+    """Apply note tag edits to the Anki notes synced from those notes. Returns the number touched.
+
+    Each added or removed tag becomes one `addTags`/`removeTags` action covering every affected
+    Anki note, and all actions go in a single `multi` request per endpoint.
+    """
+    changes = list(changes)
+    by_url: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for key, entry in state.items():
+        deck = entry.get("deck")
+        target = router.url_for(deck) if router is not None and deck else url
+        by_url.setdefault(target, {})[key] = entry
+    if len(by_url) <= 1:
+        return _mirror_tags(changes, state, next(iter(by_url), url))
+
+    results = fan_out({target: (lambda target, part=part: _mirror_tags(changes, part, target)) for target, part in by_url.items()})
+    errors = [f"{result.url}: {result.error}" for result in results if result.error]
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return sum(result.result or 0 for result in results)
+
+
+@tracing.traced("sync.collect_cards")
+def collect_cards(
+    paths: Optional[list[Path]] = None,
+    root: Path = ROOT,
+    academic_deck: str = DEFAULT_ACADEMIC_DECK,
+    vocab_deck: str = DEFAULT_VOCAB_DECK,
+) -> tuple[list[Card], Optional[list[str]]]:
+    """Parse cards from `paths` (files or directories), or from every note when omitted.
+
+    Returns the cards and the key prefixes that define the delete scope.
+    """
+    if not paths:
+        note_paths: Iterable[Path] = iter_note_paths(root)
+        scope = None
+    else:
+        resolved = [path.resolve() for path in paths]
+        note_paths = expand_note_paths(resolved)
+        scope = []
+        for path in resolved:
+            prefix = path.relative_to(root).as_posix()
+            scope.append(prefix + "::" if path.is_file() else prefix.rstrip("/") + "/")
+
+    cards: list[Card] = []
+    for note_path in note_paths:
+        cards.extend(_parse_markdown_cards(note_path, root, academic_deck, vocab_deck))
+    return render_cards(cards), scope
+
+
+def media_targets(
+    note_paths: Iterable[Path],
+    router: DeckRouter,
+    root: Path = ROOT,
+    academic_deck: str = DEFAULT_ACADEMIC_DECK,
+    vocab_deck: str = DEFAULT_VOCAB_DECK,
+) -> Dict[str, list[Path]]:
+    """Note paths by the endpoint URLs their cards are routed to, for uploading their images.
+
+    Notes without cards go to the default URL.
+    """
+    targets: Dict[str, list[Path]] = {}
+    for note_path in note_paths:
+        decks = {card.deck for card in _parse_markdown_cards(note_path.resolve(), root, academic_deck, vocab_deck)}
+        for url in sorted({router.url_for(deck) for deck in decks} or {router.default_url}):
+            targets.setdefault(url, []).append(note_path)
+    return targets
+
+
+def sync(
+    paths: Optional[list[Path]] = None,
+    url: str = DEFAULT_ANKI_CONNECT_URL,
+    state_path: Path = DEFAULT_STATE_PATH,
+    academic_deck: str = DEFAULT_ACADEMIC_DECK,
+    vocab_deck: str = DEFAULT_VOCAB_DECK,
+    dry_run: bool = False,
+    router: Optional[DeckRouter] = None,
+) -> tuple[SyncPlan, Optional[SyncReport]]:
+    cards, scope = collect_cards(paths, ROOT, academic_deck, vocab_deck)
+    state = load_state(state_path)
+    plan = plan_sync(cards, state, scope)
+    if dry_run:
+        return plan, None
+    try:
+        if router is not None and router.fans_out:
+            report = apply_fan_out(plan, state, router)
+        else:
+            report = apply_plan(plan, state, url=url)
+    finally:
+        # Persist whatever succeeded, even if a later batch raised
+        save_state(state, state_path)
+    return plan, report
@@ -4,19 +4,30 @@ Interactive note creation tool.
 
 Usage:
     python src/create-note/create_note_cli.py
+    python src/create-note/create_note_cli.py --project econ101 --type class --title "Lecture 1"
+    python src/create-note/create_note_cli.py --batch lectures.csv --project econ101
 """
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
+from typing import Any
+import argparse
 import atexit
+import csv
+import json
+import os
 import re
-import shutil
 import signal
 import sys
-import termios
-import tty
+
+# Add project root to Python path so we can import from src/
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.notebook import locking, templates, tracing
+from src.notebook.picker import LabeledOptions, prompt_choice
 
 
 def _cleanup_terminal(*args) -> None:
@@ -45,151 +56,14 @@ class LocationChoice:
     project: str
 
 
-def _truncate_text(text: str, max_width: int) -> str:
-    if len(text) <= max_width:
-        return text
-    if max_width <= 3:
-        return text[:max_width]
-    return text[: max_width - 3] + "..."
-
-
-def _render_menu_inline(
-    title: str,
-    options: list[str],
-    current_idx: int,
-    prev_lines: int = 0,
-) -> int:
-    term_size = shutil.get_terminal_size(fallback=(80, 24))
-    term_width = term_size.columns
-    term_height = term_size.lines
-
-    if prev_lines > 0:
-        print(f"\033[{prev_lines}A", end="")
-
-    c = _Colors
-    lines: list[str] = []
-    lines.append(f"{c.BRIGHT_GREEN}?{c.RESET} {c.BOLD}{title}{c.RESET}")
-    lines.append(f"{c.DIM}  Use j/k (or arrows) to move, Enter to select.{c.RESET}")
-    lines.append(f"{c.DIM}  gg: top, G: bottom, q: quit.{c.RESET}")
-
-    total = len(options)
-    header_lines = 5
-    list_height = max(min(term_height - header_lines, 15), 5)
-
-    if total <= list_height:
-        start_idx = 0
-        end_idx = total
-    else:
-        half_window = list_height // 2
-        start_idx = max(current_idx - half_window, 0)
-        end_idx = start_idx + list_height
-        if end_idx > total:
-            end_idx = total
-            start_idx = max(end_idx - list_height, 0)
-
-    lines.append(f"{c.DIM}  Showing {start_idx + 1}-{end_idx} of {total}.{c.RESET}")
-    lines.append("")
-
-    max_option_width = term_width - 6
-    for idx in range(start_idx, end_idx):
-        option = _truncate_text(options[idx], max_option_width)
-        if idx == current_idx:
-            lines.append(f"  {c.BRIGHT_GREEN}>{c.RESET} {c.CYAN}{option}{c.RESET}")
-        else:
-            lines.append(f"    {option}")
-
-    for line in lines:
-        sys.stdout.write(f"\033[K{line}\r\n")
-
-    sys.stdout.flush()
-    return len(lines)
-
-
-def _clear_menu_lines(num_lines: int) -> None:
-    if num_lines > 0:
-        print(f"\033[{num_lines}A", end="")
-        for _ in range(num_lines):
-            print("\033[K")
-        print(f"\033[{num_lines}A", end="", flush=True)
-
-
-def _prompt_choice(title: str, options: list[str]) -> int:
-    if not options:
-        print("No options available.", file=sys.stderr)
-        sys.exit(1)
-
-    if not sys.stdin.isatty():
-        print(title)
-        for idx, option in enumerate(options, start=1):
-            print(f"  {idx}. {option}")
-        print()
-        while True:
-            selection = input("Select number: ").strip()
-            if not selection.isdigit():
-                print("Please enter a number.")
-                continue
-            index = int(selection) - 1
-            if 0 <= index < len(options):
-                return index
-            print("Invalid selection. Try again.")
-
-    current_idx = 0
-    last_key = ""
-
-    fd = sys.stdin.fileno()
-    old_settings = termios.tcgetattr(fd)
-    print("\033[?25l", end="", flush=True)
-    tty.setraw(fd)
-
-    def _restore_and_exit(clear_lines: int, message: str | None = None) -> None:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        _clear_menu_lines(clear_lines)
-        print("\033[?25h", end="", flush=True)
-        if message:
-            print(message)
-
-    try:
-        num_lines = _render_menu_inline(title, options, current_idx, prev_lines=0)
-        while True:
-            char = sys.stdin.read(1)
-            if char == "\x1b":
-                char += sys.stdin.read(2)
-
-            if char in ("\r", "\n"):
-                _restore_and_exit(num_lines)
-                return current_idx
-            if char in ("q", "Q"):
-                _restore_and_exit(num_lines, "Cancelled.")
-                sys.exit(0)
-            if char in ("k", "\x1b[A"):
-                current_idx = (current_idx - 1) % len(options)
-                last_key = ""
-            elif char in ("j", "\x1b[B"):
-                current_idx = (current_idx + 1) % len(options)
-                last_key = ""
-            elif char == "G":
-                current_idx = len(options) - 1
-                last_key = ""
-            elif char == "g":
-                if last_key == "g":
-                    current_idx = 0
-                    last_key = ""
-                else:
-                    last_key = "g"
-            num_lines = _render_menu_inline(title, options, current_idx, prev_lines=num_lines)
-    except Exception:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        print("\033[?25h", end="", flush=True)
-        raise
-
-
+@tracing.traced("fs.list_project_dirs")
 def _list_project_dirs(projects_dir: Path) -> list[Path]:
     if not projects_dir.exists():
         return []
-    return sorted(
-        [d for d in projects_dir.iterdir() if d.is_dir() and not d.name.startswith(".")],
-        key=lambda p: p.name.lower(),
-    )
+    # scandir's cached d_type avoids a stat per entry on large project trees
+    with os.scandir(projects_dir) as it:
+        names = [e.name for e in it if not e.name.startswith(".") and e.is_dir()]
+    return [projects_dir / name for name in sorted(names, key=str.lower)]
 
 
 def _choose_location(root: Path) -> LocationChoice:
@@ -200,7 +74,7 @@ def _choose_location(root: Path) -> LocationChoice:
         f"Current directory ({current_dir})",
         f"projects/ ({projects_dir})",
     ]
-    choice_idx = _prompt_choice("Where do you want to save the note?", options)
+    choice_idx = prompt_choice("Where do you want to save the note?", options)
 
     if choice_idx == 0:
         project = current_dir.name
@@ -211,8 +85,8 @@ def _choose_location(root: Path) -> LocationChoice:
         print("No project directories found under projects/.", file=sys.stderr)
         sys.exit(1)
 
-    project_names = [p.name for p in project_dirs]
-    project_idx = _prompt_choice("Select a project directory:", project_names)
+    project_names = LabeledOptions(project_dirs, lambda p: p.name)
+    project_idx = prompt_choice("Select a project directory:", project_names)
     project = project_dirs[project_idx]
     return LocationChoice(label="projects", path=project, project=project.name)
 
@@ -234,93 +108,250 @@ def _prompt_title() -> str:
         print(f"{c.YELLOW}Title cannot be empty.{c.RESET}")
 
 
-def _prompt_tags() -> str:
-    c = _Colors
-    raw = input(f"{c.BRIGHT_GREEN}?{c.RESET} Tags {c.DIM}(comma-separated, optional){c.RESET}: ").strip()
-    if not raw:
-        return "[]"
-
+def _split_tags(raw: str) -> list[str]:
     tags = []
     for tag in raw.split(","):
         tag_clean = tag.strip()
         if tag_clean:
             tags.append(tag_clean)
+    return tags
+
 
+def _format_tags_yaml(tags: list[str]) -> str:
     if not tags:
         return "[]"
-
     return "\n" + "\n".join(f"  - {tag}" for tag in tags)
 
 
-def _render_class_note(title: str, project: str, created: str, tags_yaml: str) -> str:
-    return (
-        "---\n"
-        f'title: "{title}"\n'
-        f'project: "{project}"\n'
-        f"created: {created}\n"
-        f"tags: {tags_yaml}\n"
-        "---\n"
-        "\n"
-        "## Readings\n"
-        "\n"
-        "## Cue (Keywords / Questions)\n"
-        "<!-- Left column: prompts, keywords, or questions. Use short bullets. -->\n"
-        "### English Vocabulary\n"
-        "\n"
-        "### Keywords\n"
-        "\n"
-        "## Notes (Lecture Notes)\n"
-        "<!-- Right column: main lecture notes. Use concise bullets, examples, formulas. -->\n"
-        "\n"
-        "## Summary (After Class)\n"
-        "<!-- Bottom summary: 3-5 sentence synthesis of the session. -->\n"
-        "\n"
-        "## Questions\n"
-        "\n"
-        "## Assignments / Next Steps\n"
-        "<!-- Homework, readings, or actions before next session. -->\n"
-    )
+def _prompt_tags() -> list[str]:
+    c = _Colors
+    raw = input(f"{c.BRIGHT_GREEN}?{c.RESET} Tags {c.DIM}(comma-separated, optional){c.RESET}: ").strip()
+    return _split_tags(raw)
 
 
-def _render_brainstorm_note(
-    title: str, project: str, created: str, tags_yaml: str
-) -> str:
-    return (
-        "---\n"
-        f'title: "{title}"\n'
-        f'project: "{project}"\n'
-        f"created: {created}\n"
-        f"tags: {tags_yaml}\n"
-        "---\n"
-        "## Brief\n"
-        "<!-- What is the assignment asking? Scope, deliverables, evaluation criteria. -->\n"
-        "\n"
-        "## Brainstorm\n"
-        "<!-- Ideas, angles, frameworks, hypotheses, possible contributions. -->\n"
-        "\n"
-        "## Questions\n"
-        "<!-- Clarifications needed, assumptions, unknowns to resolve. -->\n"
-        "\n"
-        "## Data & Constraints\n"
-        "<!-- Datasets, access, time constraints, tools, dependencies. -->\n"
-        "\n"
-        "## Plan (Draft Outline)\n"
-        "<!-- Sections, key arguments, methods, expected results. -->\n"
+TEMPLATE_GROUP = "create-note"
+DEFAULT_NOTE_TYPES = ["class", "brainstorm", "temp"]
+CONFLICT_POLICIES = ["error", "skip", "rename"]
+
+
+@dataclass(frozen=True)
+class NoteSpec:
+    note_type: str
+    title: str
+    location: LocationChoice
+    tags: tuple[str, ...]
+    created: str
+
+
+def _note_types() -> list[str]:
+    """Built-in types first, then any extra templates found on disk."""
+    available = templates.list_templates(TEMPLATE_GROUP)
+    return [t for t in DEFAULT_NOTE_TYPES if t in available] + [
+        t for t in available if t not in DEFAULT_NOTE_TYPES
+    ]
+
+
+def _render_note(spec: NoteSpec) -> str:
+    context = {
+        "title": spec.title,
+        "project": spec.location.project,
+        "in_projects": spec.location.label == "projects",
+        "created": spec.created,
+        "tags": _format_tags_yaml(list(spec.tags)),
+    }
+    return templates.render_note(TEMPLATE_GROUP, spec.note_type, context)
+
+
+def _write_new_file(path: Path, content: str, on_conflict: str) -> Path | None:
+    """Create `path` exclusively. Returns None when skipped on conflict.
+
+    Exclusive-create keeps parallel writers from clobbering each other when two
+    notes in a batch sanitize to the same filename, and the note only appears
+    once it is fully written.
+    """
+    candidate = path
+    suffix = 1
+    while True:
+        try:
+            locking.create_exclusive(candidate, content)
+            return candidate
+        except FileExistsError:
+            if on_conflict == "skip":
+                return None
+            if on_conflict != "rename":
+                raise
+            suffix += 1
+            candidate = path.with_name(f"{path.stem}-{suffix}{path.suffix}")
+
+
+@tracing.traced("fs.create_note")
+def _create_note(spec: NoteSpec, on_conflict: str) -> Path | None:
+    output_path = spec.location.path / (_sanitize_filename(spec.title) + ".md")
+    return _write_new_file(output_path, _render_note(spec), on_conflict)
+
+
+def _resolve_location(root: Path, project: str | None, directory: str | None) -> LocationChoice | None:
+    if project and directory:
+        raise ValueError("Use either project or dir, not both.")
+    if project:
+        project_dir = root / "projects" / project
+        if not project_dir.is_dir():
+            raise ValueError(f"Project directory not found: {project_dir}")
+        return LocationChoice(label="projects", path=project_dir, project=project_dir.name)
+    if directory:
+        target = Path(directory).expanduser().resolve()
+        if not target.is_dir():
+            raise ValueError(f"Directory not found: {target}")
+        return LocationChoice(label="current", path=target, project=target.name)
+    return None
+
+
+@tracing.traced("create_note.load_manifest")
+def _load_manifest(path: Path) -> list[dict[str, Any]]:
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open(newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    if suffix == ".json":
+        data = json.loads(path.read_text(encoding="utf-8"))
+    elif suffix in {".yaml", ".yml"}:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("Missing dependency: pyyaml. Install with `uv add pyyaml`.")
+        data = yaml.safe_load(path.read_text(encoding="utf-8"))
+    else:
+        raise ValueError(f"Unsupported manifest format: {path.suffix} (use .csv, .json, .yaml)")
+
+    if isinstance(data, dict):
+        data = data.get("notes", [])
+    if not isinstance(data, list):
+        raise ValueError("Manifest must be a list of notes or a mapping with a `notes` list.")
+    return data
+
+
+def _row_text(row: dict, key: str) -> str | None:
+    """A scalar manifest field as text (`project: 2024` -> "2024"), or None if it is empty."""
+    value = row.get(key)
+    if value is None or value == "":
+        return None
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"{key} must be a single value, got {type(value).__name__}")
+    return str(value).strip() or None
+
+
+def _spec_from_row(
+    row: Any,
+    root: Path,
+    default_location: LocationChoice | None,
+    default_type: str | None,
+    default_created: str,
+    note_types: list[str],
+) -> NoteSpec:
+    if not isinstance(row, dict):
+        raise ValueError(f"expected a mapping with a title, got {type(row).__name__}")
+    title = str(row.get("title") or "").strip()
+    if not title:
+        raise ValueError("missing title")
+
+    note_type = str(row.get("type") or default_type or "").strip()
+    if note_type not in note_types:
+        raise ValueError(f"unsupported note type: {note_type or '(none)'}")
+
+    location = _resolve_location(root, _row_text(row, "project"), _row_text(row, "dir"))
+    location = location or default_location
+    if location is None:
+        cwd = Path.cwd()
+        location = LocationChoice(label="current", path=cwd, project=cwd.name)
+
+    tags_raw = row.get("tags") or []
+    if isinstance(tags_raw, dict):
+        raise ValueError("tags must be a list or a comma-separated string, got dict")
+    if isinstance(tags_raw, str):
+        tags = _split_tags(tags_raw)
+    elif isinstance(tags_raw, list):
+        tags = [str(tag) for tag in tags_raw]
+    else:
+        tags = [str(tags_raw)]  # `tags: 5`
+    created = str(row.get("created") or default_created)
+    return NoteSpec(note_type=note_type, title=title, location=location, tags=tuple(tags), created=created)
+
+
+@tracing.traced("create_note.run_batch")
+def _run_batch(args: argparse.Namespace, root: Path, default_location: LocationChoice | None, created: str) -> None:
+    c = _Colors
+    rows = _load_manifest(Path(args.batch))
+
+    note_types = _note_types()
+    specs: list[NoteSpec] = []
+    failed = 0
+    for row_num, row in enumerate(rows, start=1):
+        try:
+            specs.append(_spec_from_row(row, root, default_location, args.type, created, note_types))
+        except ValueError as e:
+            print(f"{c.YELLOW}Row {row_num}: {e}{c.RESET}", file=sys.stderr)
+            failed += 1
+
+    created_count = skipped = 0
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(_create_note, spec, args.on_conflict) for spec in specs]
+        for spec, future in zip(specs, futures):
+            try:
+                path = future.result()
+            except FileExistsError as e:
+                print(f"{c.YELLOW}File already exists: {e.filename}{c.RESET}", file=sys.stderr)
+                failed += 1
+                continue
+            except OSError as e:
+                print(f"{c.YELLOW}Could not create {spec.title!r}: {e}{c.RESET}", file=sys.stderr)
+                failed += 1
+                continue
+            if path is None:
+                skipped += 1
+                continue
+            created_count += 1
+            if args.verbose:
+                print(f"{c.BRIGHT_GREEN}Created:{c.RESET} {c.CYAN}{path}{c.RESET}")
+
+    print(
+        f"{c.BRIGHT_GREEN}Created {created_count} note(s){c.RESET}"
+        f", skipped {skipped}, failed {failed}."
     )
+    if failed:
+        sys.exit(1)
 
 
-def _render_temp_note(
-    title: str, created: str, tags_yaml: str, project: str | None = None
-) -> str:
-    project_line = f'project: "{project}"\n' if project else ""
-    return (
-        "---\n"
-        f"title: {title}\n"
-        f"{project_line}"
-        f"created: {created}\n"
-        f"tags: {tags_yaml}\n"
-        "---\n"
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Create notes interactively, or non-interactively when flags are given."
+    )
+    location = parser.add_mutually_exclusive_group()
+    location.add_argument("-p", "--project", help="Project directory name under projects/")
+    location.add_argument("-d", "--dir", help="Target directory (default in batch mode: current directory)")
+    parser.add_argument("-t", "--type", choices=_note_types(), help="Note type (one per template)")
+    parser.add_argument("--title", help="Note title (skips the title and tags prompts)")
+    parser.add_argument("--tags", default="", help="Comma-separated tags")
+    parser.add_argument("--created", help="Created timestamp (default: now, %%Y-%%m-%%d %%H:%%M)")
+    parser.add_argument(
+        "-b",
+        "--batch",
+        help="Manifest of notes to create (.csv, .json, .yaml). Columns: title, type, project, dir, tags, created",
     )
+    parser.add_argument(
+        "--on-conflict",
+        choices=CONFLICT_POLICIES,
+        default="error",
+        help="What to do when the file already exists (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Parallel writers in batch mode (default: %(default)s)",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="List every created file in batch mode")
+    return parser.parse_args(argv)
 
 
 def main() -> None:
@@ -328,37 +359,49 @@ def main() -> None:
     signal.signal(signal.SIGINT, _cleanup_terminal)
     signal.signal(signal.SIGTERM, _cleanup_terminal)
 
+    args = _parse_args()
     root = Path(__file__).resolve().parents[2]
-
-    location = _choose_location(root)
-    note_types = ["class", "brainstorm", "temp"]
-    note_idx = _prompt_choice("Select note type:", note_types)
-    note_type = note_types[note_idx]
-
-    title = _prompt_title()
-    tags_yaml = _prompt_tags()
-    created = datetime.now().strftime("%Y-%m-%d %H:%M")
-
-    filename = _sanitize_filename(title) + ".md"
-    output_path = location.path / filename
+    created = args.created or datetime.now().strftime("%Y-%m-%d %H:%M")
 
     c = _Colors
-    if output_path.exists():
-        print(f"{c.YELLOW}File already exists: {output_path}{c.RESET}", file=sys.stderr)
+    try:
+        location = _resolve_location(root, args.project, args.dir)
+    except ValueError as e:
+        print(f"{c.YELLOW}{e}{c.RESET}", file=sys.stderr)
         sys.exit(1)
 
-    if note_type == "class":
-        content = _render_class_note(title, location.project, created, tags_yaml)
-    elif note_type == "brainstorm":
-        content = _render_brainstorm_note(title, location.project, created, tags_yaml)
-    elif note_type == "temp":
-        project = location.project if location.label == "projects" else None
-        content = _render_temp_note(title, created, tags_yaml, project)
+    if args.batch:
+        try:
+            _run_batch(args, root, location, created)
+        except (OSError, ValueError) as e:
+            print(f"{c.YELLOW}{e}{c.RESET}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    location = location or _choose_location(root)
+    if args.type:
+        note_type = args.type
     else:
-        print(f"Unsupported note type: {note_type}", file=sys.stderr)
+        note_types = _note_types()
+        note_type = note_types[prompt_choice("Select note type:", note_types)]
+
+    if args.title:
+        title = args.title
+        tags = _split_tags(args.tags)
+    else:
+        title = _prompt_title()
+        tags = _split_tags(args.tags) if args.tags else _prompt_tags()
+
+    spec = NoteSpec(note_type=note_type, title=title, location=location, tags=tuple(tags), created=created)
+    try:
+        output_path = _create_note(spec, args.on_conflict)
+    except FileExistsError as e:
+        print(f"{c.YELLOW}File already exists: {e.filename}{c.RESET}", file=sys.stderr)
         sys.exit(1)
 
-    output_path.write_text(content, encoding="utf-8")
+    if output_path is None:
+        print(f"{c.DIM}Skipped existing note: {_sanitize_filename(title)}.md{c.RESET}")
+        return
     print(f"{c.BRIGHT_GREEN}Created:{c.RESET} {c.CYAN}{output_path}{c.RESET}")
 
 
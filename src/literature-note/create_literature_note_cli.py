@@ -11,12 +11,28 @@ from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 import atexit
-import shutil
+import os
 import re
 import signal
 import sys
-import termios
-import tty
+
+# Add project root to Python path so we can import from src/
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.notebook import locking, templates, tracing
+from src.notebook.bibtex import (
+    BibEntry,
+    find_existing_reference_directory,
+    get_bibtex_path,
+    get_reference_paths,
+    load_bibtex_entries,
+    reference_slug_key,
+    render_reference_note,
+    sanitize_slug,
+    sanitize_title,
+)
+from src.notebook.picker import LabeledOptions, prompt_choice
+
 
 def _cleanup_terminal(*args) -> None:
     """Cleanup handler for signals and exit - ensures cursor is visible."""
@@ -27,8 +43,7 @@ def _cleanup_terminal(*args) -> None:
 
 
 try:
-    import bibtexparser
-    from bibtexparser.bparser import BibTexParser
+    import bibtexparser  # noqa: F401 - fail fast before any prompt
 except ImportError:  # pragma: no cover - CLI guard
     print(
         "Missing dependency: bibtexparser. Install with `uv add bibtexparser`.",
@@ -37,16 +52,6 @@ except ImportError:  # pragma: no cover - CLI guard
     sys.exit(1)
 
 
-@dataclass(frozen=True)
-class BibEntry:
-    citekey: str
-    title: str
-    year: str
-    entry_type: str
-    authors: str
-    url: str = ""
-
-
 # ANSI color codes
 class _Colors:
     RESET = "\033[0m"
@@ -58,169 +63,7 @@ class _Colors:
     YELLOW = "\033[33m"
 
 
-def _truncate_text(text: str, max_width: int) -> str:
-    """Truncate text to fit within max_width, adding ellipsis if needed."""
-    if len(text) <= max_width:
-        return text
-    if max_width <= 3:
-        return text[:max_width]
-    return text[: max_width - 3] + "..."
-
-
-def _render_menu_inline(
-    title: str,
-    options: list[str],
-    current_idx: int,
-    prev_lines: int = 0,
-) -> int:
-    """Render menu inline. Returns number of lines printed for next update."""
-    term_size = shutil.get_terminal_size(fallback=(80, 24))
-    term_width = term_size.columns
-    term_height = term_size.lines
-
-    # Move cursor up to overwrite previous render
-    if prev_lines > 0:
-        print(f"\033[{prev_lines}A", end="")
-
-    c = _Colors
-    lines: list[str] = []
-    lines.append(f"{c.BRIGHT_GREEN}?{c.RESET} {c.BOLD}{title}{c.RESET}")
-    lines.append(f"{c.DIM}  Use j/k (or arrows) to move, Enter to select.{c.RESET}")
-    lines.append(f"{c.DIM}  gg: top, G: bottom, q: quit.{c.RESET}")
-
-    total = len(options)
-    header_lines = 5  # title + help + gg line + showing line + blank
-    list_height = max(min(term_height - header_lines, 15), 5)  # Cap at 15 items
-
-    if total <= list_height:
-        start_idx = 0
-        end_idx = total
-    else:
-        half_window = list_height // 2
-        start_idx = max(current_idx - half_window, 0)
-        end_idx = start_idx + list_height
-        if end_idx > total:
-            end_idx = total
-            start_idx = max(end_idx - list_height, 0)
-
-    lines.append(f"{c.DIM}  Showing {start_idx + 1}-{end_idx} of {total}.{c.RESET}")
-    lines.append("")
-
-    # Reserve space for prefix " > " or "   " plus color codes
-    max_option_width = term_width - 6
-    for idx in range(start_idx, end_idx):
-        option = _truncate_text(options[idx], max_option_width)
-        if idx == current_idx:
-            lines.append(f"  {c.BRIGHT_GREEN}>{c.RESET} {c.CYAN}{option}{c.RESET}")
-        else:
-            lines.append(f"    {option}")
-
-    # Print all lines, clearing each line first
-    # Use \r\n for raw mode compatibility (raw mode doesn't auto-CR on LF)
-    for line in lines:
-        sys.stdout.write(f"\033[K{line}\r\n")
-
-    sys.stdout.flush()
-    return len(lines)
-
-
-def _clear_menu_lines(num_lines: int) -> None:
-    """Clear the menu lines after selection."""
-    if num_lines > 0:
-        print(f"\033[{num_lines}A", end="")  # Move up
-        for _ in range(num_lines):
-            print("\033[K")  # Clear line and move down
-        print(f"\033[{num_lines}A", end="", flush=True)  # Move back up
-
-
-def _prompt_choice(title: str, options: list[str]) -> int:
-    if not options:
-        print("No options available.", file=sys.stderr)
-        sys.exit(1)
-
-    if not sys.stdin.isatty():
-        filtered = list(enumerate(options, start=1))
-        while True:
-            print(title)
-            print("Type a number, or enter a search term to filter.\n")
-
-            window = filtered[:20]
-            for idx, option in window:
-                print(f"  {idx}. {option}")
-            if len(filtered) > len(window):
-                print(f"\nShowing {len(window)} of {len(filtered)} matches.")
-            print()
-
-            selection = input("Select number or search: ").strip()
-            if selection.isdigit():
-                index = int(selection) - 1
-                if 0 <= index < len(options):
-                    return index
-                print("Invalid selection. Try again.")
-                continue
-            if not selection:
-                continue
-            term = selection.lower()
-            filtered = [
-                (idx, option)
-                for idx, option in enumerate(options, start=1)
-                if term in option.lower()
-            ]
-            if not filtered:
-                print("No matches. Try another search.")
-                filtered = list(enumerate(options, start=1))
-
-    current_idx = 0
-    last_key = ""
-
-    # Set up terminal: hide cursor and enter raw mode for entire menu session
-    fd = sys.stdin.fileno()
-    old_settings = termios.tcgetattr(fd)
-    print("\033[?25l", end="", flush=True)  # Hide cursor
-    tty.setraw(fd)
-
-    def _restore_and_exit(clear_lines: int, message: str | None = None) -> None:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        _clear_menu_lines(clear_lines)
-        print("\033[?25h", end="", flush=True)  # Show cursor
-        if message:
-            print(message)
-
-    try:
-        num_lines = _render_menu_inline(title, options, current_idx, prev_lines=0)
-        while True:
-            char = sys.stdin.read(1)
-            if char == "\x1b":
-                char += sys.stdin.read(2)
-
-            if char in ("\r", "\n"):
-                _restore_and_exit(num_lines)
-                return current_idx
-            if char in ("q", "Q"):
-                _restore_and_exit(num_lines, "Cancelled.")
-                sys.exit(0)
-            if char in ("k", "\x1b[A"):
-                current_idx = (current_idx - 1) % len(options)
-                last_key = ""
-            elif char in ("j", "\x1b[B"):
-                current_idx = (current_idx + 1) % len(options)
-                last_key = ""
-            elif char == "G":
-                current_idx = len(options) - 1
-                last_key = ""
-            elif char == "g":
-                if last_key == "g":
-                    current_idx = 0
-                    last_key = ""
-                else:
-                    last_key = "g"
-            num_lines = _render_menu_inline(title, options, current_idx, prev_lines=num_lines)
-    except Exception:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-        print("\033[?25h", end="", flush=True)
-        raise
-
-
+@tracing.traced("tty.prompt_text")
 def _prompt_text(label: str) -> str:
     c = _Colors
     while True:
@@ -230,6 +73,7 @@ def _prompt_text(label: str) -> str:
         print(f"{c.YELLOW}Value cannot be empty.{c.RESET}")
 
 
+@tracing.traced("tty.prompt_yes_no")
 def _prompt_yes_no(label: str, default: bool = False) -> bool:
     c = _Colors
     suffix = f" {c.DIM}[Y/n]{c.RESET}" if default else f" {c.DIM}[y/N]{c.RESET}"
@@ -262,190 +106,30 @@ def _prompt_tags() -> str:
     return "\n" + "\n".join(f"  - {tag}" for tag in tags)
 
 
-def _sanitize_slug(text: str) -> str:
-    cleaned = text.strip().lower()
-    cleaned = cleaned.replace("&", "and")
-    cleaned = re.sub(r"[^a-z0-9]+", "-", cleaned)
-    cleaned = cleaned.strip("-")
-    return cleaned or "untitled"
-
-
-def _sanitize_title(text: str) -> str:
-    cleaned = text.replace("{", "").replace("}", "")
-    cleaned = re.sub(r"\s+", " ", cleaned)
-    return cleaned.strip()
-
-
-def _split_citekey_year(citekey: str, year: str) -> str:
-    if year and re.search(rf"[_-]{re.escape(year)}$", citekey):
-        return citekey[: -(len(year) + 1)].rstrip("._-")
-    return citekey
-
-
-def _get_bibtex_path(root: Path) -> Path:
-    symlink_path = root / "src" / "literature-note" / "references.bib"
-    if symlink_path.exists():
-        return symlink_path
-    return Path("~/Zotero/better-bibtex/My Library.bib").expanduser()
-
-
-def _parse_bibtex_entries(bib_path: Path) -> list[BibEntry]:
-    if not bib_path.exists():
-        print(f"BibTeX file not found: {bib_path}", file=sys.stderr)
+@tracing.traced("literature.load_bib_entries")
+def _load_bib_entries(root: Path) -> list[BibEntry]:
+    try:
+        return load_bibtex_entries(get_bibtex_path(root))
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
         sys.exit(1)
 
-    parser = BibTexParser(common_strings=True)
-    content = bib_path.read_text(encoding="utf-8")
-    database = bibtexparser.loads(content, parser=parser)
-
-    entries: list[BibEntry] = []
-    for entry in database.entries:
-        title = _sanitize_title(entry.get("title", ""))
-        if not title:
-            continue
-        year = entry.get("year") or ""
-        if not year:
-            date_field = entry.get("date", "")
-            match = re.search(r"\d{4}", date_field)
-            year = match.group(0) if match else ""
-
-        authors_raw = entry.get("author", "")
-        authors = (
-            authors_raw.replace("{", "")
-            .replace("}", "")
-            .replace(" and ", ", ")
-            .strip()
-        )
-        citekey = entry.get("ID", "").strip()
-        entry_type = entry.get("ENTRYTYPE", "").strip()
-        url = entry.get("url", "").strip()
-
-        entries.append(
-            BibEntry(
-                citekey=citekey,
-                title=title,
-                year=year,
-                entry_type=entry_type,
-                url=url,
-                authors=authors,
-            )
-        )
-
-    def _year_key(entry: BibEntry) -> int:
-        return int(entry.year) if entry.year.isdigit() else 0
-
-    return sorted(entries, key=_year_key, reverse=True)
-
-
-def _render_reference_note(entry: BibEntry) -> str:
-    authors = entry.authors or ""
-    return (
-        "---\n"
-        f'title: "{entry.title}"\n'
-        f"authors: {authors}\n"
-        f"year: {entry.year}\n"
-        f"type: {entry.entry_type}\n"
-        f"citekey: {entry.citekey}\n"
-        f"url: {entry.url}\n"
-        "tags:\n"
-        "printed:\n"
-        "---\n"
-        "\n"
-        "## Related Notes\n"
-        "\n"
-        "## Before You Read\n"
-        "\n"
-        "1. Why am I reading this?\n"
-        "\n"
-        "2. What are the authors trying to do in writing this?\n"
-        "\n"
-        "3. What are the authors saying that is relevant to what I want to find out?\n"
-        "\n"
-        "4. How convincing is what the authors saying?\n"
-        "\n"
-        "5. In conclusion, what use can I make of this?\n"
-        "\n"
-        "## Notes\n"
-        "\n"
-        "### Keywords\n"
-        "\n"
-        "## Summary\n"
-        "\n"
-        "### Writing Assessment\n"
-        "\n"
-        "## Questions\n"
-        "\n"
-    )
-
 
-def _render_chapter_section_note(title: str, created: str, tags_yaml: str) -> str:
-    return (
-        "---\n"
-        f'title: "{title}"\n'
-        f"created: {created}\n"
-        f"tags: {tags_yaml}\n"
-        "---\n"
-        "## Related Notes\n"
-        "\n"
-        "## Keywords\n"
-        "<!-- Keywords found in reading -->\n"
-        "\n"
-        "## Memo\n"
-        "<!-- Memo while reading -->\n"
-        "\n"
-        "## Summary\n"
-        "<!-- Brief summary of this chapter -->\n"
-        "\n"
-        "## Key Concepts\n"
-        "<!-- List of key concepts introduced in this chapter -->\n"
-        "\n"
-        "## Important Formulas/Theorems\n"
-        "<!-- Important formulas, theorems, or principles -->\n"
-        "\n"
-        "## Examples\n"
-        "<!-- Notable examples from the chapter -->\n"
-        "\n"
-        "## Questions\n"
-        "\n"
-    )
+TEMPLATE_GROUP = "literature-note"
 
 
-def _render_concept_note(title: str, created: str, tags_yaml: str) -> str:
-    return (
-        "---\n"
-        f'title: "{title}"\n'
-        f"created: {created}\n"
-        f"tags: {tags_yaml}\n"
-        "---\n"
-        "## Related Notes\n"
-        "\n"
-        "## Memo\n"
-        "<!-- Memo while reading -->\n"
-        "\n"
-        "## Definition\n"
-        "<!-- Clear definition of the concept -->\n"
-        "\n"
-        "## Examples\n"
-        "<!-- Examples that illustrate the concept -->\n"
-        "\n"
-        "## Applications\n"
-        "<!-- How this concept is applied -->\n"
-        "\n"
-        "## Questions\n"
-        "\n"
-    )
+def _render_subnote(note_type: str, title: str, created: str, tags_yaml: str) -> str:
+    context = {"title": title, "created": created, "tags": tags_yaml}
+    return templates.render_note(TEMPLATE_GROUP, note_type, context)
 
 
-def _append_related_link(note_path: Path, link_stem: str) -> bool:
+def _with_related_link(content: str, link_stem: str) -> str | None:
     link_line = f"- [[{link_stem}]]"
-    content = note_path.read_text(encoding="utf-8")
     if link_line in content:
-        return False
+        return None
 
     if "## Related Notes" not in content:
-        updated = content.rstrip() + "\n\n## Related Notes\n\n" + link_line + "\n"
-        note_path.write_text(updated, encoding="utf-8")
-        return True
+        return content.rstrip() + "\n\n## Related Notes\n\n" + link_line + "\n"
 
     section_start = content.find("## Related Notes") + len("## Related Notes")
     remainder = content[section_start:]
@@ -454,12 +138,25 @@ def _append_related_link(note_path: Path, link_stem: str) -> bool:
 
     section_body = content[section_start:section_end]
     insert_line = ("\n" if section_body.endswith("\n") else "\n\n") + link_line
-    updated = content[:section_end] + insert_line + content[section_end:]
-    note_path.write_text(updated, encoding="utf-8")
-    return True
+    return content[:section_end] + insert_line + content[section_end:]
 
 
+@tracing.traced("fs.append_related_link")
+def _append_related_link(note_path: Path, link_stem: str, lock_dir: Path = locking.DEFAULT_LOCK_DIR) -> bool:
+    # Read and rewrite under the note's lock so concurrent runs linking to it don't drop each other's links
+    return locking.update_text(note_path, lambda content: _with_related_link(content, link_stem), lock_dir=lock_dir)
+
+
+def _create_note_file(note_path: Path, content: str) -> bool:
+    """Create the note unless it exists (including if another run created it first). Returns whether it was created."""
+    try:
+        locking.create_exclusive(note_path, content)
+    except FileExistsError:
+        return False
+    return True
 
+
+@tracing.traced("literature.select_bib_entry")
 def _select_bib_entry(entries: list[BibEntry]) -> BibEntry:
     c = _Colors
     current_list = entries[:10]
@@ -467,7 +164,7 @@ def _select_bib_entry(entries: list[BibEntry]) -> BibEntry:
         print(f"\n{c.BOLD}Recent references:{c.RESET}")
         for idx, entry in enumerate(current_list, start=1):
             year_label = entry.year or "n.d."
-            title = _sanitize_title(entry.title)
+            title = sanitize_title(entry.title)
             print(f"  {c.GREEN}{idx}.{c.RESET} {entry.citekey} {c.DIM}({year_label}){c.RESET} — {title}")
 
         raw = input(f"\n{c.BRIGHT_GREEN}?{c.RESET} Select by number or search {c.DIM}(q + Enter to cancel){c.RESET}: ").strip()
@@ -509,59 +206,19 @@ class ReferenceContext:
     entry: BibEntry
 
 
-def _get_reference_paths(root: Path, entry: BibEntry) -> tuple[Path, Path]:
-    """Calculate directory and reference note paths for a BibEntry."""
-    year = entry.year or "unknown"
-    base_key = _split_citekey_year(entry.citekey, year)
-    slug_key = _sanitize_slug(base_key or entry.citekey)
-    slug_title = _sanitize_slug(entry.title)
-
-    directory_name = f"{slug_key}-{year}-{slug_title}"
-    target_dir = root / "literature-notebook" / directory_name
-    filename = f"{slug_key}-{year}-reference-note.md"
-    note_path = target_dir / filename
-
-    return target_dir, note_path
-
-
-def _find_existing_reference_directory(root: Path, entry: BibEntry) -> Path | None:
-    """Find existing directory matching citekey pattern, regardless of title slug."""
-    year = entry.year or "unknown"
-    base_key = _split_citekey_year(entry.citekey, year)
-    slug_key = _sanitize_slug(base_key or entry.citekey)
-    
-    # Search for directories matching pattern: {slug_key}-{year}-*
-    pattern = f"{slug_key}-{year}-*"
-    notebook_dir = root / "literature-notebook"
-    if not notebook_dir.exists():
-        return None
-    
-    matches = list(notebook_dir.glob(pattern))
-    # Prefer exact match if it exists, otherwise return first match
-    exact_dir = notebook_dir / f"{slug_key}-{year}-{_sanitize_slug(entry.title)}"
-    if exact_dir.exists() and exact_dir.is_dir():
-        return exact_dir
-    if matches:
-        # Return first directory match
-        for match in matches:
-            if match.is_dir():
-                return match
-    return None
-
-
+@tracing.traced("fs.create_reference_note")
 def _create_reference_note_for_entry(
     root: Path, entry: BibEntry
 ) -> tuple[Path, Path]:
     """Create reference note for a BibEntry. Returns (directory, note_path)."""
-    target_dir, note_path = _get_reference_paths(root, entry)
+    target_dir, note_path = get_reference_paths(root, entry)
     target_dir.mkdir(parents=True, exist_ok=True)
 
     c = _Colors
-    if note_path.exists():
+    if not _create_note_file(note_path, render_reference_note(entry)):
         print(f"{c.CYAN}ℹ{c.RESET} Reference note already exists: {note_path}")
         return target_dir, note_path
 
-    note_path.write_text(_render_reference_note(entry), encoding="utf-8")
     print(f"{c.BRIGHT_GREEN}✓{c.RESET} Created reference note: {c.CYAN}{note_path}{c.RESET}")
     return target_dir, note_path
 
@@ -571,7 +228,7 @@ def _get_or_create_reference_context(
 ) -> ReferenceContext:
     """Select a reference and ensure its directory/note exist."""
     entry = _select_bib_entry(entries)
-    target_dir, note_path = _get_reference_paths(root, entry)
+    target_dir, note_path = get_reference_paths(root, entry)
 
     c = _Colors
     # First check for exact match
@@ -590,24 +247,24 @@ def _get_or_create_reference_context(
         )
 
     # If exact match doesn't exist, search for directories matching citekey pattern
-    existing_dir = _find_existing_reference_directory(root, entry)
+    existing_dir = find_existing_reference_directory(root, entry)
     if existing_dir:
         # Found existing directory with matching citekey, use it
         # Recalculate note_path using the existing directory
         year = entry.year or "unknown"
-        base_key = _split_citekey_year(entry.citekey, year)
-        slug_key = _sanitize_slug(base_key or entry.citekey)
-        filename = f"{slug_key}-{year}-reference-note.md"
+        filename = f"{reference_slug_key(entry)}-{year}-reference-note.md"
         existing_note_path = existing_dir / filename
-        
+
         existing_note = existing_note_path if existing_note_path.exists() else None
         if existing_note:
             print(f"{c.CYAN}ℹ{c.RESET} Using existing reference: {c.BOLD}{existing_dir.name}{c.RESET}")
         else:
             print(f"{c.YELLOW}⚠{c.RESET} Directory exists but no reference note: {existing_dir.name}")
             if _prompt_yes_no("Create reference note?", default=True):
-                existing_note_path.write_text(_render_reference_note(entry), encoding="utf-8")
-                print(f"{c.BRIGHT_GREEN}✓{c.RESET} Created reference note: {c.CYAN}{existing_note_path}{c.RESET}")
+                if _create_note_file(existing_note_path, render_reference_note(entry)):
+                    print(f"{c.BRIGHT_GREEN}✓{c.RESET} Created reference note: {c.CYAN}{existing_note_path}{c.RESET}")
+                else:
+                    print(f"{c.CYAN}ℹ{c.RESET} Reference note already exists: {existing_note_path}")
                 existing_note = existing_note_path
         return ReferenceContext(
             directory=existing_dir, reference_note=existing_note, entry=entry
@@ -631,30 +288,61 @@ def _get_or_create_reference_context(
 
 def _create_reference_note(root: Path) -> None:
     c = _Colors
-    entries = _parse_bibtex_entries(_get_bibtex_path(root))
+    entries = _load_bib_entries(root)
     entry = _select_bib_entry(entries)
-    target_dir, note_path = _get_reference_paths(root, entry)
+    target_dir, note_path = get_reference_paths(root, entry)
 
     if note_path.exists():
         print(f"{c.YELLOW}⚠{c.RESET} Reference note already exists: {note_path}", file=sys.stderr)
         sys.exit(1)
 
     target_dir.mkdir(parents=True, exist_ok=True)
-    note_path.write_text(_render_reference_note(entry), encoding="utf-8")
+    if not _create_note_file(note_path, render_reference_note(entry)):
+        print(f"{c.YELLOW}⚠{c.RESET} Reference note already exists: {note_path}", file=sys.stderr)
+        sys.exit(1)
     print(f"{c.BRIGHT_GREEN}✓{c.RESET} Created reference note: {c.CYAN}{note_path}{c.RESET}")
 
 
+@tracing.traced("literature.select_note_in_directory")
 def _select_note_in_directory(directory: Path, prompt: str) -> Path:
-    notes = sorted(directory.glob("*.md"))
-    if not notes:
+    with os.scandir(directory) as it:
+        names = sorted(e.name for e in it if e.name.endswith(".md") and e.is_file())
+    if not names:
         print(f"No notes found in {directory}", file=sys.stderr)
         sys.exit(1)
 
-    labels = [note.stem for note in notes]
-    index = _prompt_choice(prompt, labels)
-    return notes[index]
+    labels = LabeledOptions(names, lambda name: name[: -len(".md")])
+    index = prompt_choice(prompt, labels)
+    return directory / names[index]
+
+
+SUGGESTION_COUNT = 5
 
 
+def _suggest_related_links(root: Path, note_path: Path, query: str) -> None:
+    """Offer the most similar existing notes as links from a new note. Skipped without scikit-learn."""
+    try:
+        from src.notebook.similar import suggest_related
+    except ImportError:
+        return
+    from src.notebook import watch
+
+    c = _Colors
+    rel = note_path.relative_to(root).as_posix()
+    hits = suggest_related(query, k=SUGGESTION_COUNT, exclude=[rel], root=root, refresh=not watch.is_running())
+    if not hits:
+        return
+
+    print(f"\n{c.BOLD}Similar notes:{c.RESET}")
+    for idx, hit in enumerate(hits, start=1):
+        print(f"  {c.GREEN}{idx}.{c.RESET} {hit.title} {c.DIM}{hit.path} ({hit.score:.2f}){c.RESET}")
+    raw = input(f"{c.BRIGHT_GREEN}?{c.RESET} Link which {c.DIM}(e.g. 1,3; Enter to skip){c.RESET}: ").strip()
+    for token in re.split(r"[,\s]+", raw):
+        if token.isdigit() and 1 <= int(token) <= len(hits):
+            _append_related_link(note_path, Path(hits[int(token) - 1].path).stem)
+
+
+@tracing.traced("fs.find_chapter_note")
 def _find_chapter_note(directory: Path, chapter_num: str) -> Path | None:
     chapter_prefix = f"ch{chapter_num}"
     candidates = sorted(
@@ -670,25 +358,22 @@ def _create_chapter_note(
     created: str,
     tags_yaml: str,
 ) -> Path:
-    slug_title = _sanitize_slug(chapter_title)
+    slug_title = sanitize_slug(chapter_title)
     display_title = f"ch{chapter_num} {chapter_title}"
     filename = f"ch{chapter_num}-{slug_title}.md"
     note_path = directory / filename
 
     if not note_path.exists():
-        note_path.write_text(
-            _render_chapter_section_note(display_title, created, tags_yaml),
-            encoding="utf-8",
-        )
+        _create_note_file(note_path, _render_subnote("chapter", display_title, created, tags_yaml))
 
     return note_path
 
 
 def _create_subnote(root: Path) -> None:
-    entries = _parse_bibtex_entries(_get_bibtex_path(root))
+    entries = _load_bib_entries(root)
     reference_context = _get_or_create_reference_context(root, entries)
     note_types = ["chapter", "section", "concept"]
-    note_type = note_types[_prompt_choice("Select sub-note type:", note_types)]
+    note_type = note_types[prompt_choice("Select sub-note type:", note_types)]
 
     created = datetime.now().strftime("%Y-%m-%d %H:%M")
     tags_yaml = _prompt_tags()
@@ -714,7 +399,7 @@ def _create_subnote(root: Path) -> None:
         section_num = _prompt_text("Section number (e.g., 2.5)")
         section_title = _prompt_text("Section title")
         section_id = section_num.replace(".", "_")
-        slug_title = _sanitize_slug(section_title)
+        slug_title = sanitize_slug(section_title)
         display_title = f"sec{section_num} {section_title}"
         filename = f"sec{section_id}-{slug_title}.md"
         note_path = reference_context.directory / filename
@@ -722,10 +407,9 @@ def _create_subnote(root: Path) -> None:
             print(f"{c.YELLOW}⚠{c.RESET} File already exists: {note_path}", file=sys.stderr)
             sys.exit(1)
 
-        note_path.write_text(
-            _render_chapter_section_note(display_title, created, tags_yaml),
-            encoding="utf-8",
-        )
+        if not _create_note_file(note_path, _render_subnote("section", display_title, created, tags_yaml)):
+            print(f"{c.YELLOW}⚠{c.RESET} File already exists: {note_path}", file=sys.stderr)
+            sys.exit(1)
         chapter_num_match = re.match(r"\d+", section_num)
         chapter_num = chapter_num_match.group(0) if chapter_num_match else section_num
         chapter_note = _find_chapter_note(reference_context.directory, chapter_num)
@@ -762,18 +446,18 @@ def _create_subnote(root: Path) -> None:
             reference_context.directory, "Select a note to link:"
         )
         concept_title = _prompt_text("Concept title")
-        filename = f"{_sanitize_slug(concept_title)}.md"
+        filename = f"{sanitize_slug(concept_title)}.md"
         note_path = reference_context.directory / filename
         if note_path.exists():
             print(f"{c.YELLOW}⚠{c.RESET} File already exists: {note_path}", file=sys.stderr)
             sys.exit(1)
 
-        note_path.write_text(
-            _render_concept_note(concept_title, created, tags_yaml),
-            encoding="utf-8",
-        )
+        if not _create_note_file(note_path, _render_subnote("concept", concept_title, created, tags_yaml)):
+            print(f"{c.YELLOW}⚠{c.RESET} File already exists: {note_path}", file=sys.stderr)
+            sys.exit(1)
         _append_related_link(target_note, note_path.stem)
         print(f"{c.BRIGHT_GREEN}✓{c.RESET} Created concept note: {c.CYAN}{note_path}{c.RESET}")
+        _suggest_related_links(root, note_path, f"{concept_title} {reference_context.entry.title}")
         return
 
 
@@ -785,7 +469,7 @@ def main() -> None:
 
     root = Path(__file__).resolve().parents[2]
     actions = ["create-reference", "create-subnote"]
-    action = actions[_prompt_choice("Select action:", actions)]
+    action = actions[prompt_choice("Select action:", actions)]
 
     if action == "create-reference":
         _create_reference_note(root)
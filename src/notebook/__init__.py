@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Iterator
+import re
+
+
+ROOT = Path(__file__).resolve().parents[2]
+NOTE_DIRS = ("projects", "literature-notebook")
+
+_FRONTMATTER_RE = re.compile(r"\A---\n(.*?)\n---\n?", re.DOTALL)
+_HEADING_RE = re.compile(r"^##\s+(.+?)\s*$", re.MULTILINE)
+
+
+def iter_note_paths(root: Path = ROOT) -> Iterator[Path]:
+    """Yield every Markdown note under the note directories, skipping hidden paths."""
+    for name in NOTE_DIRS:
+        base = root / name
+        if not base.exists():
+            continue
+        for path in base.rglob("*.md"):
+            relative = path.relative_to(base)
+            if any(part.startswith(".") for part in relative.parts):
+                continue
+            if path.is_file():
+                yield path
+
+
+def is_note_path(path: Path, root: Path = ROOT) -> bool:
+    """Whether `path` is (or was) a note that `iter_note_paths` would yield."""
+    if path.suffix != ".md":
+        return False
+    try:
+        relative = path.relative_to(root)
+    except ValueError:
+        return False
+    return (
+        len(relative.parts) > 1
+        and relative.parts[0] in NOTE_DIRS
+        and not any(part.startswith(".") for part in relative.parts[1:])
+    )
+
+
+def expand_note_paths(paths: Iterable[Path]) -> list[Path]:
+    """Expand files and directories into the Markdown notes they contain."""
+    notes: list[Path] = []
+    for path in paths:
+        path = path.resolve()
+        notes.extend([path] if path.is_file() else sorted(path.rglob("*.md")))
+    return notes
+
+
+def split_frontmatter(text: str) -> tuple[str, str]:
+    """Return (frontmatter, body). Frontmatter is empty when the note has none."""
+    match = _FRONTMATTER_RE.match(text)
+    if not match:
+        return "", text
+    return match.group(1), text[match.end():]
+
+
+def frontmatter_value(frontmatter: str, key: str) -> str:
+    """Read a scalar `key: value` line from frontmatter, stripping quotes."""
+    match = re.search(rf"^{re.escape(key)}:[ \t]*(.*)$", frontmatter, re.MULTILINE)
+    if not match:
+        return ""
+    return match.group(1).strip().strip('"').strip("'")
+
+
+def frontmatter_list(frontmatter: str, key: str) -> list[str]:
+    """Read a YAML list (`key: [a, b]` or indented `- item` lines) from frontmatter."""
+    match = re.search(rf"^{re.escape(key)}:[ \t]*(.*)$", frontmatter, re.MULTILINE)
+    if not match:
+        return []
+    inline = match.group(1).strip()
+    if inline.startswith("[") and inline.endswith("]"):
+        items = inline[1:-1].split(",")
+    elif inline:
+        items = [inline]
+    else:
+        items = []
+        for line in frontmatter[match.end():].lstrip("\n").splitlines():
+            item = re.match(r"^\s*-\s+(.*)$", line)
+            if not item:
+                break
+            items.append(item.group(1))
+    return [item.strip().strip('"').strip("'") for item in items if item.strip()]
+
+
+def parse_sections(body: str) -> list[tuple[str, str]]:
+    """Split a note body into (heading, content) pairs on level-2 headings.
+
+    Content before the first heading is returned with an empty heading.
+    """
+    sections: list[tuple[str, str]] = []
+    matches = list(_HEADING_RE.finditer(body))
+    first_start = matches[0].start() if matches else len(body)
+    if body[:first_start].strip():
+        sections.append(("", body[:first_start]))
+    for idx, match in enumerate(matches):
+        end = matches[idx + 1].start() if idx + 1 < len(matches) else len(body)
+        sections.append((match.group(1), body[match.end():end]))
+    return sections
@@ -0,0 +1,213 @@
+"""
+BibTeX parsing and the literature-notebook naming rules built on it.
+
+Shared by the literature note CLI and the notebook maintenance commands so that
+every tool agrees on how a citekey maps to a reference directory.
+"""
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import json
+import re
+
+from src.notebook import ROOT, templates, tracing
+
+
+DEFAULT_CACHE_PATH = ROOT / "tmp" / "bibtex-cache.json"
+
+
+@dataclass(frozen=True)
+class BibEntry:
+    citekey: str
+    title: str
+    year: str
+    entry_type: str
+    authors: str
+    url: str = ""
+    files: tuple[str, ...] = ()
+
+
+def sanitize_slug(text: str) -> str:
+    cleaned = text.strip().lower()
+    cleaned = cleaned.replace("&", "and")
+    cleaned = re.sub(r"[^a-z0-9]+", "-", cleaned)
+    cleaned = cleaned.strip("-")
+    return cleaned or "untitled"
+
+
+def sanitize_title(text: str) -> str:
+    cleaned = text.replace("{", "").replace("}", "")
+    cleaned = re.sub(r"\s+", " ", cleaned)
+    return cleaned.strip()
+
+
+def split_citekey_year(citekey: str, year: str) -> str:
+    if year and re.search(rf"[_-]{re.escape(year)}$", citekey):
+        return citekey[: -(len(year) + 1)].rstrip("._-")
+    return citekey
+
+
+def get_bibtex_path(root: Path) -> Path:
+    symlink_path = root / "src" / "literature-note" / "references.bib"
+    if symlink_path.exists():
+        return symlink_path
+    return Path("~/Zotero/better-bibtex/My Library.bib").expanduser()
+
+
+def _split_file_field(value: str) -> tuple[str, ...]:
+    # Better BibTeX writes `path;path`; JabRef style is `desc:path:type`
+    files = []
+    for part in value.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        pieces = part.split(":")
+        if len(pieces) >= 3 and not re.match(r"^[A-Za-z]$", pieces[0]):
+            part = ":".join(pieces[1:-1])
+        files.append(part)
+    return tuple(files)
+
+
+def parse_bibtex_entries(bib_path: Path) -> list[BibEntry]:
+    """Parse entries with a title, newest first. Raises FileNotFoundError if the file is missing."""
+    if not bib_path.exists():
+        raise FileNotFoundError(f"BibTeX file not found: {bib_path}")
+
+    try:
+        import bibtexparser
+        from bibtexparser.bparser import BibTexParser
+    except ImportError:
+        raise RuntimeError("Missing dependency: bibtexparser. Install with `uv add bibtexparser`.")
+
+    parser = BibTexParser(common_strings=True)
+    with tracing.span("bibtex.read", path=str(bib_path)):
+        content = bib_path.read_text(encoding="utf-8")
+    with tracing.span("bibtex.parse"):
+        database = bibtexparser.loads(content, parser=parser)
+    tracing.count("bibtex.entries", len(database.entries))
+
+    entries: list[BibEntry] = []
+    for entry in database.entries:
+        title = sanitize_title(entry.get("title", ""))
+        if not title:
+            continue
+        year = entry.get("year") or ""
+        if not year:
+            date_field = entry.get("date", "")
+            match = re.search(r"\d{4}", date_field)
+            year = match.group(0) if match else ""
+
+        authors_raw = entry.get("author", "")
+        authors = (
+            authors_raw.replace("{", "")
+            .replace("}", "")
+            .replace(" and ", ", ")
+            .strip()
+        )
+        citekey = entry.get("ID", "").strip()
+        entry_type = entry.get("ENTRYTYPE", "").strip()
+        url = entry.get("url", "").strip()
+
+        entries.append(
+            BibEntry(
+                citekey=citekey,
+                title=title,
+                year=year,
+                entry_type=entry_type,
+                url=url,
+                authors=authors,
+                files=_split_file_field(entry.get("file", "")),
+            )
+        )
+
+    def _year_key(entry: BibEntry) -> int:
+        return int(entry.year) if entry.year.isdigit() else 0
+
+    return sorted(entries, key=_year_key, reverse=True)
+
+
+def load_bibtex_entries(bib_path: Path, cache_path: Path = DEFAULT_CACHE_PATH) -> list[BibEntry]:
+    """`parse_bibtex_entries` through an on-disk cache that is reused while the file's mtime and size match."""
+    if not bib_path.exists():
+        raise FileNotFoundError(f"BibTeX file not found: {bib_path}")
+    stat = bib_path.stat()
+    stamp = [str(bib_path.resolve()), stat.st_mtime_ns, stat.st_size]
+    if cache_path.exists():
+        try:
+            cached = json.loads(cache_path.read_text(encoding="utf-8"))
+        except ValueError:
+            cached = {}
+        if cached.get("stamp") == stamp:
+            tracing.count("bibtex.cache_hits")
+            return [BibEntry(**{**entry, "files": tuple(entry["files"])}) for entry in cached["entries"]]
+
+    entries = parse_bibtex_entries(bib_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+    tmp_path.write_text(
+        json.dumps({"stamp": stamp, "entries": [asdict(entry) for entry in entries]}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+    tmp_path.replace(cache_path)
+    return entries
+
+
+def reference_slug_key(entry: BibEntry) -> str:
+    """The `{slug_key}` part of `{slug_key}-{year}-...` directory and note names."""
+    year = entry.year or "unknown"
+    base_key = split_citekey_year(entry.citekey, year)
+    return sanitize_slug(base_key or entry.citekey)
+
+
+def get_reference_paths(root: Path, entry: BibEntry) -> tuple[Path, Path]:
+    """Calculate directory and reference note paths for a BibEntry."""
+    year = entry.year or "unknown"
+    slug_key = reference_slug_key(entry)
+    slug_title = sanitize_slug(entry.title)
+
+    directory_name = f"{slug_key}-{year}-{slug_title}"
+    target_dir = root / "literature-notebook" / directory_name
+    filename = f"{slug_key}-{year}-reference-note.md"
+    note_path = target_dir / filename
+
+    return target_dir, note_path
+
+
+def render_reference_note(entry: BibEntry) -> str:
+    """Reference note for an entry, from the `literature-note/reference` template."""
+    context = {
+        "title": entry.title,
+        "authors": entry.authors or "",
+        "year": entry.year,
+        "entry_type": entry.entry_type,
+        "citekey": entry.citekey,
+        "url": entry.url,
+    }
+    return templates.render_note("literature-note", "reference", context)
+
+
+@tracing.traced("fs.find_reference_directory")
+def find_existing_reference_directory(root: Path, entry: BibEntry) -> Path | None:
+    """Find existing directory matching citekey pattern, regardless of title slug."""
+    year = entry.year or "unknown"
+    slug_key = reference_slug_key(entry)
+
+    # Search for directories matching pattern: {slug_key}-{year}-*
+    pattern = f"{slug_key}-{year}-*"
+    notebook_dir = root / "literature-notebook"
+    if not notebook_dir.exists():
+        return None
+
+    # Prefer exact match if it exists
+    exact_dir = notebook_dir / f"{slug_key}-{year}-{sanitize_slug(entry.title)}"
+    if exact_dir.exists() and exact_dir.is_dir():
+        return exact_dir
+    # Otherwise the first match (by name) that holds the reference note, then the first match.
+    # Several matches mean the title changed; `notebook_cli.py fsck` merges them.
+    matches = sorted(match for match in notebook_dir.glob(pattern) if match.is_dir())
+    reference_name = f"{slug_key}-{year}-reference-note.md"
+    for match in matches:
+        if (match / reference_name).exists():
+            return match
+    return matches[0] if matches else None
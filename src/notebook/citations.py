@@ -0,0 +1,186 @@
+"""
+Citation integrity check between notes and the BibTeX library.
+
+The BibTeX entries are loaded once into dicts keyed by citekey and by
+(title slug, year). Notes are then read in parallel and scanned for the
+frontmatter `citekey:` written by reference notes and for inline Pandoc-style
+citations (`[@key]`, `[see @key, p. 3; @other]`). Each citation is a dict
+lookup, so one pass stays fast on large libraries.
+
+Findings:
+- missing: the key is not in the library
+- renamed: the key is not in the library, but the note's title and year (or a
+  case-insensitive key match) identify the entry under a new key, e.g. after
+  Better BibTeX regenerated it
+- duplicate: the library defines a key more than once, or several reference
+  notes claim the same key
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import bisect
+import re
+
+from src.notebook import ROOT, frontmatter_value, iter_note_paths, split_frontmatter, tracing
+from src.notebook.bibtex import BibEntry, sanitize_slug, sanitize_title
+
+
+DEFAULT_WORKERS = 8
+
+_BRACKET_RE = re.compile(r"\[[^\[\]]*@[^\[\]]*\]")
+# Pandoc citekeys: start with a word character, may contain internal punctuation
+_KEY_RE = re.compile(r"(?<![\w@])-?@([\w][\w:.#$%&+?<>~/-]*)")
+_CODE_RE = re.compile(r"```.*?```|`[^`\n]*`", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class Citation:
+    path: str
+    line: int
+    key: str
+    inline: bool
+
+
+@dataclass(frozen=True)
+class RenamedCitation:
+    citation: Citation
+    new_key: str
+
+
+@dataclass
+class CitationReport:
+    notes: int = 0
+    citations: int = 0
+    missing: list[Citation] = field(default_factory=list)
+    renamed: list[RenamedCitation] = field(default_factory=list)
+    duplicate_entries: Dict[str, int] = field(default_factory=dict)
+    duplicate_notes: Dict[str, list[str]] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.renamed or self.duplicate_entries or self.duplicate_notes)
+
+
+@dataclass(frozen=True)
+class _NoteCitations:
+    path: str
+    citekey: Optional[Citation]
+    title: str
+    year: str
+    inline: tuple[Citation, ...]
+
+
+class LibraryIndex:
+    """Hash lookups over the BibTeX entries, built once per check."""
+
+    def __init__(self, entries: Iterable[BibEntry]) -> None:
+        self.by_key: Dict[str, BibEntry] = {}
+        self.by_folded_key: Dict[str, str] = {}
+        self.by_title: Dict[tuple[str, str], str] = {}
+        self.duplicates: Dict[str, int] = {}
+        for entry in entries:
+            self.by_title.setdefault((sanitize_slug(entry.title), entry.year), entry.citekey)
+            if entry.citekey in self.by_key:
+                self.duplicates[entry.citekey] = self.duplicates.get(entry.citekey, 1) + 1
+                continue
+            self.by_key[entry.citekey] = entry
+            self.by_folded_key.setdefault(entry.citekey.lower(), entry.citekey)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.by_key
+
+    def find_renamed(self, key: str, title: str = "", year: str = "") -> Optional[str]:
+        """The current key of an entry cited under an old `key`, if it can be identified."""
+        folded = self.by_folded_key.get(key.lower())
+        if folded:
+            return folded
+        if title:
+            return self.by_title.get((sanitize_slug(sanitize_title(title)), year))
+        return None
+
+
+def _blank_code(text: str) -> str:
+    """Replace code spans and fences with spaces, keeping offsets and line breaks."""
+    return _CODE_RE.sub(lambda match: re.sub(r"[^\n]", " ", match.group(0)), text)
+
+
+def scan_note(note_path: Path, root: Path = ROOT) -> _NoteCitations:
+    rel = note_path.relative_to(root).as_posix()
+    text = note_path.read_text(encoding="utf-8")
+    frontmatter, _ = split_frontmatter(text)
+
+    citekey = None
+    key = frontmatter_value(frontmatter, "citekey")
+    if key:
+        line = next((idx for idx, line in enumerate(text.splitlines(), 1) if line.startswith("citekey:")), 1)
+        citekey = Citation(rel, line, key, inline=False)
+
+    inline: list[Citation] = []
+    if "@" in text:
+        searchable = _blank_code(text)
+        line_starts = [0] + [match.end() for match in re.finditer("\n", searchable)]
+        for bracket in _BRACKET_RE.finditer(searchable):
+            for match in _KEY_RE.finditer(bracket.group(0)):
+                key = match.group(1).rstrip(":.#$%&+?<>~/-")
+                line = bisect.bisect_right(line_starts, bracket.start() + match.start())
+                inline.append(Citation(rel, line, key, inline=True))
+
+    return _NoteCitations(
+        path=rel,
+        citekey=citekey,
+        title=frontmatter_value(frontmatter, "title"),
+        year=frontmatter_value(frontmatter, "year"),
+        inline=tuple(inline),
+    )
+
+
+@tracing.traced("citations.check")
+def check_citations(
+    entries: Iterable[BibEntry],
+    root: Path = ROOT,
+    workers: int = DEFAULT_WORKERS,
+) -> CitationReport:
+    """Check every note's citations against `entries` in one pass."""
+    with tracing.span("citations.index"):
+        library = LibraryIndex(entries)
+    report = CitationReport(duplicate_entries=dict(library.duplicates))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        scanned = list(pool.map(lambda path: scan_note(path, root), iter_note_paths(root)))
+    report.notes = len(scanned)
+
+    # Reference notes pin a key to a title, which also resolves inline uses of a renamed key
+    claimed: Dict[str, list[str]] = {}
+    renamed_keys: Dict[str, str] = {}
+    for note in scanned:
+        if not note.citekey:
+            continue
+        report.citations += 1
+        key = note.citekey.key
+        claimed.setdefault(key, []).append(note.path)
+        if key in library:
+            continue
+        new_key = library.find_renamed(key, note.title, note.year)
+        if new_key:
+            renamed_keys[key] = new_key
+            report.renamed.append(RenamedCitation(note.citekey, new_key))
+        else:
+            report.missing.append(note.citekey)
+
+    for note in scanned:
+        for citation in note.inline:
+            report.citations += 1
+            if citation.key in library:
+                continue
+            new_key = renamed_keys.get(citation.key) or library.find_renamed(citation.key)
+            if new_key:
+                report.renamed.append(RenamedCitation(citation, new_key))
+            else:
+                report.missing.append(citation)
+
+    report.duplicate_notes = {key: sorted(paths) for key, paths in claimed.items() if len(paths) > 1}
+    tracing.count("citations.checked", report.citations)
+    return report
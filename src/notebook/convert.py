@@ -0,0 +1,279 @@
+"""
+Convert a folder of readings (PDF, slides, documents) to Markdown with markitdown.
+
+Each reading is matched to a BibTeX entry and written to `sources/` inside that
+entry's reference directory, whose reference note is created if it is missing.
+Readings that would share an output file (`a/Intro.pdf` and `b/intro.docx`)
+get the source extension, and then a counter, appended to their names.
+Conversions run in a process pool; a content-hash cache (appended after every
+finished file) skips readings converted before, so an interrupted run resumes
+where it stopped.
+"""
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+import hashlib
+import importlib.util
+import json
+import os
+import re
+
+from src.notebook import ROOT, locking, tracing
+from src.notebook.bibtex import (
+    BibEntry,
+    find_existing_reference_directory,
+    get_reference_paths,
+    reference_slug_key,
+    render_reference_note,
+    sanitize_slug,
+)
+
+
+DEFAULT_CACHE_PATH = ROOT / "tmp" / "convert-cache.jsonl"
+DEFAULT_UNMATCHED_DIR = ROOT / "tmp" / "converted"
+SUPPORTED_SUFFIXES = {".pdf", ".docx", ".pptx", ".xlsx", ".xls", ".html", ".htm", ".epub"}
+_HASH_CHUNK = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ConvertJob:
+    source: Path
+    output: Path
+    digest: str
+    size: int
+    mtime_ns: int
+    citekey: str = ""
+    entry: Optional[BibEntry] = None
+
+
+@dataclass(frozen=True)
+class ConvertEvent:
+    done: int
+    total: int
+    job: ConvertJob
+    error: str = ""
+
+
+class _EntryMatcher:
+    """Index BibTeX entries once so each reading is matched with dictionary lookups."""
+
+    def __init__(self, entries: list[BibEntry]) -> None:
+        self.by_file: dict[str, BibEntry] = {}
+        self.by_key_year: dict[str, list[BibEntry]] = {}
+        self.by_title: dict[str, BibEntry] = {}
+        for entry in entries:
+            for file in entry.files:
+                self.by_file.setdefault(Path(file).name.lower(), entry)
+            key_year = f"{reference_slug_key(entry)}-{entry.year or 'unknown'}"
+            self.by_key_year.setdefault(key_year, []).append(entry)
+            self.by_title.setdefault(sanitize_slug(entry.title), entry)
+
+    def match(self, source: Path) -> Optional[BibEntry]:
+        # 1. Zotero attachment listed in the entry's `file` field
+        entry = self.by_file.get(source.name.lower())
+        if entry:
+            return entry
+        # 2. `Author - 2020 - Title.pdf` style names: slug up to the year
+        stem_slug = sanitize_slug(source.stem)
+        year_match = re.search(r"(?:^|-)((?:19|20)\d{2})(?:-|$)", stem_slug)
+        if year_match:
+            candidates = self.by_key_year.get(stem_slug[: year_match.end(1)], [])
+            if len(candidates) == 1:
+                return candidates[0]
+            for candidate in candidates:
+                if sanitize_slug(candidate.title) in stem_slug:
+                    return candidate
+        # 3. File named after the title
+        return self.by_title.get(stem_slug)
+
+
+class _ConvertCache:
+    """Append-only JSONL cache; the last record for a source path wins."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.by_source: dict[str, dict] = {}
+        if path.exists():
+            for line in path.read_text(encoding="utf-8").splitlines():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+                self.by_source[record["source"]] = record
+
+    def is_fresh(self, source: Path, output: Path, size: int, mtime_ns: int, digest: str | None) -> bool:
+        record = self.by_source.get(str(source))
+        if not record or record["output"] != str(output) or not output.exists():
+            return False
+        if record["size"] == size and record["mtime_ns"] == mtime_ns:
+            return True
+        return digest is not None and record["digest"] == digest
+
+    def record(self, job: ConvertJob) -> None:
+        record = {
+            "source": str(job.source),
+            "output": str(job.output),
+            "digest": job.digest,
+            "size": job.size,
+            "mtime_ns": job.mtime_ns,
+        }
+        self.by_source[record["source"]] = record
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _output_dir(root: Path, entry: Optional[BibEntry], unmatched_dir: Path) -> Path:
+    if entry is None:
+        return unmatched_dir
+    directory = find_existing_reference_directory(root, entry) or get_reference_paths(root, entry)[0]
+    return directory / "sources"
+
+
+def _output_paths(sources: list[tuple[Path, Optional[BibEntry]]], root: Path, unmatched_dir: Path) -> list[Path]:
+    """Output file per source. Sources that would share a file get their extension, then a counter, appended."""
+    stems = [(_output_dir(root, entry, unmatched_dir), sanitize_slug(source.stem)) for source, entry in sources]
+    counts: dict[tuple[Path, str], int] = {}
+    for key in stems:
+        counts[key] = counts.get(key, 0) + 1
+
+    outputs: list[Path] = []
+    taken: set[Path] = set()
+    for (source, _), (directory, stem) in zip(sources, stems):
+        if counts[(directory, stem)] > 1:
+            stem = f"{stem}-{source.suffix.lstrip('.').lower()}"
+        output = directory / f"{stem}.md"
+        suffix = 1
+        while output in taken:
+            suffix += 1
+            output = directory / f"{stem}-{suffix}.md"
+        taken.add(output)
+        outputs.append(output)
+    return outputs
+
+
+def _ensure_reference_note(root: Path, job: ConvertJob) -> None:
+    """Create the reference note of the directory a converted reading went into, if it has none."""
+    if job.entry is None:
+        return
+    note_path = job.output.parent.parent / get_reference_paths(root, job.entry)[1].name
+    if note_path.exists():
+        return
+    try:
+        locking.create_exclusive(note_path, render_reference_note(job.entry))
+    except FileExistsError:
+        pass
+
+
+@tracing.traced("convert.plan")
+def plan_conversion(
+    readings_dir: Path,
+    entries: list[BibEntry],
+    root: Path = ROOT,
+    cache_path: Path = DEFAULT_CACHE_PATH,
+    unmatched_dir: Path = DEFAULT_UNMATCHED_DIR,
+    force: bool = False,
+) -> tuple[list[ConvertJob], int]:
+    """Return (jobs to run, number skipped as already converted)."""
+    matcher = _EntryMatcher(entries)
+    cache = _ConvertCache(cache_path)
+    sources = [
+        (source.resolve(), matcher.match(source))
+        for source in sorted(readings_dir.rglob("*"))
+        if source.suffix.lower() in SUPPORTED_SUFFIXES and source.is_file()
+    ]
+    jobs: list[ConvertJob] = []
+    skipped = 0
+    for (source, entry), output in zip(sources, _output_paths(sources, root, unmatched_dir)):
+        stat = source.stat()
+        if not force and cache.is_fresh(source, output, stat.st_size, stat.st_mtime_ns, None):
+            skipped += 1
+            continue
+        digest = _hash_file(source)
+        if not force and cache.is_fresh(source, output, stat.st_size, stat.st_mtime_ns, digest):
+            skipped += 1
+            continue
+        jobs.append(
+            ConvertJob(
+                source=source,
+                output=output,
+                digest=digest,
+                size=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                citekey=entry.citekey if entry else "",
+                entry=entry,
+            )
+        )
+    return jobs, skipped
+
+
+_converter = None
+
+
+def _init_worker() -> None:
+    global _converter
+    from markitdown import MarkItDown
+
+    _converter = MarkItDown()
+
+
+def _convert_one(source: str, output: str, citekey: str) -> None:
+    result = _converter.convert(source)
+    header = f'---\ntitle: "{Path(source).stem}"\nconverted-from: "{source}"\n'
+    if citekey:
+        header += f"source-citekey: {citekey}\n"
+    header += "---\n\n"
+
+    out = Path(output)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_text(header + (result.text_content or ""), encoding="utf-8")
+    tmp.replace(out)
+
+
+def run_conversion(
+    jobs: list[ConvertJob],
+    cache_path: Path = DEFAULT_CACHE_PATH,
+    workers: Optional[int] = None,
+    root: Path = ROOT,
+) -> Iterator[ConvertEvent]:
+    """Convert jobs in a process pool, yielding an event as each one finishes."""
+    if not jobs:
+        return
+    if importlib.util.find_spec("markitdown") is None:
+        raise RuntimeError("Missing dependency: markitdown. Install with `uv add 'markitdown[all]'`.")
+
+    cache = _ConvertCache(cache_path)
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = {
+            pool.submit(_convert_one, str(job.source), str(job.output), job.citekey): job
+            for job in jobs
+        }
+        try:
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = pending.pop(future)
+                    done += 1
+                    error = future.exception()
+                    if error is None:
+                        cache.record(job)
+                        _ensure_reference_note(root, job)
+                    yield ConvertEvent(done=done, total=len(jobs), job=job, error=str(error or ""))
+        except BaseException:
+            # On Ctrl-C, drop queued work; finished files are already in the cache
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
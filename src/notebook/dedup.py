@@ -0,0 +1,205 @@
+"""
+Near-duplicate detection over BibTeX entries with MinHash and LSH.
+
+Each entry is reduced to a set of shingles: byte 4-grams of its
+normalized title plus its author name tokens. Normalization keeps every
+Unicode letter and digit, so CJK and Cyrillic titles shingle like Latin ones;
+entries with no shingles at all are left out. The year and entry type are left
+out, so a preprint and its published version still match. A 128-value MinHash
+signature estimates the Jaccard similarity of two shingle sets.
+Signatures are split into 32 bands of 4 values, and entries that share a band
+become candidate pairs. Only those pairs are compared, which keeps the work
+close to linear in the library size instead of comparing every pair.
+Candidates whose estimated similarity reaches the threshold are merged into
+clusters.
+
+Signatures are cached in `tmp/bibtex-minhash.npz`, next to the parsed-entry
+cache, keyed by a digest of each entry's normalized text. Only new or edited
+entries are hashed again.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+from src.notebook import tracing
+from src.notebook.bibtex import DEFAULT_CACHE_PATH, BibEntry
+
+
+DEFAULT_SIGNATURES_PATH = DEFAULT_CACHE_PATH.with_name("bibtex-minhash.npz")
+DEFAULT_THRESHOLD = 0.5
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+# Entries hashed per numpy batch; bounds the (shingles x NUM_PERM) intermediate
+_CHUNK = 1000
+_SEED = 1
+
+_WORD_RE = re.compile(r"[^\W_]+")
+_rng = np.random.default_rng(_SEED)
+# Multiply-shift hashing: the high 32 bits of (a * x + b) mod 2**64, with odd a
+_A = _rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_B = _rng.integers(0, 1 << 63, size=(NUM_PERM, 1), dtype=np.uint64)
+# Mixes a band's ROWS values into one bucket key
+_BAND_MIX = _rng.integers(0, 1 << 63, size=ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+
+@dataclass(frozen=True)
+class DuplicateCluster:
+    entries: tuple[BibEntry, ...]
+    similarity: float
+
+
+def normalized_text(entry: BibEntry) -> tuple[str, list[str]]:
+    """(normalized title, author name tokens) used for shingling."""
+    title = " ".join(_WORD_RE.findall(entry.title.casefold()))
+    authors = sorted(set(token for token in _WORD_RE.findall(entry.authors.casefold()) if len(token) > 1))
+    return title, authors
+
+
+def _digest(title: str, authors: list[str]) -> bytes:
+    return hashlib.sha1(f"{title}\0{' '.join(authors)}".encode("utf-8")).digest()
+
+
+def _title_grams(titles: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    """Every byte 4-gram of each padded title packed into a uint32, and the owning title index."""
+    padded = [(b" " + title + b" ").ljust(SHINGLE_SIZE) for title in titles]
+    lengths = np.fromiter((len(title) for title in padded), dtype=np.int64, count=len(padded))
+    buffer = np.frombuffer(b"".join(padded), dtype=np.uint8).astype(np.uint32)
+    grams = buffer[:-3] << 24 | buffer[1:-2] << 16 | buffer[2:-1] << 8 | buffer[3:]
+    # Drop the grams that straddle two titles
+    counts = lengths - (SHINGLE_SIZE - 1)
+    starts = np.cumsum(lengths) - lengths
+    owner = np.repeat(np.arange(len(padded)), counts)
+    positions = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts) + starts[owner]
+    return grams[positions], owner
+
+
+def _signatures(texts: list[tuple[str, list[str]]]) -> np.ndarray:
+    """MinHash signatures, one uint32 row per (title, authors) pair."""
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), _CHUNK):
+        chunk = texts[start:start + _CHUNK]
+        grams, owner = _title_grams([title.encode("utf-8") for title, _ in chunk])
+        authors = [(idx, zlib.crc32(f"@{author}".encode("utf-8"))) for idx, (_, names) in enumerate(chunk) for author in names]
+        if authors:
+            author_owner, author_hashes = np.array(authors, dtype=np.int64).T
+            grams = np.concatenate((grams, author_hashes.astype(np.uint32)))
+            owner = np.concatenate((owner, author_owner))
+        order = np.argsort(owner, kind="stable")
+        values, owner = grams[order].astype(np.uint64), owner[order]
+        hashed = ((_A * values + _B) >> np.uint64(32)).astype(np.uint32)
+        offsets = np.searchsorted(owner, np.arange(len(chunk)))
+        signatures[start:start + len(chunk)] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+@tracing.traced("dedup.signatures")
+def load_signatures(entries: list[BibEntry], path: Path = DEFAULT_SIGNATURES_PATH) -> np.ndarray:
+    """Signatures for `entries`, reusing cached rows whose normalized text is unchanged."""
+    texts = [normalized_text(entry) for entry in entries]
+    digests = [_digest(title, authors) for title, authors in texts]
+    cached_rows: Dict[bytes, int] = {}
+    cached = np.empty((0, NUM_PERM), dtype=np.uint32)
+    if path.exists():
+        with np.load(path) as data:
+            if data["signatures"].shape[1:] == (NUM_PERM,) and int(data["seed"]) == _SEED:
+                cached = data["signatures"]
+                cached_rows = {digest: row for row, digest in enumerate(data["digests"].tolist())}
+
+    rows = np.fromiter((cached_rows.get(digest, -1) for digest in digests), dtype=np.int64, count=len(digests))
+    missing = np.flatnonzero(rows < 0)
+    tracing.count("dedup.hashed", len(missing))
+    signatures = np.empty((len(entries), NUM_PERM), dtype=np.uint32)
+    hit = rows >= 0
+    signatures[hit] = cached[rows[hit]]
+    if len(missing):
+        signatures[missing] = _signatures([texts[idx] for idx in missing])
+
+    if len(missing) or len(cached_rows) != len(set(digests)):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp_path, digests=np.array(digests, dtype="S20"), signatures=signatures, seed=_SEED)
+        tmp_path.replace(path)
+    return signatures
+
+
+def _candidate_pairs(signatures: np.ndarray) -> np.ndarray:
+    """Index pairs (i < j) that share at least one LSH band."""
+    count = len(signatures)
+    bands = signatures.reshape(count, BANDS, ROWS).astype(np.uint64)
+    # One key per (band, entry); the band number keeps equal values in different bands apart
+    keys = (bands * _BAND_MIX).sum(axis=2, dtype=np.uint64) ^ np.arange(BANDS, dtype=np.uint64)
+    keys = keys.T.ravel()
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    members = order % count
+
+    pairs = []
+    # Bucket members sit next to each other after sorting: pair each with the ones `gap` places
+    # later. A position can only pair at `gap + 1` if it paired at `gap`, so the search shrinks.
+    same = np.arange(len(sorted_keys) - 1)
+    gap = 1
+    while len(same):
+        same = same[same + gap < len(sorted_keys)]
+        same = same[sorted_keys[same + gap] == sorted_keys[same]]
+        first, second = members[same], members[same + gap]
+        pairs.append(np.minimum(first, second) * count + np.maximum(first, second))
+        gap += 1
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    encoded = np.unique(np.concatenate(pairs))
+    return np.stack((encoded // count, encoded % count), axis=1)
+
+
+def _find(parent: list[int], idx: int) -> int:
+    while parent[idx] != idx:
+        parent[idx] = parent[parent[idx]]
+        idx = parent[idx]
+    return idx
+
+
+@tracing.traced("dedup.find")
+def find_duplicates(
+    entries: Iterable[BibEntry],
+    threshold: float = DEFAULT_THRESHOLD,
+    cache_path: Path = DEFAULT_SIGNATURES_PATH,
+) -> list[DuplicateCluster]:
+    """Clusters of entries whose estimated title/author Jaccard similarity is at least `threshold`."""
+    # Without title or author words every signature would be identical
+    entries = [entry for entry in entries if any(normalized_text(entry))]
+    if len(entries) < 2:
+        return []
+    signatures = load_signatures(entries, cache_path)
+    pairs = _candidate_pairs(signatures)
+    tracing.count("dedup.candidates", len(pairs))
+    if not len(pairs):
+        return []
+
+    similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    matched = similarity >= threshold
+    parent = list(range(len(entries)))
+    best: Dict[int, float] = {}
+    for (i, j), score in zip(pairs[matched].tolist(), similarity[matched].tolist()):
+        root_i, root_j = _find(parent, i), _find(parent, j)
+        if root_i != root_j:
+            parent[root_j] = root_i
+            best[root_i] = min(best.get(root_i, 1.0), best.pop(root_j, 1.0), score)
+        else:
+            best[root_i] = min(best.get(root_i, 1.0), score)
+
+    members: Dict[int, list[int]] = {}
+    for idx in {int(i) for pair in pairs[matched] for i in pair}:
+        members.setdefault(_find(parent, idx), []).append(idx)
+    clusters = [
+        DuplicateCluster(tuple(entries[idx] for idx in sorted(indices)), best.get(root, 1.0))
+        for root, indices in members.items()
+    ]
+    return sorted(clusters, key=lambda cluster: (-len(cluster.entries), -cluster.similarity))
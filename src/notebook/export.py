@@ -0,0 +1,450 @@
+"""
+Incremental static HTML export of `projects/` and `literature-notebook/`.
+
+Every run builds a dependency graph of the notebook: each note's
+`[[wikilinks]]` and Markdown links to notes (`[text](other.md)`), its image references (`![[figure.png]]`, `![](figs/a.png)`)
+and the `## Related Notes` links that become backlinks on the target page. A
+page's render key hashes everything its HTML depends on:
+
+- the note's own content
+- where each of its links resolves (or that it is broken)
+- the content of its images (image URLs carry a version suffix)
+- its backlinks and their titles
+
+Only pages whose key changed are rendered again, across a process pool. So
+editing one note re-renders that note, the pages whose links to it changed,
+and the pages its Related Notes point to. Notes are only read when their mtime
+or size changed, and a page whose new HTML hashes the same as the file on disk
+is not rewritten, so unchanged files keep their mtime for rsync.
+
+The output directory holds the pages (same relative paths, `.html`), copied
+images, `index.html`, `style.css`, `links.json` (the link index: links,
+backlinks and images per note) and `.export-manifest.json` (the state of the
+previous run).
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import hashlib
+import html
+import json
+import os
+import posixpath
+import re
+import shutil
+import urllib.parse
+
+from src.notebook import (
+    NOTE_DIRS,
+    ROOT,
+    frontmatter_value,
+    iter_note_paths,
+    parse_sections,
+    split_frontmatter,
+    tracing,
+)
+from src.notebook.render import IMAGE_SUFFIXES, iter_references, render_markdown, split_target
+
+
+DEFAULT_OUTPUT_DIR = ROOT / "tmp" / "html"
+MANIFEST_NAME = ".export-manifest.json"
+LINK_INDEX_NAME = "links.json"
+# Bump when the renderer or page template changes, so every page is rendered again
+RENDER_VERSION = 2
+# Directories searched for `![[name.png]]` embeds
+ATTACHMENT_DIRS = (*NOTE_DIRS, "images")
+# Below this many pages, rendering in-process beats starting a pool
+_POOL_THRESHOLD = 16
+
+_STYLE = """\
+body { max-width: 48rem; margin: 2rem auto; padding: 0 1rem; font: 16px/1.6 system-ui, sans-serif; color: #222; }
+nav { font-size: 0.9rem; color: #666; margin-bottom: 1rem; }
+a { color: #0b63c5; } .broken-link { color: #b00; border-bottom: 1px dotted #b00; }
+pre { background: #f5f5f5; padding: 0.75rem; overflow-x: auto; } code { font-size: 0.9em; }
+table { border-collapse: collapse; } th, td { border: 1px solid #ddd; padding: 0.25rem 0.5rem; }
+blockquote, .callout { border-left: 3px solid #ccc; margin: 1rem 0; padding: 0 1rem; color: #444; }
+.callout-title { font-weight: bold; } li.task { list-style: none; } img { max-width: 100%; }
+.backlinks { border-top: 1px solid #ddd; margin-top: 2rem; font-size: 0.95rem; }
+"""
+_MATHJAX = '<script defer src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-chtml.js"></script>\n'
+
+
+@dataclass
+class _Note:
+    """What the previous run learned about a note; stored in the manifest."""
+
+    digest: str
+    mtime_ns: int
+    size: int
+    title: str
+    links: list[str]
+    images: list[str]
+    related: list[str]
+    key: str = ""
+    output_digest: str = ""
+
+
+@dataclass
+class ExportReport:
+    notes: int = 0
+    rendered: int = 0
+    written: int = 0
+    removed: int = 0
+    images: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class _PageJob:
+    rel: str
+    source: str
+    output: str
+    title: str
+    links: Dict[str, Optional[str]]
+    images: Dict[str, str]
+    backlinks: tuple[tuple[str, str], ...]
+    nav: str
+    output_digest: str
+
+
+# --- Scanning ---------------------------------------------------------------------
+
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _parse_note(path: Path, text: str, digest: str, stat: os.stat_result) -> _Note:
+    frontmatter, body = split_frontmatter(text)
+    links, images = iter_references(body)
+    related: list[str] = []
+    for heading, content in parse_sections(body):
+        if heading.strip().lower() == "related notes":
+            related.extend(split_target(target)[0] for target in iter_references(content)[0])
+    return _Note(
+        digest=digest,
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        title=frontmatter_value(frontmatter, "title") or path.stem,
+        links=sorted({split_target(target)[0] for target in links} - {""}),
+        images=sorted(set(images)),
+        related=sorted(set(related) - {""}),
+    )
+
+
+def _scan_notes(root: Path, previous: Dict[str, _Note]) -> Dict[str, _Note]:
+    """Current notes by relative path. Notes whose mtime and size are unchanged are not read."""
+    notes: Dict[str, _Note] = {}
+    for path in iter_note_paths(root):
+        rel = path.relative_to(root).as_posix()
+        stat = path.stat()
+        known = previous.get(rel)
+        if known and known.mtime_ns == stat.st_mtime_ns and known.size == stat.st_size:
+            notes[rel] = known
+            continue
+        data = path.read_bytes()
+        digest = _sha1(data)
+        if known and known.digest == digest:
+            notes[rel] = _Note(**{**asdict(known), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+            continue
+        notes[rel] = _parse_note(path, data.decode("utf-8"), digest, stat)
+    tracing.count("export.notes", len(notes))
+    return notes
+
+
+class _Resolver:
+    """Resolves link names and image references the way Obsidian does: by file name, case-insensitively.
+
+    Markdown links (`other.md`, `../notes/other.md`) resolve as paths relative to the linking note
+    first, and by file name if that note does not exist. Paths with a leading `/` are relative to
+    the root.
+    """
+
+    def __init__(self, root: Path, rels: Iterable[str]) -> None:
+        self.root = root
+        self.rels = set(rels)
+        self.by_stem: Dict[str, list[str]] = {}
+        for rel in sorted(self.rels):
+            self.by_stem.setdefault(posixpath.basename(rel)[: -len(".md")].lower(), []).append(rel)
+        self._attachments: Optional[Dict[str, str]] = None
+
+    def note(self, name: str, from_rel: str) -> Optional[str]:
+        if name.lower().endswith(".md"):
+            base = "" if name.startswith("/") else posixpath.dirname(from_rel)
+            rel = posixpath.normpath(posixpath.join(base, name.lstrip("/")))
+            if rel in self.rels:
+                return rel
+            name = re.sub(r"^(?:\.\.?/)+", "", name.lstrip("/"))[: -len(".md")]
+        candidates = self.by_stem.get(posixpath.basename(name).lower(), [])
+        if "/" in name:
+            suffix = f"{name.lower()}.md"
+            candidates = [rel for rel in candidates if rel.lower().endswith(suffix)]
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+        # Same stem in several folders: prefer the linking note's folder, then the shortest path
+        folder = posixpath.dirname(from_rel)
+        return min(candidates, key=lambda rel: (posixpath.dirname(rel) != folder, rel.count("/"), rel))
+
+    def _attachment_index(self) -> Dict[str, str]:
+        if self._attachments is None:
+            self._attachments = {}
+            for name in ATTACHMENT_DIRS:
+                for dirpath, dirnames, filenames in os.walk(self.root / name):
+                    dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                    for filename in sorted(filenames):
+                        if Path(filename).suffix.lower() in IMAGE_SUFFIXES:
+                            rel = (Path(dirpath) / filename).relative_to(self.root).as_posix()
+                            self._attachments.setdefault(filename.lower(), rel)
+        return self._attachments
+
+    def image(self, ref: str, from_rel: str) -> Optional[str]:
+        path = urllib.parse.unquote(ref.split("#", 1)[0].split("?", 1)[0])
+        # Snippets write root-relative `/images/...`; other paths are tried from the note, then the root
+        bases = ("",) if path.startswith("/") else (posixpath.dirname(from_rel), "")
+        path = path.lstrip("/")
+        for base in bases:
+            rel = posixpath.normpath(posixpath.join(base, path))
+            if not rel.startswith("../") and (self.root / rel).is_file():
+                return rel
+        return self._attachment_index().get(posixpath.basename(path).lower())
+
+
+def _image_digests(root: Path, rels: Iterable[str], previous: Dict[str, dict]) -> Dict[str, dict]:
+    images: Dict[str, dict] = {}
+    for rel in sorted(set(rels)):
+        stat = (root / rel).stat()
+        known = previous.get(rel)
+        if known and known["mtime_ns"] == stat.st_mtime_ns and known["size"] == stat.st_size:
+            images[rel] = known
+        else:
+            images[rel] = {"digest": _sha1((root / rel).read_bytes()), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    return images
+
+
+# --- Rendering --------------------------------------------------------------------
+
+
+def _page_href(from_rel: str, to_rel: str) -> str:
+    """Relative URL from the page for `from_rel` to the output file for `to_rel`."""
+    target = to_rel[: -len(".md")] + ".html" if to_rel.endswith(".md") else to_rel
+    return urllib.parse.quote(posixpath.relpath(target, posixpath.dirname(from_rel) or "."))
+
+
+def _write_if_changed(path: Path, data: bytes, known_digest: str = "") -> tuple[str, bool]:
+    """Write `data` atomically unless the file already holds it. Returns (digest, written)."""
+    digest = _sha1(data)
+    if path.exists() and (digest == known_digest or _sha1(path.read_bytes()) == digest):
+        return digest, False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+    return digest, True
+
+
+def _render_page(job: _PageJob) -> tuple[str, bool]:
+    """Render one note to its HTML page. Returns (output digest, written). Runs in pool workers."""
+    _, body = split_frontmatter(Path(job.source).read_text(encoding="utf-8"))
+    content = render_markdown(
+        body,
+        resolve_link=lambda name: job.links.get(name),
+        resolve_image=lambda ref: job.images.get(ref),
+    )
+    backlinks = ""
+    if job.backlinks:
+        items = "\n".join(f'<li><a href="{html.escape(href)}">{html.escape(title)}</a></li>' for href, title in job.backlinks)
+        backlinks = f'<section class="backlinks">\n<h2>Backlinks</h2>\n<ul>\n{items}\n</ul>\n</section>\n'
+    title = html.escape(job.title)
+    mathjax = _MATHJAX if '<span class="math' in content or '<div class="math' in content else ""
+    page = (
+        "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">\n"
+        f"<title>{title}</title>\n<link rel=\"stylesheet\" href=\"{job.nav}style.css\">\n"
+        f"{mathjax}"
+        "</head>\n<body>\n"
+        f"<nav><a href=\"{job.nav}index.html\">Index</a> / {html.escape(job.rel)}</nav>\n"
+        f"<article>\n<h1>{title}</h1>\n{content}\n</article>\n{backlinks}"
+        "</body>\n</html>\n"
+    )
+    return _write_if_changed(Path(job.output), page.encode("utf-8"), job.output_digest)
+
+
+def _run_jobs(
+    jobs: list[tuple[_PageJob, str]],
+    workers: Optional[int],
+) -> Iterable[tuple[_PageJob, str, tuple[str, bool] | Exception]]:
+    """Render pages in a process pool, or in-process when there are only a few."""
+    if len(jobs) < _POOL_THRESHOLD or workers == 1:
+        for job, key in jobs:
+            try:
+                yield job, key, _render_page(job)
+            except Exception as e:
+                yield job, key, e
+        return
+    with ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1)) as pool:
+        futures = [(job, key, pool.submit(_render_page, job)) for job, key in jobs]
+        for job, key, future in futures:
+            try:
+                yield job, key, future.result()
+            except Exception as e:
+                yield job, key, e
+
+
+def _render_key(note: _Note, links: Dict[str, Optional[str]], images: Dict[str, str], backlinks: list[tuple[str, str]]) -> str:
+    payload = json.dumps([RENDER_VERSION, note.digest, note.title, links, images, backlinks], sort_keys=True)
+    return _sha1(payload.encode("utf-8"))
+
+
+def _index_page(notes: Dict[str, _Note]) -> str:
+    sections: list[str] = []
+    for name in NOTE_DIRS:
+        rels = [rel for rel in notes if rel.startswith(f"{name}/")]
+        if not rels:
+            continue
+        items = "\n".join(
+            f'<li><a href="{_page_href("index.html", rel)}">{html.escape(notes[rel].title)}</a> '
+            f'<small>{html.escape(posixpath.dirname(rel))}</small></li>'
+            for rel in sorted(rels)
+        )
+        sections.append(f"<h2>{html.escape(name)}</h2>\n<ul>\n{items}\n</ul>")
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+        "<title>Notebook</title>\n<link rel=\"stylesheet\" href=\"style.css\">\n</head>\n<body>\n"
+        f"<h1>Notebook</h1>\n{chr(10).join(sections)}\n</body>\n</html>\n"
+    )
+
+
+def _remove_output(path: Path, output_dir: Path) -> None:
+    path.unlink(missing_ok=True)
+    parent = path.parent
+    while parent != output_dir and parent.is_dir() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+# --- Export -----------------------------------------------------------------------
+
+
+def _load_manifest(output_dir: Path) -> tuple[Dict[str, _Note], Dict[str, dict]]:
+    path = output_dir / MANIFEST_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}, {}
+    if data.get("version") != RENDER_VERSION:
+        return {}, {}
+    return {rel: _Note(**record) for rel, record in data["notes"].items()}, data["images"]
+
+
+def _save_manifest(output_dir: Path, notes: Dict[str, _Note], images: Dict[str, dict]) -> None:
+    data = {"version": RENDER_VERSION, "notes": {rel: asdict(note) for rel, note in sorted(notes.items())}, "images": images}
+    path = output_dir / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+@tracing.traced("export.run")
+def export_html(
+    root: Path = ROOT,
+    output_dir: Path = DEFAULT_OUTPUT_DIR,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> ExportReport:
+    """Bring `output_dir` up to date with the notes, rendering only pages whose inputs changed."""
+    report = ExportReport()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    previous, previous_images = _load_manifest(output_dir)
+
+    with tracing.span("export.scan"):
+        notes = _scan_notes(root, previous)
+        report.notes = len(notes)
+        resolver = _Resolver(root, notes)
+        links = {rel: {name: resolver.note(name, rel) for name in note.links} for rel, note in notes.items()}
+        image_refs = {rel: {ref: resolver.image(ref, rel) for ref in note.images} for rel, note in notes.items()}
+        images = _image_digests(root, (image for refs in image_refs.values() for image in refs.values() if image), previous_images)
+
+    # Graph edges: Related Notes links become backlinks on the target page
+    backlinks: Dict[str, list[str]] = {}
+    for rel, note in notes.items():
+        for name in note.related:
+            target = resolver.note(name, rel)
+            if target and target != rel:
+                backlinks.setdefault(target, []).append(rel)
+
+    jobs: list[tuple[_PageJob, str]] = []
+    for rel, note in notes.items():
+        page_links = links[rel]
+        page_images = {
+            ref: f"{_page_href(rel, image)}?v={images[image]['digest'][:10]}"
+            for ref, image in image_refs[rel].items()
+            if image
+        }
+        page_backlinks = [(_page_href(rel, source), notes[source].title) for source in sorted(set(backlinks.get(rel, [])))]
+        key = _render_key(note, page_links, page_images, page_backlinks)
+        output = output_dir / (rel[: -len(".md")] + ".html")
+        if not force and key == note.key and output.exists():
+            continue
+        # Stays empty if rendering fails, so the page is retried next run
+        note.key = ""
+        job = _PageJob(
+            rel=rel,
+            source=str(root / rel),
+            output=str(output),
+            title=note.title,
+            links={name: _page_href(rel, target) if target else None for name, target in page_links.items()},
+            images=page_images,
+            backlinks=tuple(page_backlinks),
+            nav="../" * rel.count("/"),
+            output_digest=note.output_digest,
+        )
+        jobs.append((job, key))
+
+    with tracing.span("export.render", pages=len(jobs)):
+        for job, key, result in _run_jobs(jobs, workers):
+            if isinstance(result, Exception):
+                report.errors.append(f"{job.rel}: {result}")
+                continue
+            digest, written = result
+            notes[job.rel].key = key
+            notes[job.rel].output_digest = digest
+            report.rendered += 1
+            report.written += written
+
+    with tracing.span("export.assets"):
+        for rel, image in images.items():
+            target = output_dir / rel
+            known = previous_images.get(rel)
+            if target.exists() and known and known["digest"] == image["digest"]:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(f".{target.name}.tmp")
+            shutil.copyfile(root / rel, tmp_path)
+            os.replace(tmp_path, target)
+            report.images += 1
+        for rel in set(previous) - set(notes):
+            _remove_output(output_dir / (rel[: -len(".md")] + ".html"), output_dir)
+            report.removed += 1
+        for rel in set(previous_images) - set(images):
+            _remove_output(output_dir / rel, output_dir)
+
+        link_index = {
+            rel: {
+                "title": note.title,
+                "href": _page_href("index.html", rel),
+                "links": sorted({target for target in links[rel].values() if target}),
+                "broken": sorted(name for name, target in links[rel].items() if not target),
+                "backlinks": sorted(set(backlinks.get(rel, []))),
+                "images": sorted({image for image in image_refs[rel].values() if image}),
+            }
+            for rel, note in sorted(notes.items())
+        }
+        _write_if_changed(output_dir / LINK_INDEX_NAME, json.dumps(link_index, indent=2).encode("utf-8"))
+        _write_if_changed(output_dir / "index.html", _index_page(notes).encode("utf-8"))
+        _write_if_changed(output_dir / "style.css", _STYLE.encode("utf-8"))
+
+    _save_manifest(output_dir, notes, images)
+    return report
@@ -0,0 +1,351 @@
+"""
+Consistency check and repair for `literature-notebook/`.
+
+Reference directories are named `{slug_key}-{year}-{title_slug}` and hold a
+`{slug_key}-{year}-reference-note.md` plus subnotes. When a title changes, a
+second directory with the same `{slug_key}-{year}` prefix can appear next to
+the first one. The check walks the notebook once, groups directories by
+(slug key, year), using the same rules as `bibtex.reference_slug_key`, and reports:
+
+- duplicate: several directories for one reference
+- misnamed: a directory or reference note whose name differs from the one the
+  BibTeX entry (when known) or the citekey implies
+- orphan: subnotes with no reference note in any directory of their group, and
+  notes placed directly under `literature-notebook/`
+- broken-link: `[[...]]` links to notes that do not exist
+
+The repair plan merges each group into one directory and renames misnamed
+reference notes, as file-level moves. It then rewrites links to renamed notes,
+plus broken links that match an existing note up to case and punctuation.
+`apply_plan` runs the moves without overwriting anything and rolls back every
+step if one fails. Files that exist in both directories with identical
+content are deleted only after all moves and rewrites succeed. Files with
+different content are left in place and reported as conflicts.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+import os
+import re
+
+from src.notebook import ROOT, frontmatter_value, locking, split_frontmatter, tracing
+from src.notebook.bibtex import BibEntry, get_reference_paths, reference_slug_key, sanitize_slug, split_citekey_year
+
+
+NOTEBOOK_DIR = "literature-notebook"
+REFERENCE_SUFFIX = "-reference-note.md"
+
+_DIR_NAME_RE = re.compile(r"^(?P<key>.+?)-(?P<year>\d{4}|unknown)-(?P<title>.+)$")
+_LINK_RE = re.compile(r"(?<!!)\[\[([^\]|#\n]+)(?:#[^\]|\n]*)?(?:\|[^\]\n]*)?\]\]")
+
+
+@dataclass(frozen=True)
+class Finding:
+    kind: str
+    path: str
+    detail: str
+
+
+@dataclass(frozen=True)
+class Action:
+    kind: str  # "move", "rewrite", "delete" or "rmdir"
+    path: Path
+    target: Optional[Path] = None
+    links: tuple[tuple[str, str], ...] = ()
+
+
+@dataclass
+class FsckReport:
+    findings: list[Finding] = field(default_factory=list)
+    plan: list[Action] = field(default_factory=list)
+    conflicts: list[str] = field(default_factory=list)
+    notes: int = 0
+
+
+@dataclass
+class _Directory:
+    path: Path
+    key: tuple[str, str]
+    reference_notes: list[Path] = field(default_factory=list)
+    files: list[Path] = field(default_factory=list)
+
+
+# --- Walk ---------------------------------------------------------------------
+
+
+def _group_key(directory: Path, reference_text: Optional[str]) -> Optional[tuple[str, str]]:
+    """(slug key, year) from the reference note's frontmatter, else from the directory name."""
+    if reference_text is not None:
+        frontmatter, _ = split_frontmatter(reference_text)
+        citekey = frontmatter_value(frontmatter, "citekey")
+        if citekey:
+            year = frontmatter_value(frontmatter, "year") or "unknown"
+            return sanitize_slug(split_citekey_year(citekey, year) or citekey), year
+    match = _DIR_NAME_RE.match(directory.name)
+    if not match:
+        return None
+    return match.group("key"), match.group("year")
+
+
+def _link_stem(target: str) -> Optional[str]:
+    name = target.strip().rsplit("/", 1)[-1]
+    if name.endswith(".md"):
+        return name[: -len(".md")]
+    # Embeds and links to non-note files (`[[figure.png]]`) are not checked
+    return None if re.search(r"\.\w{1,5}$", name) else name
+
+
+def _walk_files(directory: Path) -> Iterable[Path]:
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith("."))
+        for name in sorted(filenames):
+            if not name.startswith("."):
+                yield Path(dirpath) / name
+
+
+@tracing.traced("fsck.scan")
+def _scan(root: Path) -> tuple[list[_Directory], list[Path], Dict[Path, str], set[str]]:
+    """One pass over the notebook: reference directories, loose notes, note texts and all note stems."""
+    notebook = root / NOTEBOOK_DIR
+    directories: list[_Directory] = []
+    loose: list[Path] = []
+    texts: Dict[Path, str] = {}
+    stems: set[str] = set()
+
+    with os.scandir(notebook) as it:
+        children = sorted((entry for entry in it if not entry.name.startswith(".")), key=lambda entry: entry.name)
+    for child in children:
+        path = Path(child.path)
+        if child.is_file():
+            if child.name.endswith(".md"):
+                loose.append(path)
+                texts[path] = path.read_text(encoding="utf-8")
+                stems.add(path.stem)
+            continue
+
+        files = list(_walk_files(path))
+        reference_notes: list[Path] = []
+        for file in files:
+            if file.suffix != ".md":
+                continue
+            texts[file] = file.read_text(encoding="utf-8")
+            stems.add(file.stem)
+            if file.parent == path and file.name.endswith(REFERENCE_SUFFIX):
+                reference_notes.append(file)
+        reference_text = texts[reference_notes[0]] if reference_notes else None
+        key = _group_key(path, reference_text)
+        if key is None:
+            loose.extend(file for file in files if file.suffix == ".md")
+            continue
+        directories.append(_Directory(path, key, reference_notes, files))
+
+    # Links may also point at project notes
+    projects = root / "projects"
+    if projects.exists():
+        stems.update(path.stem for path in projects.rglob("*.md"))
+    return directories, loose, texts, stems
+
+
+# --- Plan ---------------------------------------------------------------------
+
+
+def _rel(path: Path, root: Path) -> str:
+    return path.relative_to(root).as_posix()
+
+
+def _same_content(a: Path, b: Path) -> bool:
+    return a.stat().st_size == b.stat().st_size and a.read_bytes() == b.read_bytes()
+
+
+def _pick_target(group: list[_Directory], entry: Optional[BibEntry], root: Path) -> Path:
+    if entry is not None:
+        return get_reference_paths(root, entry)[0]
+    # Without a BibTeX entry, keep the fullest directory that has a reference note
+    return min(group, key=lambda d: (not d.reference_notes, -len(d.files), d.path.name)).path
+
+
+def _plan_group(
+    group: list[_Directory],
+    entry: Optional[BibEntry],
+    root: Path,
+    report: FsckReport,
+    moves: Dict[Path, Path],
+    deletes: list[Path],
+) -> None:
+    slug_key, year = group[0].key
+    target = _pick_target(group, entry, root)
+    reference_name = f"{slug_key}-{year}{REFERENCE_SUFFIX}"
+    if len(group) > 1:
+        names = ", ".join(d.path.name for d in group)
+        report.findings.append(Finding("duplicate", f"{NOTEBOOK_DIR}/{slug_key}-{year}-*", f"{len(group)} directories: {names}"))
+    elif group[0].path != target:
+        report.findings.append(Finding("misnamed", _rel(group[0].path, root), f"expected {target.name}"))
+
+    if not any(d.reference_notes for d in group):
+        for d in group:
+            subnotes = sum(1 for file in d.files if file.suffix == ".md")
+            report.findings.append(Finding("orphan", _rel(d.path, root), f"no reference note ({subnotes} subnote(s))"))
+
+    # The directory being merged into goes first, so its copy of a file wins
+    claimed: Dict[Path, Path] = {}
+    for d in sorted(group, key=lambda d: d.path != target):
+        for file in d.files:
+            if file in d.reference_notes:
+                destination = target / reference_name
+                if file.name != reference_name:
+                    report.findings.append(Finding("misnamed", _rel(file, root), f"expected {reference_name}"))
+            else:
+                destination = target / file.relative_to(d.path)
+
+            owner = claimed.get(destination)
+            if owner is None and destination != file and destination.exists() and destination not in moves:
+                owner = destination
+            if owner is None:
+                claimed[destination] = file
+                if destination != file:
+                    moves[file] = destination
+            elif _same_content(owner, file):
+                deletes.append(file)
+            else:
+                report.conflicts.append(f"{_rel(file, root)} differs from {_rel(owner, root)}; left in place")
+
+
+def _plan_links(
+    texts: Dict[Path, str],
+    stems: set[str],
+    moves: Dict[Path, Path],
+    root: Path,
+    report: FsckReport,
+) -> list[Action]:
+    renamed = {source.stem: destination.stem for source, destination in moves.items() if source.stem != destination.stem}
+    final_stems = (stems - set(renamed)) | set(renamed.values())
+    folded: Dict[str, Optional[str]] = {}
+    for stem in final_stems:
+        key = sanitize_slug(stem)
+        # Ambiguous folds are not used for repairs
+        folded[key] = None if key in folded and folded[key] != stem else stem
+
+    rewrites: list[Action] = []
+    for path, text in texts.items():
+        links: Dict[str, str] = {}
+        for match in _LINK_RE.finditer(text):
+            stem = _link_stem(match.group(1))
+            if stem is None or stem in final_stems:
+                continue
+            replacement = renamed.get(stem) or folded.get(sanitize_slug(stem))
+            if replacement:
+                links[match.group(1)] = replacement
+            else:
+                line = text.count("\n", 0, match.start()) + 1
+                report.findings.append(Finding("broken-link", f"{_rel(path, root)}:{line}", f"[[{match.group(1)}]]"))
+        if links:
+            rewrites.append(Action("rewrite", moves.get(path, path), links=tuple(sorted(links.items()))))
+    return rewrites
+
+
+@tracing.traced("fsck.check")
+def check_notebook(root: Path = ROOT, entries: Iterable[BibEntry] = ()) -> FsckReport:
+    """Scan `literature-notebook/` and build a repair plan. Nothing is written."""
+    report = FsckReport()
+    if not (root / NOTEBOOK_DIR).exists():
+        return report
+    directories, loose, texts, stems = _scan(root)
+    report.notes = len(texts)
+
+    by_key = {(reference_slug_key(entry), entry.year or "unknown"): entry for entry in entries}
+    groups: Dict[tuple[str, str], list[_Directory]] = {}
+    for directory in directories:
+        groups.setdefault(directory.key, []).append(directory)
+
+    moves: Dict[Path, Path] = {}
+    deletes: list[Path] = []
+    for key, group in sorted(groups.items()):
+        _plan_group(group, by_key.get(key), root, report, moves, deletes)
+    for path in loose:
+        report.findings.append(Finding("orphan", _rel(path, root), "not inside a reference directory"))
+
+    report.plan.extend(Action("move", source, destination) for source, destination in moves.items())
+    report.plan.extend(_plan_links(texts, stems, moves, root, report))
+    report.plan.extend(Action("delete", path) for path in deletes)
+
+    emptied: set[Path] = set()
+    for source in list(moves) + deletes:
+        parent = source.parent
+        while parent != root / NOTEBOOK_DIR:
+            emptied.add(parent)
+            parent = parent.parent
+    # Deepest first; directories that still hold files are kept when the plan runs
+    report.plan.extend(Action("rmdir", path) for path in sorted(emptied, key=lambda p: len(p.parts), reverse=True))
+    return report
+
+
+# --- Apply --------------------------------------------------------------------
+
+
+def _move(source: Path, destination: Path) -> None:
+    """Move a file, failing instead of overwriting: the hard link is created atomically or not at all."""
+    os.link(source, destination)
+    os.unlink(source)
+
+
+def _rewrite_links(path: Path, links: tuple[tuple[str, str], ...], lock_dir: Path) -> str:
+    targets = dict(links)
+    with locking.locked(path, lock_dir=lock_dir):
+        original = path.read_text(encoding="utf-8")
+        updated = _LINK_RE.sub(
+            lambda match: match.group(0).replace(f"[[{match.group(1)}", f"[[{targets[match.group(1)]}", 1)
+            if match.group(1) in targets
+            else match.group(0),
+            original,
+        )
+        locking.atomic_write(path, updated)
+    return original
+
+
+def _apply_move(source: Path, destination: Path) -> Callable[[], None]:
+    created = [parent for parent in destination.parents if not parent.exists()]
+    destination.parent.mkdir(parents=True, exist_ok=True)
+
+    def remove_created() -> None:
+        for parent in created:
+            parent.rmdir()
+
+    try:
+        _move(source, destination)
+    except BaseException:
+        remove_created()
+        raise
+
+    def undo() -> None:
+        _move(destination, source)
+        remove_created()
+
+    return undo
+
+
+@tracing.traced("fsck.apply")
+def apply_plan(plan: list[Action], lock_dir: Path = locking.DEFAULT_LOCK_DIR) -> None:
+    """Run the plan as one batch. If any move or rewrite fails, the completed ones are undone."""
+    undo: list[Callable[[], None]] = []
+    try:
+        for action in plan:
+            if action.kind == "move":
+                undo.append(_apply_move(action.path, action.target))
+            elif action.kind == "rewrite":
+                original = _rewrite_links(action.path, action.links, lock_dir)
+                undo.append(lambda path=action.path, text=original: path.write_text(text, encoding="utf-8"))
+    except BaseException:
+        for step in reversed(undo):
+            step()
+        raise
+
+    for action in plan:
+        if action.kind == "delete":
+            action.path.unlink(missing_ok=True)
+        elif action.kind == "rmdir":
+            try:
+                action.path.rmdir()
+            except OSError:
+                pass
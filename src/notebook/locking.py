@@ -0,0 +1,231 @@
+"""
+Per-file locks and safe writes for processes editing the notebook concurrently.
+
+Two kinds of writes race when several CLI or batch processes run at once:
+
+- creating a note: both see that the path is free, and the second write
+  clobbers the first. `create_exclusive` writes the content to a temporary
+  file and hard-links it into place. The link fails if the path exists, so the
+  note appears complete or not at all.
+- editing a note (appending a Related Notes link, rewriting tags or links):
+  both read the old text, and the later write drops the earlier edit.
+  `update_text` does the read-modify-write while holding an advisory `fcntl`
+  lock for that one file, then replaces the file atomically.
+
+Locks are taken per target file, so writers to different notes never wait for
+each other. The lock files live in `tmp/locks/` of the repository (or of
+another root, see `lock_dir_for`), named by a hash of the target's path, so
+the notebook itself stays free of lock files. Replacing a note swaps its
+inode, so locking the note itself would not work. Lock files are left in place
+after use; `prune_locks` removes the ones nobody holds. A process that locked
+a file just as it was pruned notices that the path no longer names its file
+and locks the new one instead, so pruning never splits a lock. Within a
+process, the locks are re-entrant per thread and exclusive across threads.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+import errno
+import fcntl
+import hashlib
+import os
+import threading
+import time
+
+from src.notebook import ROOT, tracing
+
+
+def lock_dir_for(root: Path) -> Path:
+    """Lock directory for notes under `root`, so temporary trees keep their locks to themselves."""
+    return root / "tmp" / "locks"
+
+
+DEFAULT_LOCK_DIR = lock_dir_for(ROOT)
+DEFAULT_TIMEOUT = 30.0
+_POLL_INTERVAL = 0.02
+
+
+class _FileLock:
+    """`flock` on one lock file, plus a thread lock so threads of one process also exclude each other."""
+
+    def __init__(self, lock_path: Path) -> None:
+        self.lock_path = lock_path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def acquire(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        if not self._thread_lock.acquire(timeout=timeout):
+            raise TimeoutError(f"Timed out waiting for {self.lock_path}")
+        if self._depth == 0:
+            try:
+                self._fd = self._lock_file(deadline)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def _lock_file(self, deadline: float) -> int:
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        waited = False
+        while True:
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            try:
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError as e:
+                        if e.errno not in (errno.EAGAIN, errno.EACCES):
+                            raise
+                    if not waited:
+                        tracing.count("lock.contended")
+                        waited = True
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"Timed out waiting for {self.lock_path}")
+                    time.sleep(_POLL_INTERVAL)
+            except BaseException:
+                os.close(fd)
+                raise
+            if _names_fd(self.lock_path, fd):
+                return fd
+            # Pruned while we waited: lock the file now at the path
+            os.close(fd)
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+def _names_fd(path: Path, fd: int) -> bool:
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(fd)
+    return (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino)
+
+
+_registry_lock = threading.Lock()
+_locks: Dict[Path, _FileLock] = {}
+
+
+def lock_path_for(path: Path, lock_dir: Path = DEFAULT_LOCK_DIR) -> Path:
+    """The lock file guarding `path`."""
+    digest = hashlib.sha1(os.fsencode(path.resolve())).hexdigest()
+    return lock_dir / f"{digest[:20]}-{path.name}.lock"
+
+
+def is_locked(path: Path, lock_dir: Path = DEFAULT_LOCK_DIR) -> bool:
+    """Whether some process (this one included) holds the lock for `path` right now."""
+    try:
+        fd = os.open(lock_path_for(path, lock_dir), os.O_RDONLY | os.O_CLOEXEC)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except OSError as e:
+        if e.errno in (errno.EAGAIN, errno.EACCES):
+            return True
+        raise
+    finally:
+        os.close(fd)
+    return False
+
+
+@tracing.traced("lock.prune")
+def prune_locks(lock_dir: Path = DEFAULT_LOCK_DIR) -> int:
+    """Delete the lock files in `lock_dir` that no process holds. Returns how many were deleted.
+
+    Each file is deleted while holding its lock, so a busy lock is skipped and a
+    waiter that opened the old file moves on to a new one.
+    """
+    removed = 0
+    for lock_path in sorted(lock_dir.glob("*.lock")):
+        try:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CLOEXEC)
+        except FileNotFoundError:
+            continue
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EACCES):
+                    continue
+                raise
+            if _names_fd(lock_path, fd):
+                lock_path.unlink()
+                removed += 1
+        finally:
+            os.close(fd)
+    return removed
+
+
+@contextmanager
+def locked(path: Path, timeout: float = DEFAULT_TIMEOUT, lock_dir: Path = DEFAULT_LOCK_DIR) -> Iterator[None]:
+    """Hold the exclusive lock for `path` (which need not exist) for the duration of the block."""
+    lock_path = lock_path_for(path, lock_dir)
+    with _registry_lock:
+        lock = _locks.setdefault(lock_path, _FileLock(lock_path))
+    lock.acquire(timeout)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def _temp_path(path: Path) -> Path:
+    # Unique per writer, so concurrent writers never share a temp file
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def atomic_write(path: Path, text: str) -> None:
+    """Replace `path` with `text` so readers see either the old or the new content."""
+    tmp_path = _temp_path(path)
+    try:
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def create_exclusive(path: Path, text: str) -> None:
+    """Create `path` with `text`, raising FileExistsError if it already exists.
+
+    The content is written first and linked into place, so no reader ever sees
+    a partly written note, and of two concurrent creators exactly one wins.
+    """
+    tmp_path = _temp_path(path)
+    try:
+        tmp_path.write_text(text, encoding="utf-8")
+        os.link(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def update_text(
+    path: Path,
+    edit: Callable[[str], Optional[str]],
+    timeout: float = DEFAULT_TIMEOUT,
+    lock_dir: Path = DEFAULT_LOCK_DIR,
+) -> bool:
+    """Apply `edit` to the current text of `path` under its lock. Returns whether the file changed.
+
+    `edit` gets the text as it is now (not as the caller last read it) and returns the new text,
+    or None to leave the file alone.
+    """
+    with locked(path, timeout, lock_dir):
+        original = path.read_text(encoding="utf-8")
+        updated = edit(original)
+        if updated is None or updated == original:
+            return False
+        atomic_write(path, updated)
+        return True
@@ -0,0 +1,429 @@
+"""
+Inline terminal picker shared by the note CLIs.
+
+Input is read without blocking: each tick waits with `select` until stdin is
+readable, drains every byte already queued, and splits it into keys (escape
+sequences kept whole, even when they arrive split across reads). All keys of a
+tick are applied before a single frame is drawn, so held keys or pasted text
+over a slow link never queue up redraws. A frame renders only the visible window
+of options, compares it with the previous frame, and rewrites just the lines
+that changed in one buffered write. Terminal geometry is cached and refreshed on
+SIGWINCH rather than queried on every redraw.
+
+Options may be any sized sequence (indexed only for the visible window) or an
+iterable/generator, which is consumed in chunks as the cursor moves down.
+"""
+from __future__ import annotations
+
+from itertools import islice
+from typing import Any, Callable, Iterable, Sequence
+import codecs
+import os
+import re
+import select
+import shutil
+import signal
+import sys
+import termios
+import threading
+import tty
+
+from src.notebook import tracing
+
+
+# ANSI color codes
+class _Colors:
+    RESET = "\033[0m"
+    BOLD = "\033[1m"
+    DIM = "\033[2m"
+    BRIGHT_GREEN = "\033[1;32m"
+    CYAN = "\033[36m"
+
+
+class _TerminalGeometry:
+    """Cached terminal size; `generation` bumps whenever the size changes."""
+
+    def __init__(self) -> None:
+        size = shutil.get_terminal_size(fallback=(80, 24))
+        self.columns = size.columns
+        self.lines = size.lines
+        self.generation = 0
+        self._previous_handler = None
+        self._watching = False
+
+    def refresh(self, *_args) -> None:
+        size = shutil.get_terminal_size(fallback=(80, 24))
+        if (size.columns, size.lines) != (self.columns, self.lines):
+            self.columns = size.columns
+            self.lines = size.lines
+            self.generation += 1
+
+    def watch(self) -> None:
+        # Signal handlers can only be installed from the main thread
+        if self._watching or not hasattr(signal, "SIGWINCH"):
+            return
+        if threading.current_thread() is not threading.main_thread():
+            return
+        self.refresh()
+        self._previous_handler = signal.signal(signal.SIGWINCH, self.refresh)
+        self._watching = True
+
+    def unwatch(self) -> None:
+        if not self._watching:
+            return
+        signal.signal(signal.SIGWINCH, self._previous_handler or signal.SIG_DFL)
+        self._watching = False
+
+
+_geometry = _TerminalGeometry()
+
+
+def truncate_text(text: str, max_width: int) -> str:
+    """Truncate text to fit within max_width, adding ellipsis if needed."""
+    if len(text) <= max_width:
+        return text
+    if max_width <= 3:
+        return text[:max_width]
+    return text[: max_width - 3] + "..."
+
+
+class LabeledOptions(Sequence[str]):
+    """Sequence view that labels items on access instead of building a label list."""
+
+    def __init__(self, items: Sequence[Any], label: Callable[[Any], str]) -> None:
+        self._items = items
+        self._label = label
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, idx):  # type: ignore[override]
+        if isinstance(idx, slice):
+            return [self._label(item) for item in self._items[idx]]
+        return self._label(self._items[idx])
+
+
+class _WindowedOptions:
+    """Uniform access to a sized sequence or a lazily consumed iterable of options."""
+
+    FETCH_CHUNK = 256
+
+    def __init__(self, options: Sequence[str] | Iterable[str]) -> None:
+        if isinstance(options, Sequence):
+            self._items: Sequence[str] = options
+            self._source = None
+        else:
+            self._items = []
+            self._source = iter(options)
+
+    @property
+    def complete(self) -> bool:
+        return self._source is None
+
+    def ensure(self, count: int) -> None:
+        """Fetch until `count` options are loaded or the source runs out."""
+        while self._source is not None and len(self._items) < count:
+            wanted = max(count - len(self._items), self.FETCH_CHUNK)
+            chunk = list(islice(self._source, wanted))
+            self._items.extend(chunk)  # type: ignore[union-attr]
+            if len(chunk) < wanted:
+                self._source = None
+
+    def exhaust(self) -> None:
+        while self._source is not None:
+            self.ensure(len(self._items) + self.FETCH_CHUNK * 16)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, idx: int) -> str:
+        return self._items[idx]
+
+    def count_label(self) -> str:
+        return f"{len(self._items)}" if self.complete else f"{len(self._items)}+"
+
+
+def _visible_window(total: int, current_idx: int, list_height: int) -> tuple[int, int]:
+    if total <= list_height:
+        return 0, total
+    half_window = list_height // 2
+    start_idx = max(current_idx - half_window, 0)
+    end_idx = start_idx + list_height
+    if end_idx > total:
+        end_idx = total
+        start_idx = max(end_idx - list_height, 0)
+    return start_idx, end_idx
+
+
+class _MenuRenderer:
+    """Draws menu frames inline, rewriting only lines that differ from the last frame."""
+
+    HEADER_LINES = 5  # title + help + gg line + showing line + blank
+    MAX_LIST_HEIGHT = 15
+
+    def __init__(self, title: str, options: _WindowedOptions) -> None:
+        self.title = title
+        self.options = options
+        self._previous: list[str | None] = []
+        self._generation = _geometry.generation
+
+    def _frame(self, current_idx: int) -> list[str]:
+        c = _Colors
+        list_height = max(min(_geometry.lines - self.HEADER_LINES, self.MAX_LIST_HEIGHT), 5)
+        # Load one window past the cursor so scrolling down never waits on a fetch mid-frame
+        self.options.ensure(current_idx + list_height + 1)
+        total = len(self.options)
+        start_idx, end_idx = _visible_window(total, current_idx, list_height)
+
+        lines = [
+            f"{c.BRIGHT_GREEN}?{c.RESET} {c.BOLD}{self.title}{c.RESET}",
+            f"{c.DIM}  Use j/k (or arrows) to move, Enter to select.{c.RESET}",
+            f"{c.DIM}  gg: top, G: bottom, q: quit.{c.RESET}",
+            f"{c.DIM}  Showing {start_idx + 1}-{end_idx} of {self.options.count_label()}.{c.RESET}",
+            "",
+        ]
+        # Reserve space for prefix " > " or "   " plus color codes
+        max_option_width = _geometry.columns - 6
+        for idx in range(start_idx, end_idx):
+            option = truncate_text(self.options[idx], max_option_width)
+            if idx == current_idx:
+                lines.append(f"  {c.BRIGHT_GREEN}>{c.RESET} {c.CYAN}{option}{c.RESET}")
+            else:
+                lines.append(f"    {option}")
+        return lines
+
+    @tracing.traced("picker.draw")
+    def draw(self, current_idx: int) -> None:
+        lines = self._frame(current_idx)
+        previous = self._previous
+        if self._generation != _geometry.generation:
+            # After a resize the old frame may have rewrapped; repaint every line
+            previous = [None] * len(previous)
+            self._generation = _geometry.generation
+        if lines == previous:
+            return
+
+        # Raw mode doesn't translate \n, so every line ends with an explicit \r\n
+        out: list[str] = []
+        if previous:
+            out.append(f"\033[{len(previous)}A")
+        skipped = 0
+        for idx, line in enumerate(lines):
+            if idx < len(previous) and previous[idx] == line:
+                skipped += 1
+                continue
+            if skipped:
+                out.append(f"\033[{skipped}B")
+                skipped = 0
+            out.append(f"\r\033[K{line}\r\n")
+        if skipped:
+            out.append(f"\033[{skipped}B")
+        leftover = len(previous) - len(lines)
+        if leftover > 0:
+            out.append("\r\033[K\033[1B" * leftover)
+            out.append(f"\033[{leftover}A")
+
+        self._previous = list(lines)
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
+
+    def clear(self) -> None:
+        """Erase the menu and leave the cursor where it started."""
+        num_lines = len(self._previous)
+        if num_lines > 0:
+            sys.stdout.write(f"\033[{num_lines}A" + "\033[K\r\n" * num_lines + f"\033[{num_lines}A")
+            sys.stdout.flush()
+        self._previous = []
+
+
+_READ_SIZE = 4096
+# How long a lone ESC waits for the rest of its sequence before counting as a bare ESC
+_ESCAPE_TIMEOUT = 0.1
+# CSI (ESC [ params final), SS3 (ESC O char) or Alt+char
+_ESCAPE_RE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*[@-~]|O[ -~]|[^\[O\x1b])", re.DOTALL)
+_PARTIAL_ESCAPE_RE = re.compile(r"\x1b(?:\[[0-?]*[ -/]*|O)?\Z")
+_UP_KEYS = frozenset(("k", "\x1b[A", "\x1bOA"))
+_DOWN_KEYS = frozenset(("j", "\x1b[B", "\x1bOB"))
+
+
+def _read_pending(fd: int, timeout: float | None) -> bytes:
+    """Wait up to `timeout` seconds (None: indefinitely) for input, then read everything already queued."""
+    chunks: list[bytes] = []
+    while select.select([fd], [], [], timeout)[0]:
+        chunk = os.read(fd, _READ_SIZE)
+        if not chunk:
+            if not chunks:
+                raise EOFError
+            break
+        chunks.append(chunk)
+        timeout = 0
+    return b"".join(chunks)
+
+
+def _split_keys(text: str, final: bool) -> tuple[list[str], str]:
+    """Split input into keys. Returns the keys and a trailing incomplete escape sequence to carry over.
+
+    With `final`, nothing is carried over: an incomplete sequence's ESC becomes a key of its own.
+    """
+    keys: list[str] = []
+    idx = 0
+    while idx < len(text):
+        if text[idx] != "\x1b":
+            keys.append(text[idx])
+            idx += 1
+            continue
+        match = _ESCAPE_RE.match(text, idx)
+        if match:
+            keys.append(match.group())
+            idx = match.end()
+            continue
+        if not final and _PARTIAL_ESCAPE_RE.match(text, idx):
+            return keys, text[idx:]
+        keys.append("\x1b")
+        idx += 1
+    return keys, ""
+
+
+class _KeyReader:
+    """Reads raw terminal input a tick at a time and decodes it into keys."""
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._pending = ""
+
+    def read(self) -> list[str]:
+        """Block until input arrives and return every key in it. Raises EOFError when stdin closes."""
+        while True:
+            # A held-back partial escape sequence only waits briefly for its remaining bytes
+            data = _read_pending(self.fd, _ESCAPE_TIMEOUT if self._pending else None)
+            keys, self._pending = _split_keys(self._pending + self._decoder.decode(data), final=not data)
+            if keys:
+                tracing.count("picker.keys", len(keys))
+                return keys
+
+
+def _first_matches(options: _WindowedOptions, term: str, limit: int) -> tuple[list[tuple[int, str]], bool]:
+    """Return up to `limit` (number, option) matches and whether more exist."""
+    matches: list[tuple[int, str]] = []
+    idx = 0
+    while True:
+        options.ensure(idx + 1)
+        if idx >= len(options):
+            return matches, False
+        option = options[idx]
+        idx += 1
+        if term in option.lower():
+            if len(matches) == limit:
+                return matches, True
+            matches.append((idx, option))
+
+
+def _prompt_choice_plain(title: str, options: _WindowedOptions) -> int:
+    window_size = 20
+    term = ""
+    while True:
+        print(title)
+        print("Type a number, or enter a search term to filter.\n")
+
+        window, has_more = _first_matches(options, term, window_size)
+        for idx, option in window:
+            print(f"  {idx}. {option}")
+        if has_more:
+            scope = "matches" if term else "options"
+            print(f"\nShowing first {len(window)} {scope}. Refine the search to narrow the list.")
+        print()
+
+        selection = input("Select number or search: ").strip()
+        if selection.isdigit():
+            index = int(selection) - 1
+            options.ensure(index + 1)
+            if 0 <= index < len(options):
+                return index
+            print("Invalid selection. Try again.")
+            continue
+        if not selection:
+            continue
+        term = selection.lower()
+        if not _first_matches(options, term, 1)[0]:
+            print("No matches. Try another search.")
+            term = ""
+
+
+@tracing.traced("picker.prompt_choice")
+def prompt_choice(title: str, options: Sequence[str] | Iterable[str]) -> int:
+    """Let the user pick one option and return its index. Exits on `q`.
+
+    Generators are consumed only as far as the user scrolls (or fully on `G`).
+    """
+    options = _WindowedOptions(options)
+    options.ensure(1)
+    if not len(options):
+        print("No options available.", file=sys.stderr)
+        sys.exit(1)
+
+    if not sys.stdin.isatty():
+        return _prompt_choice_plain(title, options)
+
+    current_idx = 0
+    last_key = ""
+    renderer = _MenuRenderer(title, options)
+
+    # Set up terminal: hide cursor and enter raw mode for entire menu session
+    fd = sys.stdin.fileno()
+    reader = _KeyReader(fd)
+    old_settings = termios.tcgetattr(fd)
+    print("\033[?25l", end="", flush=True)  # Hide cursor
+    tty.setraw(fd)
+    _geometry.watch()
+
+    def _restore(message: str | None = None) -> None:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        _geometry.unwatch()
+        renderer.clear()
+        print("\033[?25h", end="", flush=True)  # Show cursor
+        if message:
+            print(message)
+
+    try:
+        renderer.draw(current_idx)
+        while True:
+            try:
+                keys = reader.read()
+            except EOFError:
+                _restore("Cancelled.")
+                sys.exit(0)
+
+            # Apply every key that arrived this tick, then draw once
+            for key in keys:
+                if key in ("\r", "\n"):
+                    _restore()
+                    return current_idx
+                if key in ("q", "Q"):
+                    _restore("Cancelled.")
+                    sys.exit(0)
+                if key in _UP_KEYS:
+                    if current_idx == 0:
+                        options.exhaust()
+                    current_idx = (current_idx - 1) % len(options)
+                    last_key = ""
+                elif key in _DOWN_KEYS:
+                    options.ensure(current_idx + 2)
+                    current_idx = (current_idx + 1) % len(options)
+                    last_key = ""
+                elif key == "G":
+                    options.exhaust()
+                    current_idx = len(options) - 1
+                    last_key = ""
+                elif key == "g":
+                    if last_key == "g":
+                        current_idx = 0
+                        last_key = ""
+                    else:
+                        last_key = "g"
+            renderer.draw(current_idx)
+    except Exception:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+        _geometry.unwatch()
+        print("\033[?25h", end="", flush=True)
+        raise
@@ -0,0 +1,566 @@
+"""
+Markdown to HTML for notes, without third-party dependencies.
+
+Covers the Markdown the notes and templates use:
+
+- blocks: ATX headings, paragraphs, nested lists and task lists, fenced code,
+  block quotes and Obsidian callouts (`> [!note]`), pipe tables, rules, `$$` math
+- inline: emphasis, `==highlight==`, `~~strike~~`, code spans, links, images,
+  `[[wikilinks]]` and `![[embeds]]`
+
+Math is passed through untouched in MathJax delimiters (`\\(...\\)` and
+`\\[...\\]`), so Markdown never rewrites underscores or asterisks inside
+formulas. HTML comments are dropped, and other raw HTML is escaped except a
+few inline tags (`<br>`, `<sub>`, `<sup>`, `<kbd>`, ...), which are kept
+without their attributes. Links keep only http(s), mailto, `#anchor` and
+relative targets; anything else (`javascript:`) renders as its text. Cloze markers
+(`{{c1::answer::hint}}`) are kept as written, with their answer and hint
+rendered on their own so emphasis never spans a marker; inside math they are
+left for Anki's MathJax.
+
+Wikilinks, Markdown links to local notes (`[text](other.md)`) and image paths
+are resolved through callbacks, so the same renderer serves the HTML export and
+Anki fields.
+"""
+from __future__ import annotations
+
+from typing import Callable, Optional
+import html
+import re
+import urllib.parse
+
+
+LinkResolver = Callable[[str], Optional[str]]
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".bmp", ".avif"}
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})\s*([\w+#.-]*)")
+_HEADING_RE = re.compile(r"^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_RULE_RE = re.compile(r"^ {0,3}(?:(?:\*[ \t]*){3,}|(?:-[ \t]*){3,}|(?:_[ \t]*){3,})$")
+_QUOTE_RE = re.compile(r"^ {0,3}> ?(.*)$")
+_CALLOUT_RE = re.compile(r"^\[!(\w+)\][+-]?[ \t]*(.*)$")
+_LIST_RE = re.compile(r"^(?P<indent>[ \t]*)(?P<marker>[-*+]|\d{1,9}[.)])(?:[ \t]+(?P<text>.*)|[ \t]*$)")
+_TASK_RE = re.compile(r"^\[([ xX])\][ \t]+")
+_TABLE_SEPARATOR_RE = re.compile(r"^[ \t]*\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$")
+_CELL_SPLIT_RE = re.compile(r"(?<!\\)\|")
+
+_CODE_SPAN_RE = re.compile(r"(`+)(.+?)(?<!`)\1(?!`)", re.DOTALL)
+_MATH_RE = re.compile(
+    r"\$\$(.+?)\$\$"  # display
+    r"|\\\[(.+?)\\\]"
+    r"|\\\((.+?)\\\)"
+    r"|(?<![\\$\w])\$(?=\S)([^$\n]+?)(?<=\S)\$(?![\w$])",  # inline; `$5 and $6` stays text
+    re.DOTALL,
+)
+_CLOZE_RE = re.compile(r"\{\{(c\d+)::(.+?)(?:::(.+?))?\}\}", re.DOTALL)
+_EMBED_RE = re.compile(r"!\[\[([^\]|\n]+)(?:\|([^\]\n]*))?\]\]")
+_WIKILINK_RE = re.compile(r"\[\[([^\]|\n]*)(?:\|([^\]\n]*))?\]\]")
+_IMAGE_RE = re.compile(r"!\[([^\]\n]*)\]\(\s*<?([^)\s>]+)>?(?:\s+\"([^\"]*)\")?\s*\)")
+_LINK_RE = re.compile(r"\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(\s*<?([^)\s>]*)>?(?:\s+\"([^\"]*)\")?\s*\)")
+_AUTOLINK_RE = re.compile(r"<((?:https?|mailto):[^\s<>]+)>")
+_INLINE_HTML_RE = re.compile(r"<(/?)(br|sub|sup|kbd|mark|u|s|small|abbr|span)\b[^<>]*>", re.IGNORECASE)
+_SCHEME_RE = re.compile(r"^[\x00-\x20]*([a-zA-Z][\w+.-]*):")
+_SAFE_SCHEMES = {"http", "https", "mailto"}
+_ESCAPE_RE = re.compile(r"\\([\\`*_{}\[\]()#+\-.!|~=<>$])")
+_STRONG_RE = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*|(?<!\w)__(?=\S)(.+?)(?<=\S)__(?!\w)", re.DOTALL)
+_EM_RE = re.compile(r"\*(?=[^\s*])(.+?)(?<=[^\s*])\*|(?<!\w)_(?=[^\s_])(.+?)(?<=[^\s_])_(?!\w)", re.DOTALL)
+_STRIKE_RE = re.compile(r"~~(?=\S)(.+?)(?<=\S)~~", re.DOTALL)
+_MARK_RE = re.compile(r"==(?=\S)(.+?)(?<=\S)==", re.DOTALL)
+_HARD_BREAK_RE = re.compile(r"(?: {2,}|\\)\n")
+_PLACEHOLDER_RE = re.compile("\x00(\\d+)\x00")
+
+
+def slugify(text: str) -> str:
+    """Heading anchor: lowercase words joined by hyphens, like GitHub and Obsidian."""
+    text = re.sub(r"[^\w\s-]", "", text.lower(), flags=re.UNICODE)
+    return re.sub(r"[\s-]+", "-", text).strip("-") or "section"
+
+
+def split_target(target: str) -> tuple[str, str]:
+    """`note#Heading` -> ("note", "Heading")."""
+    name, _, heading = target.partition("#")
+    return name.strip(), heading.strip()
+
+
+def is_image(target: str) -> bool:
+    return "." + target.rsplit(".", 1)[-1].lower() in IMAGE_SUFFIXES if "." in target else False
+
+
+def note_link_target(url: str) -> Optional[str]:
+    """Link target of a Markdown link URL to a local note (`../b.md#Heading` -> `../b.md#Heading`), else None."""
+    path, _, fragment = url.partition("#")
+    if _is_external(url) or not path.lower().endswith(".md"):
+        return None
+    path = urllib.parse.unquote(path)
+    return f"{path}#{urllib.parse.unquote(fragment)}" if fragment else path
+
+
+def iter_references(text: str) -> tuple[list[str], list[str]]:
+    """(note link targets, image paths) referenced by `text`, outside code. Targets keep any `#heading`.
+
+    Note links are wikilink names and the paths of Markdown links to `.md` files.
+    """
+    text = _blank_code(text)
+    links: list[str] = []
+    images: list[str] = []
+    for match in _EMBED_RE.finditer(text):
+        (images if is_image(match.group(1)) else links).append(match.group(1).strip())
+    for match in _WIKILINK_RE.finditer(_EMBED_RE.sub("", text)):
+        target = match.group(1).rstrip("\\").strip()
+        if target:
+            links.append(target)
+    for match in _IMAGE_RE.finditer(text):
+        if not _is_external(match.group(2)):
+            images.append(match.group(2))
+    for match in _LINK_RE.finditer(_IMAGE_RE.sub("", text)):
+        target = note_link_target(match.group(2))
+        if target:
+            links.append(target)
+    return links, images
+
+
+def _blank_code(text: str) -> str:
+    text = re.sub(r"^ {0,3}(`{3,}|~{3,}).*?^ {0,3}\1[ \t]*$", "", text, flags=re.MULTILINE | re.DOTALL)
+    return _CODE_SPAN_RE.sub("", text)
+
+
+def _is_safe_link(url: str) -> bool:
+    scheme = _SCHEME_RE.match(url)
+    return scheme is None or scheme.group(1).lower() in _SAFE_SCHEMES
+
+
+def _is_external(url: str) -> bool:
+    # `/images/fig.png` (as the img snippets write it) is relative to the notes root, not external
+    return bool(re.match(r"^[a-zA-Z][\w+.-]*:", url)) or url.startswith("//")
+
+
+def _indent_width(text: str) -> int:
+    return len(text) - len(text.lstrip(" \t")) + 3 * text[: len(text) - len(text.lstrip(" \t"))].count("\t")
+
+
+def _dedent(line: str, width: int) -> str:
+    """Remove up to `width` columns of leading whitespace (tabs count as 4)."""
+    removed = 0
+    idx = 0
+    while idx < len(line) and removed < width and line[idx] in " \t":
+        removed += 4 if line[idx] == "\t" else 1
+        idx += 1
+    return line[idx:]
+
+
+class Renderer:
+    """Render Markdown, resolving wikilinks and image paths with the given callbacks.
+
+    `resolve_link(name)` returns the href for a note name (without `#heading`), or None
+    when the note doesn't exist. `resolve_image(path)` returns the `src` for an image
+    path or embed name; by default paths are used as written. With `hard_breaks`, every
+    newline inside a paragraph becomes `<br>`, as in Anki fields.
+    """
+
+    def __init__(
+        self,
+        resolve_link: Optional[LinkResolver] = None,
+        resolve_image: Optional[LinkResolver] = None,
+        hard_breaks: bool = False,
+    ) -> None:
+        self.resolve_link = resolve_link
+        self.resolve_image = resolve_image
+        self.hard_breaks = hard_breaks
+        self._heading_ids: dict[str, int] = {}
+
+    def render(self, text: str, compact: bool = False) -> str:
+        """HTML for `text`. With `compact`, a lone paragraph comes back without its `<p>`."""
+        self._heading_ids = {}
+        lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        blocks = self._blocks(lines)
+        if compact and len(blocks) == 1 and blocks[0][0] == "p":
+            return blocks[0][1]
+        return "\n".join(self._wrap(blocks))
+
+    # --- Blocks -------------------------------------------------------------------
+
+    def _blocks(self, lines: list[str]) -> list[tuple[str, str]]:
+        """(kind, html) per block; paragraphs are ("p", inner html) so tight lists can unwrap them."""
+        blocks: list[tuple[str, str]] = []
+        idx = 0
+        while idx < len(lines):
+            line = lines[idx]
+            if not line.strip():
+                idx += 1
+                continue
+
+            if line.lstrip().startswith("<!--"):
+                start = idx
+                while idx < len(lines) and "-->" not in lines[idx]:
+                    idx += 1
+                rest = lines[idx].split("-->", 1)[1] if idx < len(lines) else ""
+                if idx == start and rest.strip():
+                    lines[idx] = rest
+                    continue
+                idx += 1
+                continue
+
+            fence = _FENCE_RE.match(line)
+            if fence:
+                marker, language = fence.group(1), fence.group(2)
+                code: list[str] = []
+                idx += 1
+                while idx < len(lines) and not re.match(rf"^ {{0,3}}{re.escape(marker[0])}{{{len(marker)},}}[ \t]*$", lines[idx]):
+                    code.append(lines[idx])
+                    idx += 1
+                idx += 1
+                attr = f' class="language-{html.escape(language)}"' if language else ""
+                blocks.append(("code", f"<pre><code{attr}>{html.escape(chr(10).join(code))}\n</code></pre>"))
+                continue
+
+            if line.strip().startswith("$$"):
+                math, idx = self._math_block(lines, idx)
+                blocks.append(("math", math))
+                continue
+
+            heading = _HEADING_RE.match(line)
+            if heading:
+                level = len(heading.group(1))
+                content = heading.group(2) or ""
+                blocks.append(("h", f'<h{level} id="{self._heading_id(content)}">{self._inline(content)}</h{level}>'))
+                idx += 1
+                continue
+
+            if _RULE_RE.match(line):
+                blocks.append(("hr", "<hr>"))
+                idx += 1
+                continue
+
+            if _QUOTE_RE.match(line):
+                quoted: list[str] = []
+                while idx < len(lines) and lines[idx].strip():
+                    match = _QUOTE_RE.match(lines[idx])
+                    quoted.append(match.group(1) if match else lines[idx])
+                    idx += 1
+                blocks.append(("quote", self._quote(quoted)))
+                continue
+
+            if self._table_starts(lines, idx):
+                table, idx = self._table(lines, idx)
+                blocks.append(("table", table))
+                continue
+
+            if _LIST_RE.match(line):
+                items, idx = self._list(lines, idx)
+                blocks.append(("list", items))
+                continue
+
+            paragraph = [line]
+            idx += 1
+            while idx < len(lines) and lines[idx].strip() and not self._interrupts(lines, idx):
+                paragraph.append(lines[idx])
+                idx += 1
+            blocks.append(("p", self._inline("\n".join(part.lstrip() for part in paragraph).rstrip())))
+        return blocks
+
+    def _interrupts(self, lines: list[str], idx: int) -> bool:
+        line = lines[idx]
+        return bool(
+            _FENCE_RE.match(line)
+            or _HEADING_RE.match(line)
+            or _RULE_RE.match(line)
+            or _QUOTE_RE.match(line)
+            or _LIST_RE.match(line)
+            or line.strip().startswith(("$$", "<!--"))
+            or self._table_starts(lines, idx)
+        )
+
+    def _heading_id(self, content: str) -> str:
+        slug = slugify(re.sub(r"\[\[(?:[^\]|]*\|)?([^\]]*)\]\]", r"\1", content))
+        count = self._heading_ids.get(slug, 0)
+        self._heading_ids[slug] = count + 1
+        return slug if count == 0 else f"{slug}-{count}"
+
+    def _math_block(self, lines: list[str], idx: int) -> tuple[str, int]:
+        first = lines[idx].strip()[2:]
+        body: list[str] = []
+        if first.rstrip().endswith("$$"):
+            body.append(first.rstrip()[:-2])
+            idx += 1
+        else:
+            body.append(first)
+            idx += 1
+            while idx < len(lines):
+                line = lines[idx]
+                idx += 1
+                if line.rstrip().endswith("$$"):
+                    body.append(line.rstrip()[:-2])
+                    break
+                body.append(line)
+        tex = "\n".join(body).strip()
+        return f'<div class="math display">\\[{html.escape(tex, quote=False)}\\]</div>', idx
+
+    def _quote(self, quoted: list[str]) -> str:
+        callout = _CALLOUT_RE.match(quoted[0].strip()) if quoted else None
+        if not callout:
+            inner = "\n".join(self._wrap(self._blocks(quoted)))
+            return f"<blockquote>\n{inner}\n</blockquote>"
+        kind = callout.group(1).lower()
+        title = callout.group(2) or callout.group(1).capitalize()
+        inner = "\n".join(self._wrap(self._blocks(quoted[1:])))
+        return (
+            f'<div class="callout callout-{html.escape(kind)}">\n'
+            f'<p class="callout-title">{self._inline(title)}</p>\n{inner}\n</div>'
+        )
+
+    @staticmethod
+    def _wrap(blocks: list[tuple[str, str]]) -> list[str]:
+        return [f"<p>{block}</p>" if kind == "p" else block for kind, block in blocks]
+
+    # --- Tables -------------------------------------------------------------------
+
+    @staticmethod
+    def _table_starts(lines: list[str], idx: int) -> bool:
+        return (
+            "|" in lines[idx]
+            and idx + 1 < len(lines)
+            and "-" in lines[idx + 1]
+            and bool(_TABLE_SEPARATOR_RE.match(lines[idx + 1]))
+        )
+
+    @staticmethod
+    def _cells(line: str) -> list[str]:
+        line = line.strip()
+        if line.startswith("|"):
+            line = line[1:]
+        if line.endswith("|") and not line.endswith("\\|"):
+            line = line[:-1]
+        return [cell.strip().replace("\\|", "|") for cell in _CELL_SPLIT_RE.split(line)]
+
+    def _table(self, lines: list[str], idx: int) -> tuple[str, int]:
+        header = self._cells(lines[idx])
+        aligns = []
+        for cell in self._cells(lines[idx + 1]):
+            if cell.startswith(":") and cell.endswith(":"):
+                aligns.append(' style="text-align: center"')
+            elif cell.endswith(":"):
+                aligns.append(' style="text-align: right"')
+            elif cell.startswith(":"):
+                aligns.append(' style="text-align: left"')
+            else:
+                aligns.append("")
+        idx += 2
+
+        def row(cells: list[str], tag: str) -> str:
+            cells = (cells + [""] * len(header))[: len(header)]
+            return "<tr>" + "".join(
+                f"<{tag}{aligns[col] if col < len(aligns) else ''}>{self._inline(cell)}</{tag}>" for col, cell in enumerate(cells)
+            ) + "</tr>"
+
+        body: list[str] = []
+        while idx < len(lines) and lines[idx].strip() and "|" in lines[idx]:
+            body.append(row(self._cells(lines[idx]), "td"))
+            idx += 1
+        tbody = f"\n<tbody>\n{chr(10).join(body)}\n</tbody>" if body else ""
+        return f"<table>\n<thead>\n{row(header, 'th')}\n</thead>{tbody}\n</table>", idx
+
+    # --- Lists --------------------------------------------------------------------
+
+    def _list(self, lines: list[str], idx: int) -> tuple[str, int]:
+        first = _LIST_RE.match(lines[idx])
+        assert first is not None
+        base = _indent_width(first.group("indent"))
+        ordered = first.group("marker")[0].isdigit()
+        start = int(first.group("marker")[:-1]) if ordered else 1
+
+        items: list[tuple[list[str], bool]] = []
+        loose = False
+        while idx < len(lines):
+            match = _LIST_RE.match(lines[idx])
+            if (
+                not match
+                or match.group("marker")[0].isdigit() != ordered
+                or not base <= _indent_width(match.group("indent")) < base + 2
+                or _RULE_RE.match(lines[idx])
+            ):
+                break
+            marker_end = _indent_width(match.group("indent")) + len(match.group("marker"))
+            text = match.group("text") or ""
+            content_indent = min(marker_end + 1 + len(text) - len(text.lstrip()), base + 2 + len(match.group("marker")))
+            nested_indent = min(content_indent, base + 2)
+            item = [text.lstrip()]
+            idx += 1
+            blank = False
+            while idx < len(lines):
+                line = lines[idx]
+                if not line.strip():
+                    blank = True
+                    item.append("")
+                    idx += 1
+                    continue
+                if _indent_width(line) >= nested_indent:
+                    if blank:
+                        loose = loose or bool(item[0].strip())
+                    item.append(_dedent(line, content_indent))
+                    blank = False
+                    idx += 1
+                    continue
+                if not blank and not self._interrupts(lines, idx):
+                    # Lazy continuation of the item's paragraph
+                    item.append(line.strip())
+                    idx += 1
+                    continue
+                break
+            while item and not item[-1].strip():
+                item.pop()
+            if blank and idx < len(lines):
+                next_match = _LIST_RE.match(lines[idx])
+                if (
+                    next_match
+                    and next_match.group("marker")[0].isdigit() == ordered
+                    and base <= _indent_width(next_match.group("indent")) < base + 2
+                ):
+                    loose = True
+            items.append((item, blank))
+
+        rendered: list[str] = []
+        for item, _ in items:
+            checkbox = ""
+            task = _TASK_RE.match(item[0]) if item else None
+            if task:
+                checked = " checked" if task.group(1) in "xX" else ""
+                checkbox = f'<input type="checkbox" disabled{checked}> '
+                item = [item[0][task.end():], *item[1:]]
+            blocks = self._blocks(item)
+            parts = [
+                block if kind != "p" else (block if not loose else f"<p>{block}</p>")
+                for kind, block in blocks
+            ]
+            attr = ' class="task"' if task else ""
+            rendered.append(f"<li{attr}>{checkbox}{chr(10).join(parts)}</li>")
+
+        tag = "ol" if ordered else "ul"
+        start_attr = f' start="{start}"' if ordered and start != 1 else ""
+        return f"<{tag}{start_attr}>\n{chr(10).join(rendered)}\n</{tag}>", idx
+
+    # --- Inline -------------------------------------------------------------------
+
+    def _inline(self, text: str) -> str:
+        stash: list[str] = []
+        text = self._inline_spans(text, stash)
+        # Fragments may hold placeholders of their own (link labels)
+        while "\x00" in text:
+            text = _PLACEHOLDER_RE.sub(lambda m: stash[int(m.group(1))], text)
+        return text
+
+    def _inline_spans(self, text: str, stash: list[str]) -> str:
+        """Render `text`, leaving placeholders for the fragments kept in `stash`."""
+
+        def keep(fragment: str) -> str:
+            stash.append(fragment)
+            return f"\x00{len(stash) - 1}\x00"
+
+        # Each pass only runs if its trigger character is present; most spans are plain words
+        if "<!--" in text:
+            text = _COMMENT_RE.sub("", text)
+        if "`" in text:
+            text = _CODE_SPAN_RE.sub(lambda m: keep(f"<code>{html.escape(m.group(2).strip() or m.group(2))}</code>"), text)
+        if "$" in text or "\\" in text:
+            text = _MATH_RE.sub(lambda m: keep(self._math_inline(m)), text)
+        if "{{" in text:
+            text = _CLOZE_RE.sub(lambda m: keep(self._cloze(m, stash)), text)
+        if "\\" in text:
+            text = _ESCAPE_RE.sub(lambda m: keep(html.escape(m.group(1))), text)
+        if "[" in text:
+            text = _EMBED_RE.sub(lambda m: keep(self._embed(m.group(1).strip(), m.group(2))), text)
+            text = _IMAGE_RE.sub(lambda m: keep(self._image(m.group(2), m.group(1), m.group(3))), text)
+            text = _WIKILINK_RE.sub(lambda m: keep(self._wikilink(m.group(1), m.group(2))), text)
+            text = _LINK_RE.sub(lambda m: keep(self._link(self._inline_spans(m.group(1), stash), m.group(2), m.group(3))), text)
+        if "<" in text:
+            text = _AUTOLINK_RE.sub(lambda m: keep(f'<a href="{html.escape(m.group(1))}">{html.escape(m.group(1))}</a>'), text)
+            text = _INLINE_HTML_RE.sub(lambda m: keep(f"<{m.group(1)}{m.group(2).lower()}>"), text)
+
+        text = html.escape(text, quote=False)
+        if "*" in text or "_" in text:
+            text = _STRONG_RE.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+            text = _EM_RE.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+        if "~~" in text:
+            text = _STRIKE_RE.sub(r"<del>\1</del>", text)
+        if "==" in text:
+            text = _MARK_RE.sub(r"<mark>\1</mark>", text)
+        if "\n" not in text:
+            return text
+        if self.hard_breaks:
+            return re.sub(r"(?: {2,}|\\)?\n", "<br>", text)
+        return _HARD_BREAK_RE.sub("<br>\n", text)
+
+    def _cloze(self, match: re.Match[str], stash: list[str]) -> str:
+        number, answer, hint = match.groups()
+        hint_part = f"::{self._inline_spans(hint, stash)}" if hint is not None else ""
+        return f"{{{{{number}::{self._inline_spans(answer, stash)}{hint_part}}}}}"
+
+    @staticmethod
+    def _math_inline(match: re.Match[str]) -> str:
+        display, bracket, paren, dollar = match.groups()
+        if display is not None or bracket is not None:
+            tex = display if display is not None else bracket
+            return f'<span class="math display">\\[{html.escape(tex, quote=False)}\\]</span>'
+        tex = paren if paren is not None else dollar
+        return f'<span class="math inline">\\({html.escape(tex, quote=False)}\\)</span>'
+
+    def _note_href(self, target: str) -> Optional[str]:
+        name, heading = split_target(target)
+        anchor = f"#{slugify(heading)}" if heading else ""
+        if not name:
+            return anchor or None
+        href = self.resolve_link(name) if self.resolve_link else None
+        return href + anchor if href is not None else None
+
+    def _wikilink(self, target: str, alias: Optional[str]) -> str:
+        # `[[note\|alias]]` inside tables
+        target = target.rstrip("\\")
+        name, heading = split_target(target)
+        label = alias.strip() if alias and alias.strip() else (f"{name} > {heading}" if name and heading else name or heading)
+        href = self._note_href(target)
+        if href is None:
+            return f'<span class="broken-link">{html.escape(label)}</span>'
+        return f'<a class="internal-link" href="{html.escape(href)}">{html.escape(label)}</a>'
+
+    def _image_src(self, path: str) -> str:
+        if _is_external(path) or self.resolve_image is None:
+            return path
+        return self.resolve_image(path) or path
+
+    def _embed(self, target: str, alias: Optional[str]) -> str:
+        if not is_image(target):
+            return self._wikilink(target, alias)
+        attrs = ""
+        alt = target
+        if alias:
+            size = re.fullmatch(r"\s*(\d+)(?:x(\d+))?\s*", alias)
+            if size:
+                attrs = f' width="{size.group(1)}"' + (f' height="{size.group(2)}"' if size.group(2) else "")
+            else:
+                alt = alias.strip()
+        return f'<img src="{html.escape(self._image_src(target))}" alt="{html.escape(alt)}"{attrs}>'
+
+    def _image(self, path: str, alt: str, title: Optional[str]) -> str:
+        title_attr = f' title="{html.escape(title)}"' if title else ""
+        return f'<img src="{html.escape(self._image_src(path))}" alt="{html.escape(alt)}"{title_attr}>'
+
+    def _link(self, label_html: str, url: str, title: Optional[str]) -> str:
+        title_attr = f' title="{html.escape(title)}"' if title else ""
+        target = note_link_target(url)
+        if target and self.resolve_link:
+            href = self._note_href(target)
+            if href is None:
+                return f'<span class="broken-link">{label_html}</span>'
+            url = href
+        elif not _is_safe_link(url):
+            return label_html
+        return f'<a href="{html.escape(url)}"{title_attr}>{label_html}</a>'
+
+
+def render_markdown(
+    text: str,
+    resolve_link: Optional[LinkResolver] = None,
+    resolve_image: Optional[LinkResolver] = None,
+) -> str:
+    """Render a Markdown body (without frontmatter) to an HTML fragment."""
+    return Renderer(resolve_link, resolve_image).render(text)
@@ -0,0 +1,219 @@
+"""
+Incremental full-text index over notes, backed by SQLite FTS5.
+
+The index lives under `tmp/` and is refreshed by comparing each note's
+mtime/size first and its content hash second, so an update after a handful
+of edits only re-reads and re-indexes those files.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+import hashlib
+import re
+import sqlite3
+
+from src.notebook import (
+    ROOT,
+    frontmatter_value,
+    is_note_path,
+    iter_note_paths,
+    parse_sections,
+    split_frontmatter,
+    tracing,
+)
+
+
+DEFAULT_INDEX_PATH = ROOT / "tmp" / "notes-index.sqlite3"
+
+# FTS column -> level-2 heading prefixes that feed it. Unmatched sections go to `body`.
+SECTION_FIELDS: dict[str, tuple[str, ...]] = {
+    "cue": ("Cue",),
+    "notes": ("Notes", "Memo"),
+    "summary": ("Summary",),
+    "questions": ("Questions",),
+}
+FIELDS = ("title", *SECTION_FIELDS, "body")
+# bm25 weights, in FIELDS order: a title hit outranks a cue hit outranks a body hit.
+_FIELD_WEIGHTS = (10.0, 5.0, 1.0, 3.0, 2.0, 1.0)
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS note_text USING fts5(
+    {", ".join(FIELDS)},
+    tokenize = 'porter unicode61'
+);
+"""
+
+
+@dataclass(frozen=True)
+class IndexStats:
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+
+
+@dataclass(frozen=True)
+class SearchHit:
+    path: str
+    title: str
+    snippet: str
+    score: float
+
+
+def open_index(index_path: Path = DEFAULT_INDEX_PATH) -> sqlite3.Connection:
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _note_fields(text: str, fallback_title: str) -> dict[str, str]:
+    frontmatter, body = split_frontmatter(text)
+    fields = {name: [] for name in FIELDS}
+    fields["title"].append(frontmatter_value(frontmatter, "title") or fallback_title)
+    for heading, content in parse_sections(_COMMENT_RE.sub("", body)):
+        target = "body"
+        for name, prefixes in SECTION_FIELDS.items():
+            if heading.startswith(prefixes):
+                target = name
+                break
+        fields[target].append(content.strip())
+    return {name: "\n".join(part for part in parts if part) for name, parts in fields.items()}
+
+
+def _write_note(conn: sqlite3.Connection, row_id: int, fields: dict[str, str]) -> None:
+    conn.execute("DELETE FROM note_text WHERE rowid = ?", (row_id,))
+    conn.execute(
+        f"INSERT INTO note_text (rowid, {', '.join(FIELDS)}) VALUES (?{', ?' * len(FIELDS)})",
+        (row_id, *(fields[name] for name in FIELDS)),
+    )
+
+
+@tracing.traced("search.update_index")
+def update_index(conn: sqlite3.Connection, root: Path = ROOT, paths: Optional[Iterable[Path]] = None) -> IndexStats:
+    """Bring the index in line with the notes on disk and return what changed.
+
+    With `paths`, only those files are checked, and the ones that no longer exist are dropped.
+    """
+    known = {
+        path: (row_id, mtime_ns, size, digest)
+        for row_id, path, mtime_ns, size, digest in conn.execute(
+            "SELECT id, path, mtime_ns, size, digest FROM files"
+        )
+    }
+    added = updated = unchanged = 0
+    seen: set[str] = set()
+    if paths is None:
+        candidates: Iterable[Path] = iter_note_paths(root)
+    else:
+        targets = {path.relative_to(root).as_posix(): path for path in paths if is_note_path(path, root)}
+        candidates = [path for path in targets.values() if path.is_file()]
+
+    with conn:
+        for note_path in candidates:
+            rel = note_path.relative_to(root).as_posix()
+            seen.add(rel)
+            stat = note_path.stat()
+            previous = known.get(rel)
+            if previous and previous[1] == stat.st_mtime_ns and previous[2] == stat.st_size:
+                unchanged += 1
+                continue
+
+            data = note_path.read_bytes()
+            digest = hashlib.sha1(data).hexdigest()
+            if previous and previous[3] == digest:
+                conn.execute(
+                    "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                    (stat.st_mtime_ns, stat.st_size, previous[0]),
+                )
+                unchanged += 1
+                continue
+
+            fields = _note_fields(data.decode("utf-8", errors="replace"), note_path.stem)
+            if previous:
+                row_id = previous[0]
+                conn.execute(
+                    "UPDATE files SET mtime_ns = ?, size = ?, digest = ? WHERE id = ?",
+                    (stat.st_mtime_ns, stat.st_size, digest, row_id),
+                )
+                updated += 1
+            else:
+                cursor = conn.execute(
+                    "INSERT INTO files (path, mtime_ns, size, digest) VALUES (?, ?, ?, ?)",
+                    (rel, stat.st_mtime_ns, stat.st_size, digest),
+                )
+                row_id = cursor.lastrowid
+                added += 1
+            _write_note(conn, row_id, fields)
+
+        checked = known if paths is None else (rel for rel in targets if rel in known)
+        removed_ids = [(known[path][0],) for path in checked if path not in seen]
+        conn.executemany("DELETE FROM note_text WHERE rowid = ?", removed_ids)
+        conn.executemany("DELETE FROM files WHERE id = ?", removed_ids)
+
+    return IndexStats(added=added, updated=updated, removed=len(removed_ids), unchanged=unchanged)
+
+
+def rebuild_index(conn: sqlite3.Connection, root: Path = ROOT) -> IndexStats:
+    with conn:
+        conn.execute("DELETE FROM note_text")
+        conn.execute("DELETE FROM files")
+    return update_index(conn, root)
+
+
+def _to_match_expression(query: str, sections: list[str] | None) -> str:
+    """Turn free text into a prefix-matching FTS5 expression, ANDing all terms."""
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return ""
+    expression = " ".join(f'"{token}"*' for token in tokens)
+    if sections:
+        expression = "{" + " ".join(sections) + "} : (" + expression + ")"
+    return expression
+
+
+@tracing.traced("search.query")
+def search(
+    conn: sqlite3.Connection,
+    query: str,
+    limit: int = 10,
+    sections: list[str] | None = None,
+    highlight: tuple[str, str] = ("[", "]"),
+) -> list[SearchHit]:
+    """Return the best-ranked notes for `query`, optionally restricted to some fields."""
+    unknown = [name for name in sections or [] if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(unknown)}. Choose from: {', '.join(FIELDS)}")
+
+    expression = _to_match_expression(query, sections)
+    if not expression:
+        return []
+
+    weights = ", ".join(str(weight) for weight in _FIELD_WEIGHTS)
+    rows = conn.execute(
+        f"""
+        SELECT files.path, note_text.title,
+               snippet(note_text, -1, ?, ?, '...', 12),
+               bm25(note_text, {weights}) AS score
+        FROM note_text JOIN files ON files.id = note_text.rowid
+        WHERE note_text MATCH ?
+        ORDER BY score
+        LIMIT ?
+        """,
+        (highlight[0], highlight[1], expression, limit),
+    )
+    return [SearchHit(path=path, title=title, snippet=snippet, score=score) for path, title, snippet, score in rows]
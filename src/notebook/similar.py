@@ -0,0 +1,228 @@
+"""
+TF-IDF similarity index over notes, for related-note suggestions.
+
+Term counts come from a stateless `HashingVectorizer`, so a changed note only
+re-vectorizes its own row: no vocabulary to refit. IDF weights are derived from
+the stored counts when the index is queried. Counts are persisted as a sparse
+`.npz` next to a JSON file of paths, titles and file stamps, and refreshed
+incrementally (by mtime and size, then content hash) like the search index.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+import hashlib
+import json
+import re
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from src.notebook import ROOT, frontmatter_list, frontmatter_value, is_note_path, iter_note_paths, split_frontmatter, tracing
+from src.notebook.search import IndexStats
+
+
+DEFAULT_INDEX_PATH = ROOT / "tmp" / "similar-index"
+N_FEATURES = 2**18
+
+_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_vectorizer = HashingVectorizer(
+    n_features=N_FEATURES,
+    alternate_sign=False,
+    norm=None,
+    ngram_range=(1, 2),
+    stop_words="english",
+)
+
+
+@dataclass(frozen=True)
+class SimilarHit:
+    path: str
+    title: str
+    score: float
+
+
+def note_text(text: str, fallback_title: str) -> tuple[str, str]:
+    """Return (title, text to vectorize). Title and tags are repeated to weigh more than body text."""
+    frontmatter, body = split_frontmatter(text)
+    title = frontmatter_value(frontmatter, "title") or fallback_title
+    tags = " ".join(frontmatter_list(frontmatter, "tags"))
+    return title, f"{title}\n{title}\n{tags}\n{_COMMENT_RE.sub('', body)}"
+
+
+class SimilarityIndex:
+    def __init__(
+        self,
+        path: Path = DEFAULT_INDEX_PATH,
+        paths: Optional[list[str]] = None,
+        titles: Optional[list[str]] = None,
+        stamps: Optional[list[tuple[int, int, str]]] = None,
+        counts: Optional[sp.csr_matrix] = None,
+    ) -> None:
+        self.path = path
+        self.paths = paths or []
+        self.titles = titles or []
+        self.stamps = stamps or []
+        self.counts = counts if counts is not None else sp.csr_matrix((0, N_FEATURES), dtype=np.float32)
+        self._weighted: Optional[sp.csr_matrix] = None
+        self._idf: Optional[np.ndarray] = None
+        self.dirty = False
+
+    def __contains__(self, rel_path: object) -> bool:
+        return rel_path in self.paths
+
+    @classmethod
+    @tracing.traced("similar.load")
+    def load(cls, path: Path = DEFAULT_INDEX_PATH) -> "SimilarityIndex":
+        meta_path, matrix_path = path.with_suffix(".json"), path.with_suffix(".npz")
+        if not meta_path.exists() or not matrix_path.exists():
+            return cls(path)
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        counts = sp.load_npz(matrix_path).tocsr()
+        if meta.get("n_features") != N_FEATURES or counts.shape[0] != len(meta["paths"]):
+            return cls(path)
+        return cls(path, meta["paths"], meta["titles"], [tuple(stamp) for stamp in meta["stamps"]], counts)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        matrix_tmp = self.path.with_suffix(".tmp.npz")
+        sp.save_npz(matrix_tmp, self.counts)
+        meta_tmp = self.path.with_suffix(".json.tmp")
+        meta_tmp.write_text(
+            json.dumps({"n_features": N_FEATURES, "paths": self.paths, "titles": self.titles, "stamps": self.stamps}),
+            encoding="utf-8",
+        )
+        matrix_tmp.replace(self.path.with_suffix(".npz"))
+        meta_tmp.replace(self.path.with_suffix(".json"))
+        self.dirty = False
+
+    @tracing.traced("similar.update")
+    def update(self, root: Path = ROOT, paths: Optional[Iterable[Path]] = None) -> IndexStats:
+        """Re-vectorize notes whose content changed; drop notes that no longer exist.
+
+        With `paths`, only those files are checked and every other row is kept as is.
+        """
+        known = {rel: idx for idx, rel in enumerate(self.paths)}
+        keep: list[int] = []
+        new_paths: list[str] = []
+        new_titles: list[str] = []
+        new_stamps: list[tuple[int, int, str]] = []
+        texts: list[str] = []
+        added = updated = unchanged = 0
+        if paths is None:
+            candidates: Iterable[Path] = iter_note_paths(root)
+        else:
+            targets = {path.relative_to(root).as_posix(): path for path in paths if is_note_path(path, root)}
+            candidates = [path for path in targets.values() if path.is_file()]
+            keep = [idx for rel, idx in known.items() if rel not in targets]
+            unchanged = len(keep)
+
+        for note_path in candidates:
+            rel = note_path.relative_to(root).as_posix()
+            stat = note_path.stat()
+            idx = known.get(rel)
+            if idx is not None:
+                mtime_ns, size, digest = self.stamps[idx]
+                if mtime_ns == stat.st_mtime_ns and size == stat.st_size:
+                    keep.append(idx)
+                    unchanged += 1
+                    continue
+            data = note_path.read_bytes()
+            new_digest = hashlib.sha1(data).hexdigest()
+            if idx is not None and self.stamps[idx][2] == new_digest:
+                self.stamps[idx] = (stat.st_mtime_ns, stat.st_size, new_digest)
+                self.dirty = True
+                keep.append(idx)
+                unchanged += 1
+                continue
+
+            title, text = note_text(data.decode("utf-8", errors="replace"), note_path.stem)
+            new_paths.append(rel)
+            new_titles.append(title)
+            new_stamps.append((stat.st_mtime_ns, stat.st_size, new_digest))
+            texts.append(text)
+            if idx is None:
+                added += 1
+            else:
+                updated += 1
+
+        removed = len(self.paths) - len(keep) - updated
+        if not texts and not removed:
+            return IndexStats(added=0, updated=0, removed=0, unchanged=unchanged)
+
+        keep.sort()
+        rows = [self.counts[keep]]
+        if texts:
+            rows.append(_vectorizer.transform(texts).astype(np.float32))
+        self.counts = sp.vstack(rows, format="csr")
+        self.paths = [self.paths[idx] for idx in keep] + new_paths
+        self.titles = [self.titles[idx] for idx in keep] + new_titles
+        self.stamps = [self.stamps[idx] for idx in keep] + new_stamps
+        self._weighted = self._idf = None
+        self.dirty = True
+        return IndexStats(added=added, updated=updated, removed=removed, unchanged=unchanged)
+
+    def _weights(self) -> tuple[sp.csr_matrix, np.ndarray]:
+        if self._weighted is None or self._idf is None:
+            n_docs = self.counts.shape[0]
+            df = np.bincount(self.counts.indices, minlength=N_FEATURES)
+            self._idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+            tf = self.counts.copy()
+            np.log1p(tf.data, out=tf.data)
+            self._weighted = normalize(tf.multiply(self._idf).tocsr())
+        return self._weighted, self._idf
+
+    @tracing.traced("similar.query")
+    def query(self, text: str, k: int = 5, exclude: Iterable[str] = ()) -> list[SimilarHit]:
+        """Top-k notes by cosine similarity to `text`, skipping paths in `exclude`."""
+        if not self.paths:
+            return []
+        weighted, idf = self._weights()
+        vector = _vectorizer.transform([text]).astype(np.float32)
+        np.log1p(vector.data, out=vector.data)
+        vector = normalize(vector.multiply(idf).tocsr())
+        scores = (weighted @ vector.T).toarray().ravel()
+
+        excluded = set(exclude)
+        candidates = min(len(scores), k + len(excluded))
+        top = np.argpartition(-scores, candidates - 1)[:candidates]
+        hits = [
+            SimilarHit(path=self.paths[idx], title=self.titles[idx], score=float(scores[idx]))
+            for idx in top[np.argsort(-scores[top])]
+            if scores[idx] > 0 and self.paths[idx] not in excluded
+        ]
+        return hits[:k]
+
+    def similar_to(self, rel_path: str, k: int = 5) -> list[SimilarHit]:
+        """Top-k notes similar to an indexed note, using its stored row. Raises KeyError if it is not indexed."""
+        if rel_path not in self.paths:
+            raise KeyError(f"Not an indexed note: {rel_path}")
+        idx = self.paths.index(rel_path)
+        weighted, _ = self._weights()
+        scores = (weighted @ weighted[idx].T).toarray().ravel()
+        scores[idx] = 0
+        top = np.argsort(-scores)[:k]
+        return [
+            SimilarHit(path=self.paths[i], title=self.titles[i], score=float(scores[i]))
+            for i in top
+            if scores[i] > 0
+        ]
+
+
+def suggest_related(
+    text: str,
+    k: int = 5,
+    exclude: Iterable[str] = (),
+    root: Path = ROOT,
+    refresh: bool = True,
+) -> list[SimilarHit]:
+    """Top-k notes similar to `text`. Pass `refresh=False` when a watcher keeps the persisted index current."""
+    index = SimilarityIndex.load()
+    if refresh:
+        index.update(root)
+    if index.dirty:
+        index.save()
+    return index.query(text, k=k, exclude=exclude)
@@ -0,0 +1,197 @@
+"""
+Tag index and bulk tag edits over note frontmatter.
+
+The index maps each note to the tags in its frontmatter and is refreshed
+incrementally (only notes whose mtime or size changed are re-read). Rename,
+merge and remove look up affected notes in the index, then rewrite them in
+parallel. Each rewrite replaces only the `tags:` entry of the frontmatter block,
+keeping its inline (`[a, b]`) or block (`- a`) style, and is written to a temp
+file and renamed into place.
+
+`src.anki_connect.sync.mirror_tag_changes` sends the resulting changes to the
+Anki notes synced from the rewritten files.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+import json
+import re
+
+from src.notebook import ROOT, frontmatter_list, is_note_path, iter_note_paths, locking, split_frontmatter, tracing
+
+
+DEFAULT_INDEX_PATH = ROOT / "tmp" / "tag-index.json"
+
+_FRONTMATTER_RE = re.compile(r"\A---\n(.*?)\n---\n?", re.DOTALL)
+_TAGS_LINE_RE = re.compile(r"^tags:[ \t]*(.*)$", re.MULTILINE)
+_LIST_ITEM_RE = re.compile(r"^[ \t]*-[ \t]+.*$")
+
+
+@dataclass(frozen=True)
+class TagChange:
+    path: str
+    before: tuple[str, ...]
+    after: tuple[str, ...]
+
+    @property
+    def added(self) -> set[str]:
+        return set(self.after) - set(self.before)
+
+    @property
+    def removed(self) -> set[str]:
+        return set(self.before) - set(self.after)
+
+
+@dataclass
+class TagEditReport:
+    changes: list[TagChange] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+
+class TagIndex:
+    def __init__(self, path: Path = DEFAULT_INDEX_PATH, entries: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.path = path
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_INDEX_PATH) -> "TagIndex":
+        if not path.exists():
+            return cls(path)
+        return cls(path, json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps(self.entries, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    @tracing.traced("tags.update_index")
+    def update(self, root: Path = ROOT, paths: Optional[Iterable[Path]] = None) -> None:
+        """Re-read notes whose mtime or size changed. With `paths`, only those files are checked."""
+        seen: set[str] = set()
+        if paths is None:
+            candidates: Iterable[Path] = iter_note_paths(root)
+            checked: Iterable[str] = self.entries
+        else:
+            targets = {path.relative_to(root).as_posix(): path for path in paths if is_note_path(path, root)}
+            candidates = [path for path in targets.values() if path.is_file()]
+            checked = targets
+        for note_path in candidates:
+            rel = note_path.relative_to(root).as_posix()
+            seen.add(rel)
+            stat = note_path.stat()
+            entry = self.entries.get(rel)
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                continue
+            self.entries[rel] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "tags": read_tags(note_path),
+            }
+        for rel in set(checked) - seen:
+            self.entries.pop(rel, None)
+
+    def tag_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entry in self.entries.values():
+            for tag in entry["tags"]:
+                counts[tag] = counts.get(tag, 0) + 1
+        return counts
+
+    def notes_with(self, tags: Iterable[str]) -> list[str]:
+        wanted = set(tags)
+        return sorted(rel for rel, entry in self.entries.items() if wanted.intersection(entry["tags"]))
+
+
+def read_tags(note_path: Path) -> list[str]:
+    frontmatter, _ = split_frontmatter(note_path.read_text(encoding="utf-8"))
+    return frontmatter_list(frontmatter, "tags")
+
+
+def _format_tags(tags: list[str], inline: bool) -> str:
+    if not tags:
+        return "tags: []"
+    if inline:
+        return f"tags: [{', '.join(tags)}]"
+    return "tags:\n" + "\n".join(f"  - {tag}" for tag in tags)
+
+
+def replace_frontmatter_tags(text: str, tags: list[str]) -> str:
+    """Return `text` with only the frontmatter `tags:` entry replaced."""
+    match = _FRONTMATTER_RE.match(text)
+    if not match:
+        return f"---\n{_format_tags(tags, inline=False)}\n---\n\n{text}"
+
+    frontmatter = match.group(1)
+    tags_line = _TAGS_LINE_RE.search(frontmatter)
+    if not tags_line:
+        updated = f"{frontmatter}\n{_format_tags(tags, inline=False)}"
+    else:
+        inline_value = tags_line.group(1).strip()
+        start, end = tags_line.start(), tags_line.end()
+        if not inline_value:
+            # Swallow the indented `- item` lines of a block list
+            lines = frontmatter[end:].split("\n")
+            consumed = 1
+            while consumed < len(lines) and _LIST_ITEM_RE.match(lines[consumed]):
+                end += len(lines[consumed]) + 1
+                consumed += 1
+        updated = frontmatter[:start] + _format_tags(tags, inline=inline_value.startswith("[")) + frontmatter[end:]
+    return text[: match.start(1)] + updated + text[match.end(1):]
+
+
+def edited_tags(tags: list[str], edit: Dict[str, Optional[str]]) -> list[str]:
+    """Map each tag through `edit` (old -> new, or None to drop), keeping order and dropping duplicates."""
+    result: list[str] = []
+    for tag in tags:
+        tag = edit.get(tag, tag)
+        if tag is not None and tag not in result:
+            result.append(tag)
+    return result
+
+
+def _rewrite_tags(root: Path, rel: str, edit: Dict[str, Optional[str]]) -> Optional[TagChange]:
+    """Apply `edit` to one note's frontmatter. Returns None if its tags did not change."""
+    note_path = root / rel
+    with locking.locked(note_path, lock_dir=locking.lock_dir_for(root)):
+        text = note_path.read_text(encoding="utf-8")
+        frontmatter, _ = split_frontmatter(text)
+        before = frontmatter_list(frontmatter, "tags")
+        after = edited_tags(before, edit)
+        if after == before:
+            return None
+        locking.atomic_write(note_path, replace_frontmatter_tags(text, after))
+    return TagChange(rel, tuple(before), tuple(after))
+
+
+@tracing.traced("tags.apply")
+def apply_tag_edit(
+    edit: Dict[str, Optional[str]],
+    index: TagIndex,
+    root: Path = ROOT,
+    dry_run: bool = False,
+    workers: int = 8,
+) -> TagEditReport:
+    """Rewrite every indexed note carrying a tag in `edit`, in parallel."""
+    report = TagEditReport()
+    targets = index.notes_with(edit)
+    if dry_run:
+        for rel in targets:
+            before = index.entries[rel]["tags"]
+            report.changes.append(TagChange(rel, tuple(before), tuple(edited_tags(before, edit))))
+        return report
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {rel: pool.submit(_rewrite_tags, root, rel, edit) for rel in targets}
+        for rel, future in futures.items():
+            try:
+                change = future.result()
+            except OSError as e:
+                report.errors.append(f"{rel}: {e}")
+                continue
+            if change:
+                report.changes.append(change)
+    return report
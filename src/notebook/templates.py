@@ -0,0 +1,130 @@
+"""
+Note templates shared by the note CLIs.
+
+Templates are Markdown files with `{{field}}` placeholders and
+`{{#field}}...{{/field}}` sections that render only when the field is truthy.
+A section tag alone on its line consumes the whole line. Each template is
+compiled once into a Python function and cached until its file's mtime changes.
+
+Lookup order for `<group>/<name>.md`:
+1. `$LEARN_TEMPLATES_DIR`, or `templates/` at the repository root
+2. Built-in templates in `src/notebook/note-templates/`
+
+Dropping a new file into the user directory adds a new note type.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable, Mapping
+import os
+import re
+
+from src.notebook import ROOT
+
+
+BUILTIN_TEMPLATES_DIR = Path(__file__).resolve().parent / "note-templates"
+TEMPLATE_SUFFIX = ".md"
+
+RenderFunction = Callable[[Mapping[str, Any]], str]
+
+_TAG_RE = re.compile(
+    r"^[ \t]*\{\{\s*(?P<line_op>[#/])\s*(?P<line_name>\w+)\s*\}\}[ \t]*\n"
+    r"|\{\{\s*(?P<op>[#/]?)\s*(?P<name>\w+)\s*\}\}",
+    re.MULTILINE,
+)
+
+_cache: dict[Path, tuple[int, RenderFunction]] = {}
+
+
+def user_templates_dir() -> Path:
+    return Path(os.environ.get("LEARN_TEMPLATES_DIR", ROOT / "templates")).expanduser()
+
+
+def _to_text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _compile_nodes(nodes: list[Any]) -> str:
+    parts: list[str] = []
+    literal = ""
+    for node in nodes:
+        if isinstance(node, str):
+            literal += node
+            continue
+        if literal:
+            parts.append(repr(literal))
+            literal = ""
+        if node[0] == "field":
+            parts.append(f"_text(ctx.get({node[1]!r}))")
+        else:
+            parts.append(f"({_compile_nodes(node[2])} if ctx.get({node[1]!r}) else '')")
+    if literal:
+        parts.append(repr(literal))
+    if not parts:
+        return "''"
+    if len(parts) == 1:
+        return parts[0]
+    return "''.join((" + ", ".join(parts) + "))"
+
+
+def compile_template(source: str, name: str = "<template>") -> RenderFunction:
+    """Compile template text into a function mapping a context dict to a string."""
+    root: list[Any] = []
+    stack: list[tuple[str, list[Any]]] = [("", root)]
+    position = 0
+    for match in _TAG_RE.finditer(source):
+        stack[-1][1].append(source[position:match.start()])
+        position = match.end()
+        op = match.group("line_op") or match.group("op")
+        field = match.group("line_name") or match.group("name")
+        if op == "#":
+            children: list[Any] = []
+            stack[-1][1].append(("section", field, children))
+            stack.append((field, children))
+        elif op == "/":
+            if stack[-1][0] != field:
+                raise ValueError(f"Template {name}: unexpected closing tag '{field}'")
+            stack.pop()
+        else:
+            stack[-1][1].append(("field", field))
+    stack[-1][1].append(source[position:])
+    if len(stack) > 1:
+        raise ValueError(f"Template {name}: unclosed section '{stack[-1][0]}'")
+
+    code = compile(f"lambda ctx: {_compile_nodes(root)}", name, "eval")
+    return eval(code, {"_text": _to_text})
+
+
+def _template_path(group: str, name: str) -> Path:
+    for base in (user_templates_dir(), BUILTIN_TEMPLATES_DIR):
+        path = base / group / f"{name}{TEMPLATE_SUFFIX}"
+        if path.is_file():
+            return path
+    raise ValueError(f"Unknown {group} template: {name}")
+
+
+def load_template(group: str, name: str) -> RenderFunction:
+    path = _template_path(group, name)
+    mtime_ns = path.stat().st_mtime_ns
+    cached = _cache.get(path)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+    render = compile_template(path.read_text(encoding="utf-8"), str(path))
+    _cache[path] = (mtime_ns, render)
+    return render
+
+
+def render_note(group: str, name: str, context: Mapping[str, Any]) -> str:
+    return load_template(group, name)(context)
+
+
+def list_templates(group: str) -> list[str]:
+    """Return template names available for `group`, built-in and user-defined."""
+    names: set[str] = set()
+    for base in (BUILTIN_TEMPLATES_DIR, user_templates_dir()):
+        group_dir = base / group
+        if group_dir.is_dir():
+            names.update(path.stem for path in group_dir.glob(f"*{TEMPLATE_SUFFIX}"))
+    return sorted(names)
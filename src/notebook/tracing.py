@@ -0,0 +1,194 @@
+"""
+Lightweight span and counter instrumentation, switched on by `LEARN_TRACE`.
+
+    LEARN_TRACE=1 uv run python scripts/anki_cli.py sync
+    LEARN_TRACE=tmp/trace.json ./scripts/create_literature_note_cli.sh
+
+With `LEARN_TRACE` unset, `span()` returns a shared no-op context manager and
+`traced()` returns the function unchanged, so instrumented code pays one call
+at most. When set, a per-stage summary (calls, total, mean, max) and the
+counters are printed to stderr at exit. If the value ends in `.json`, a Chrome
+trace-event file is also written; open it in chrome://tracing or Perfetto.
+"""
+from __future__ import annotations
+
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, TypeVar
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+
+ENV_VAR = "LEARN_TRACE"
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+_NULL_SPAN = nullcontext()
+
+
+@dataclass(frozen=True)
+class SpanRecord:
+    name: str
+    start_ns: int
+    duration_ns: int
+    thread_id: int
+    args: Dict[str, Any]
+
+
+class _Tracer:
+    def __init__(self) -> None:
+        self.origin_ns = time.perf_counter_ns()
+        self.spans: list[SpanRecord] = []
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, int] = {}
+        self.counter_events: list[tuple[int, str, int]] = []
+        self.lock = threading.Lock()
+
+    def add_span(self, record: SpanRecord) -> None:
+        with self.lock:
+            self.spans.append(record)
+
+    def add_count(self, name: str, value: int) -> None:
+        with self.lock:
+            total = self.counters.get(name, 0) + value
+            self.counters[name] = total
+            self.counter_events.append((time.perf_counter_ns(), name, total))
+
+    def set_gauge(self, name: str, value: int) -> None:
+        with self.lock:
+            if value > self.gauges.get(name, value - 1):
+                self.gauges[name] = value
+                self.counter_events.append((time.perf_counter_ns(), name, value))
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start_ns")
+
+    def __init__(self, tracer: _Tracer, name: str, args: Dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self) -> "_Span":
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        end_ns = time.perf_counter_ns()
+        self.tracer.add_span(
+            SpanRecord(self.name, self.start_ns, end_ns - self.start_ns, threading.get_ident(), self.args)
+        )
+
+
+_tracer: Optional[_Tracer] = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **args: Any):
+    """Time a block: `with span("bibtex.parse", path=str(p)):`."""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, args)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Add to a named counter (HTTP requests, bytes sent, ...)."""
+    if _tracer is not None:
+        _tracer.add_count(name, value)
+
+
+def gauge(name: str, value: int) -> None:
+    """Record a level (e.g. peak RSS); the summary reports the maximum seen."""
+    if _tracer is not None:
+        _tracer.set_gauge(name, value)
+
+
+def traced(name: Optional[str] = None) -> Callable[[_F], _F]:
+    """Decorator form of `span()`. A no-op that returns `func` itself when tracing is off."""
+
+    def _decorate(func: _F) -> _F:
+        if _tracer is None:
+            return func
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def _wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(label):
+                return func(*args, **kwargs)
+
+        return _wrapper  # type: ignore[return-value]
+
+    return _decorate
+
+
+def format_summary(tracer: _Tracer) -> str:
+    stats: Dict[str, list[int]] = {}
+    for record in tracer.spans:
+        stats.setdefault(record.name, []).append(record.duration_ns)
+
+    lines = [f"{'stage':<40} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+    for name, durations in sorted(stats.items(), key=lambda item: -sum(item[1])):
+        total = sum(durations)
+        lines.append(
+            f"{name:<40} {len(durations):>7} {total / 1e6:>10.2f} "
+            f"{total / len(durations) / 1e6:>9.2f} {max(durations) / 1e6:>9.2f}"
+        )
+    for name, value in sorted(tracer.counters.items()):
+        lines.append(f"{name:<40} {value:>7}")
+    for name, value in sorted(tracer.gauges.items()):
+        lines.append(f"{name:<40} {value:>7} (max)")
+    return "\n".join(lines)
+
+
+def chrome_trace(tracer: _Tracer) -> Dict[str, Any]:
+    pid = os.getpid()
+    events: list[Dict[str, Any]] = [
+        {
+            "name": record.name,
+            "ph": "X",
+            "ts": (record.start_ns - tracer.origin_ns) / 1000,
+            "dur": record.duration_ns / 1000,
+            "pid": pid,
+            "tid": record.thread_id,
+            "args": record.args,
+        }
+        for record in tracer.spans
+    ]
+    events.extend(
+        {"name": name, "ph": "C", "ts": (ts_ns - tracer.origin_ns) / 1000, "pid": pid, "args": {name: total}}
+        for ts_ns, name, total in tracer.counter_events
+    )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def _report(tracer: _Tracer, trace_path: Optional[Path]) -> None:
+    if not tracer.spans and not tracer.counters and not tracer.gauges:
+        return
+    print(f"\n{format_summary(tracer)}", file=sys.stderr)
+    if trace_path is not None:
+        trace_path.parent.mkdir(parents=True, exist_ok=True)
+        trace_path.write_text(json.dumps(chrome_trace(tracer), default=str), encoding="utf-8")
+        print(f"Trace written to {trace_path}", file=sys.stderr)
+
+
+def enable(trace_path: Optional[Path] = None) -> None:
+    """Start recording and report at exit. Call before importing instrumented modules."""
+    global _tracer
+    if _tracer is not None:
+        return
+    _tracer = _Tracer()
+    atexit.register(_report, _tracer, trace_path)
+
+
+_setting = os.environ.get(ENV_VAR, "").strip()
+if _setting and _setting != "0":
+    enable(Path(_setting).expanduser() if _setting.endswith(".json") else None)
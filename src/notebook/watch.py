@@ -0,0 +1,329 @@
+"""
+Long-running watcher that keeps the notebook indexes fresh.
+
+Changes under `projects/`, `literature-notebook/` and to the BibTeX file are
+picked up with Linux inotify (through ctypes), or by polling mtimes where
+inotify is unavailable. Events are coalesced into a set of paths and flushed
+once the tree has been quiet for the debounce interval, or after `MAX_DELAY`
+under constant writes. A flush updates only the changed paths in:
+
+- the full-text index (`search.update_index`)
+- the tag index (`tags.TagIndex`)
+- the similarity index (`similar.SimilarityIndex`, when scikit-learn is installed)
+- the BibTeX cache (`bibtex.load_bibtex_entries`)
+
+While the watcher runs, it holds the lock for `tmp/notebook-watch.pid` (see
+`locking`), and the file holds its PID for reference. CLI commands check
+`is_running()` and skip their own refresh at startup. The lock goes away with
+the process, however it exits, so a stale PID file never counts as a running
+watcher.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from src.notebook import NOTE_DIRS, ROOT, is_note_path, iter_note_paths, locking, search, tags, tracing
+from src.notebook.bibtex import load_bibtex_entries
+
+
+DEFAULT_PID_PATH = ROOT / "tmp" / "notebook-watch.pid"
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_POLL_INTERVAL = 1.0
+# Flush at least this often while events keep arriving
+MAX_DELAY = 2.0
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass
+class FlushReport:
+    paths: int
+    bib: bool
+    full: bool
+    elapsed_ms: float
+    summary: str
+
+
+# --- Event sources ----------------------------------------------------------------
+
+
+class InotifySource:
+    """Recursive inotify watches over the note directories and the BibTeX file's directory."""
+
+    def __init__(self, root: Path, bib_path: Optional[Path]) -> None:
+        libc_name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc = libc
+        self._libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.root = root
+        self.bib_path = bib_path
+        self._dirs: Dict[int, Path] = {}
+        for name in NOTE_DIRS:
+            if (root / name).is_dir():
+                self._watch_tree(root / name)
+        if bib_path is not None and bib_path.parent.is_dir():
+            self._add_watch(bib_path.parent)
+
+    def _add_watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (raise fs.inotify.max_user_watches or use --poll)")
+            return
+        self._dirs[wd] = directory
+
+    def _watch_tree(self, directory: Path) -> list[Path]:
+        """Watch `directory` and its subdirectories. Returns the files already inside them."""
+        files: list[Path] = []
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+            self._add_watch(Path(dirpath))
+            files.extend(Path(dirpath) / name for name in filenames)
+        return files
+
+    def read(self, timeout: float) -> tuple[set[Path], bool]:
+        """Wait up to `timeout` seconds. Returns (changed paths, whether a full rescan is needed)."""
+        changed: set[Path] = set()
+        full = False
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed, full
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed, full
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                full = True
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files can land in a new directory before its watch exists
+                    changed.update(self._watch_tree(path))
+                else:
+                    # A directory moved away or deleted: its notes are gone from unknown paths
+                    full = True
+                continue
+            changed.add(path)
+        return changed, full
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Fallback that compares (mtime, size) snapshots of every note and the BibTeX file."""
+
+    def __init__(self, root: Path, bib_path: Optional[Path], interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.root = root
+        self.bib_path = bib_path
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, tuple[int, int]]:
+        snapshot: Dict[Path, tuple[int, int]] = {}
+        paths = list(iter_note_paths(self.root))
+        if self.bib_path is not None and self.bib_path.exists():
+            paths.append(self.bib_path)
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def read(self, timeout: float) -> tuple[set[Path], bool]:
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        previous, self._snapshot = self._snapshot, snapshot
+        changed = {path for path, stamp in snapshot.items() if previous.get(path) != stamp}
+        changed.update(path for path in previous if path not in snapshot)
+        return changed, False
+
+    def close(self) -> None:
+        pass
+
+
+def open_source(
+    root: Path,
+    bib_path: Optional[Path],
+    poll: bool = False,
+    interval: float = DEFAULT_POLL_INTERVAL,
+) -> InotifySource | PollingSource:
+    """inotify when available, otherwise mtime polling."""
+    if not poll:
+        try:
+            return InotifySource(root, bib_path)
+        except (OSError, AttributeError):
+            pass
+    return PollingSource(root, bib_path, interval)
+
+
+# --- Index updates ----------------------------------------------------------------
+
+
+class IndexUpdater:
+    """Opens the on-disk indexes once and applies batches of changed paths to them."""
+
+    def __init__(self, root: Path = ROOT, bib_path: Optional[Path] = None) -> None:
+        self.root = root
+        self.bib_path = bib_path
+        self.conn = search.open_index()
+        self.tags = tags.TagIndex.load()
+        try:
+            # scikit-learn is optional
+            from src.notebook import similar
+        except ImportError:
+            self.similar = None
+        else:
+            self.similar = similar.SimilarityIndex.load()
+
+    def refresh(self, paths: Optional[set[Path]] = None) -> str:
+        """Update every index for `paths`, or with a full scan when `paths` is None."""
+        stats = search.update_index(self.conn, self.root, paths=paths)
+        self.tags.update(self.root, paths=paths)
+        self.tags.save()
+        if self.similar is not None:
+            self.similar.update(self.root, paths=paths)
+            if self.similar.dirty:
+                self.similar.save()
+        return f"{stats.added} added, {stats.updated} updated, {stats.removed} removed"
+
+    def refresh_bib(self) -> None:
+        if self.bib_path is not None and self.bib_path.exists():
+            load_bibtex_entries(self.bib_path)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+# --- Loop -------------------------------------------------------------------------
+
+
+def _lock_dir(pid_path: Path) -> Path:
+    return pid_path.parent / "locks"
+
+
+def is_running(pid_path: Path = DEFAULT_PID_PATH) -> bool:
+    """Whether a watcher process is alive, so callers can trust the indexes to be current."""
+    return locking.is_locked(pid_path, _lock_dir(pid_path))
+
+
+def watch(
+    root: Path = ROOT,
+    bib_path: Optional[Path] = None,
+    debounce: float = DEFAULT_DEBOUNCE,
+    poll: bool = False,
+    interval: float = DEFAULT_POLL_INTERVAL,
+    pid_path: Path = DEFAULT_PID_PATH,
+    on_flush: Optional[Callable[[FlushReport], None]] = None,
+) -> None:
+    """Run until interrupted. Starts with one full refresh, then flushes coalesced changes."""
+    try:
+        with locking.locked(pid_path, timeout=0, lock_dir=_lock_dir(pid_path)):
+            pid_path.write_text(f"{os.getpid()}\n", encoding="utf-8")
+            try:
+                _watch(root, bib_path, debounce, poll, interval, on_flush)
+            finally:
+                pid_path.unlink(missing_ok=True)
+    except TimeoutError:
+        raise RuntimeError(f"A watcher is already running (see {pid_path})") from None
+
+
+def _watch(
+    root: Path,
+    bib_path: Optional[Path],
+    debounce: float,
+    poll: bool,
+    interval: float,
+    on_flush: Optional[Callable[[FlushReport], None]],
+) -> None:
+    bib_path = bib_path.resolve() if bib_path is not None and bib_path.exists() else bib_path
+    source = open_source(root, bib_path, poll=poll, interval=interval)
+    updater = IndexUpdater(root, bib_path)
+
+    def flush(paths: set[Path], full: bool) -> None:
+        started = time.perf_counter()
+        bib_changed = bib_path is not None and bib_path in paths
+        notes = paths - {bib_path}
+        summary = ""
+        with tracing.span("watch.flush", paths=len(paths), full=full):
+            if bib_changed or full:
+                updater.refresh_bib()
+            if notes or full:
+                summary = updater.refresh(None if full else notes)
+        if on_flush is not None:
+            on_flush(FlushReport(len(paths), bib_changed, full, (time.perf_counter() - started) * 1000, summary))
+
+    try:
+        flush(set(), full=True)
+        pending: set[Path] = set()
+        full = False
+        first_event = last_event = 0.0
+        while True:
+            if pending or full:
+                deadline = min(last_event + debounce, first_event + MAX_DELAY)
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    flush(pending, full)
+                    pending, full = set(), False
+                    continue
+            else:
+                timeout = 3600.0
+
+            changed, overflow = source.read(timeout)
+            changed = {path for path in changed if path == bib_path or is_note_path(path, root)}
+            if changed or overflow:
+                now = time.monotonic()
+                if not pending and not full:
+                    first_event = now
+                last_event = now
+                pending |= changed
+                full = full or overflow
+                tracing.count("watch.events", len(changed))
+    finally:
+        source.close()
+        updater.close()